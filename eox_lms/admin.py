@@ -0,0 +1,14 @@
+"""
+Django admin registrations of eox-lms.
+"""
+from django.contrib import admin
+
+from eox_lms.models import EoxTask
+
+
+@admin.register(EoxTask)
+class EoxTaskAdmin(admin.ModelAdmin):
+    """ Shows the status of the eox-lms tasks """
+    list_display = ("id", "task_type", "status", "attempts", "run_after", "modified")
+    list_filter = ("task_type", "status")
+    readonly_fields = ("created", "modified")
@@ -0,0 +1,195 @@
+"""
+Support for the Idempotency-Key header on the API write endpoints.
+
+The first request with a key claims an IdempotencyRecord and stores its
+response there. A retry with the same key, user, method and path gets the
+stored response back instead of running again. A retry that arrives while
+the first request is still running waits for it. Under ATOMIC_REQUESTS the
+wait happens on the unique index of the record, otherwise the record is
+polled. Records expire after EOX_CORE_IDEMPOTENCY_KEY_TTL seconds.
+
+Client errors are final, a 4xx response or APIException is stored and
+replayed like a success. Under ATOMIC_REQUESTS the rollback of a request that
+raised also drops its record, so such requests run again when retried.
+"""
+import hashlib
+import json
+import logging
+import random
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from eox_lms.models import IdempotencyRecord
+
+LOG = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.2
+PURGE_PROBABILITY = 0.01
+PURGE_BATCH_SIZE = 100
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _purge_expired():
+    """
+    Delete a batch of expired records.
+    """
+    expired = list(
+        IdempotencyRecord.objects.filter(expires_at__lt=timezone.now()).values_list("pk", flat=True)[:PURGE_BATCH_SIZE]
+    )
+    if expired:
+        IdempotencyRecord.objects.filter(pk__in=expired).delete()
+
+
+def _claim(key, fingerprint):
+    """
+    Claim key for the current request.
+
+    Returns (record, claimed). When claimed is False the record belongs to
+    another request, which may still be in progress.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=getattr(settings, "EOX_CORE_IDEMPOTENCY_KEY_TTL", 86400))
+    if random.random() < PURGE_PROBABILITY:
+        _purge_expired()
+
+    while True:
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(key=key, fingerprint=fingerprint, expires_at=expires_at), True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyRecord.objects.filter(key=key).first()
+        if record is None:
+            # Released by a failed request in the meantime
+            continue
+
+        abandoned = record.status_code is None and record.created < now - timedelta(
+            seconds=getattr(settings, "EOX_CORE_IDEMPOTENCY_IN_PROGRESS_TIMEOUT", 600),
+        )
+        if record.expires_at > now and not abandoned:
+            return record, False
+
+        # Expired or abandoned: take it over unless another request already did
+        taken = IdempotencyRecord.objects.filter(pk=record.pk, created=record.created).update(
+            fingerprint=fingerprint, status_code=None, response="", created=now, expires_at=expires_at,
+        )
+        if taken:
+            record.refresh_from_db()
+            return record, True
+
+
+def _wait_for(record):
+    """
+    Wait for the request that holds record to finish, for at most
+    EOX_CORE_IDEMPOTENCY_LOCK_TIMEOUT seconds.
+
+    Returns the finished record, or None if it is still in progress or was
+    released.
+    """
+    deadline = time.monotonic() + getattr(settings, "EOX_CORE_IDEMPOTENCY_LOCK_TIMEOUT", 30)
+    while record is not None and record.status_code is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyRecord.objects.filter(pk=record.pk).first()
+    if record is None or record.status_code is None:
+        return None
+    return record
+
+
+def _replay(record, fingerprint):
+    """
+    Return the stored response of record.
+    """
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": "The Idempotency-Key was already used with a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(
+        json.loads(record.response) if record.response else None,
+        status=record.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _store(record, status_code, data):
+    """
+    Record the final outcome of the request that holds record.
+    """
+    IdempotencyRecord.objects.filter(pk=record.pk).update(
+        status_code=status_code,
+        response=json.dumps(data, cls=JSONEncoder) if data is not None else "",
+    )
+
+
+def _release(record):
+    """
+    Free the key of record, so that a retry runs the request again.
+    """
+    IdempotencyRecord.objects.filter(pk=record.pk).delete()
+
+
+def idempotent(method):
+    """
+    Decorator for APIView methods that honours the Idempotency-Key header.
+
+    Responses with a 5xx status, and exceptions other than the APIExceptions
+    of a 4xx, release the key so that the request can be retried for real.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        idempotency_key = request.META.get(IDEMPOTENCY_KEY_HEADER)
+        if not idempotency_key:
+            return method(self, request, *args, **kwargs)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            raise ValidationError(detail="The Idempotency-Key header is longer than {} characters".format(MAX_KEY_LENGTH))
+
+        key = _digest("|".join([str(request.user.pk), request.method, request.path, idempotency_key]))
+        fingerprint = _digest(json.dumps(request.data, sort_keys=True, cls=JSONEncoder))
+
+        record, claimed = _claim(key, fingerprint)
+        if not claimed:
+            finished = _wait_for(record)
+            if finished is None:
+                return Response(
+                    {"detail": "A request with this Idempotency-Key is still being processed."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return _replay(finished, fingerprint)
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except APIException as error:
+            if error.status_code >= 500:
+                _release(record)
+            else:
+                # The body DRF's exception handler answers with
+                _store(record, error.status_code, error.detail if isinstance(error.detail, (list, dict)) else {
+                    "detail": error.detail,
+                })
+            raise
+        except Exception:
+            _release(record)
+            raise
+
+        if response.status_code >= 500:
+            _release(record)
+        else:
+            _store(record, response.status_code, response.data)
+        return response
+
+    return wrapper
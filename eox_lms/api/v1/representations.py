@@ -0,0 +1,114 @@
+"""
+Plain Python representations for the read-only API responses.
+
+get_representation turns the declared fields of a serializer class into a
+function that returns the same data as serializer_class(instance).data. The
+function is built once per class. Unlike DRF, it does not copy and bind the
+fields for every instance or go through the serializer machinery per field.
+
+Classes with a field that needs custom logic keep using DRF. Examples are
+SerializerMethodField, related fields, and serializers that override
+to_representation. The fields are taken from an instance built without
+context, so fields that a serializer only adds when it gets a context are
+not part of the representation.
+"""
+from collections import OrderedDict
+
+from django.db import models
+from rest_framework import fields, serializers
+from rest_framework.fields import SkipField, get_attribute
+
+REPRESENTATIONS = {}
+
+# Fields whose to_representation is just a builtin
+BUILTIN_CONVERTERS = {
+    fields.CharField.to_representation: str,
+    fields.IntegerField.to_representation: int,
+}
+
+
+class CustomFieldLogic(Exception):
+    """
+    A field of the serializer cannot be represented without DRF.
+    """
+
+
+def _compile_converter(field):
+    """
+    Return the function that turns the attribute of field into its representation.
+    """
+    if isinstance(field, serializers.ListSerializer):
+        if type(field).to_representation is not serializers.ListSerializer.to_representation:
+            raise CustomFieldLogic(field.field_name)
+        represent_child = _compile(type(field.child))
+
+        def represent_list(value):
+            iterable = value.all() if isinstance(value, models.Manager) else value
+            return [represent_child(item) for item in iterable]
+        return represent_list
+
+    if isinstance(field, serializers.Serializer):
+        return _compile(type(field))
+
+    if isinstance(field, serializers.SerializerMethodField):
+        raise CustomFieldLogic(field.field_name)
+    return BUILTIN_CONVERTERS.get(type(field).to_representation, field.to_representation)
+
+
+def _build(serializer_class):
+    """
+    Build the representation function of serializer_class, raising
+    CustomFieldLogic when it needs DRF.
+    """
+    template = serializer_class()
+    if type(template) is not serializer_class or (
+            type(template).to_representation is not serializers.Serializer.to_representation):
+        raise CustomFieldLogic(serializer_class.__name__)
+
+    plan = []
+    for field in template._readable_fields:  # pylint: disable=protected-access
+        if field.source == "*" or type(field).get_attribute is not fields.Field.get_attribute:
+            raise CustomFieldLogic(field.field_name)
+        plan.append((field.field_name, field.source_attrs, _compile_converter(field), field))
+
+    def represent(instance):
+        data = OrderedDict()
+        for name, source_attrs, convert, field in plan:
+            try:
+                attribute = get_attribute(instance, source_attrs)
+            except (KeyError, AttributeError):
+                # Let DRF resolve the default, null or skip of a missing attribute
+                try:
+                    attribute = field.get_attribute(instance)
+                except SkipField:
+                    continue
+            data[name] = None if attribute is None else convert(attribute)
+        return data
+
+    return represent
+
+
+def _compile(serializer_class):
+    """
+    Return the cached representation function of serializer_class, building it
+    the first time. None is cached for the classes that need DRF.
+    """
+    if serializer_class not in REPRESENTATIONS:
+        try:
+            REPRESENTATIONS[serializer_class] = _build(serializer_class)
+        except CustomFieldLogic:
+            REPRESENTATIONS[serializer_class] = None
+    if REPRESENTATIONS[serializer_class] is None:
+        raise CustomFieldLogic(serializer_class.__name__)
+    return REPRESENTATIONS[serializer_class]
+
+
+def get_representation(serializer_class):
+    """
+    Return a function that gives the same data as serializer_class(instance).data,
+    compiled from the declared fields when possible.
+    """
+    try:
+        return _compile(serializer_class)
+    except CustomFieldLogic:
+        return lambda instance: serializer_class(instance).data
@@ -4,9 +4,11 @@ API v1 serializers.
 # pylint: disable=abstract-method
 from __future__ import absolute_import, unicode_literals
 
+import copy
 from collections import OrderedDict
 
-from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher
+from django.db.models import Count
 from django_countries.serializer_fields import CountryField
 from rest_framework import serializers
 from rest_framework.fields import HiddenField
@@ -15,16 +17,18 @@ from eox_lms.edxapp_wrapper.coursekey import get_valid_course_key, validate_org
 from eox_lms.edxapp_wrapper.enrollments import check_edxapp_enrollment_is_valid
 from eox_lms.edxapp_wrapper.users import (
     check_edxapp_account_conflicts,
+    check_edxapp_account_conflicts_bulk,
     get_user_read_only_serializer,
     get_user_signup_source,
     get_username_max_length,
     get_edxapp_user_by_id
 )
+from eox_lms.cache import get_local_cache
+from eox_lms.snapshots import COMPILED_SERIALIZERS_NAMESPACE, get_site_snapshot
 from eox_lms.utils import (
     create_user_profile,
     get_gender_choices,
     get_level_of_education_choices,
-    get_registration_extra_fields,
     get_valid_years,
     set_custom_field_restrictions,
     set_select_custom_field,
@@ -41,6 +45,53 @@ ALLOWED_TYPES = ["text", "email", "select", "textarea", "checkbox", "plaintext",
 YEAR_OF_BIRTH_CHOICES = [(str(year), str(year)) for year in get_valid_years()]
 
 
+def get_account_conflicts(rows):
+    """
+    Resolve the account conflicts of many rows of data with a single bulk check.
+
+    Returns a dict with the conflicts keyed by the (email, username) of each row.
+    """
+    pairs = list({
+        (row.get("email"), row.get("username")) for row in rows if isinstance(row, dict)
+    })
+    return dict(zip(pairs, check_edxapp_account_conflicts_bulk(pairs)))
+
+
+def get_signup_source_counts(users):
+    """
+    Count the signup sources of many users with a single query.
+
+    Returns a dict with the counts keyed by email, users without signup
+    sources are left out.
+    """
+    counts = UserSignupSource.objects.filter(
+        user__email__in={user.email for user in users},
+    ).values("user__email").annotate(count=Count("pk"))
+    return {row["user__email"]: row["count"] for row in counts}
+
+
+def get_changed_columns(instance, values):
+    """
+    Return the keys of values that are columns of the model instance and
+    differ from its current value. Other keys, e.g. registration fields kept
+    nowhere, are dropped.
+    """
+    columns = {field.name for field in instance._meta.concrete_fields}  # pylint: disable=protected-access
+    return [key for key, value in values.items() if key in columns and getattr(instance, key) != value]
+
+
+class AccountConflictsListSerializer(serializers.ListSerializer):
+    """
+    List serializer that checks the accounts of all the items at once before
+    validating them, leaving the result in the context as account_conflicts.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._context = dict(self.context, account_conflicts=get_account_conflicts(data))
+        return super(AccountConflictsListSerializer, self).to_internal_value(data)
+
+
 class EdxappWithWarningSerializer(serializers.Serializer):
     """
     Mixin serializer to add a warning field to Edxapp serializers
@@ -64,6 +115,65 @@ class EdxappWithWarningSerializer(serializers.Serializer):
         return None
 
 
+class EdxappGroupMembersSerializer(serializers.Serializer):
+    """
+    Handles the desired members of a group, given by username and/or email.
+    """
+    usernames = serializers.ListField(child=serializers.CharField(), required=False)
+    emails = serializers.ListField(child=serializers.CharField(), required=False)
+
+    def validate(self, attrs):
+        """
+        Require the members to be given explicitly, an empty list removes them all.
+        """
+        if "usernames" not in attrs and "emails" not in attrs:
+            raise serializers.ValidationError("A list of usernames or emails is required")
+        return attrs
+
+
+class EdxappUsersSetActiveSerializer(serializers.Serializer):
+    """
+    Handles the predicate of a mass activation or deactivation of users.
+    """
+    is_active = serializers.BooleanField()
+    usernames = serializers.ListField(child=serializers.CharField(), required=False)
+    emails = serializers.ListField(child=serializers.CharField(), required=False)
+    last_login_before = serializers.DateTimeField(required=False)
+    email_domain = serializers.CharField(required=False)
+    group = serializers.CharField(required=False)
+    current_site = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        """
+        Refuse to change every user of the platform at once.
+        """
+        selectors = ("usernames", "emails", "last_login_before", "email_domain", "group")
+        if not any(selector in attrs for selector in selectors) and not attrs["current_site"]:
+            raise serializers.ValidationError(
+                "At least one of {} or current_site is required".format(", ".join(selectors))
+            )
+        return attrs
+
+
+class EdxappRetirementJobSerializer(serializers.Serializer):
+    """
+    Handles the users and case of a bulk retirement.
+    """
+    usernames = serializers.ListField(child=serializers.CharField(), required=False)
+    emails = serializers.ListField(child=serializers.CharField(), required=False)
+    case_id = serializers.CharField(max_length=255)
+    is_support_user = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        """
+        Require at least a user to retire.
+        """
+        if not attrs.get("usernames") and not attrs.get("emails"):
+            raise serializers.ValidationError("A list of usernames or emails is required")
+        return attrs
+
+
 class EdxappUserSocialAuthSerializerBase(serializers.Serializer):
     """
     Serialization for a User Social Auth object base
@@ -113,11 +223,19 @@ class EdxappUserSerializer(serializers.Serializer):
         """
         email = attrs.get("email")
         username = attrs.get("username")
-        conflicts = check_edxapp_account_conflicts(email, username)
+        conflicts = self.context.get("account_conflicts", {}).get((email, username))
+        if conflicts is None:
+            conflicts = check_edxapp_account_conflicts(email, username)
         if conflicts:
             raise serializers.ValidationError("Account already exists with the provided: {}".format(", ".join(conflicts)))
         return attrs
 
+    class Meta:
+        """
+        Check the accounts of all the items at once when many=True
+        """
+        list_serializer_class = AccountConflictsListSerializer
+
 
 class EdxappExtendedUserSerializer(EdxappUserSerializer):
     """
@@ -147,31 +265,54 @@ class EdxappExtendedUserSerializer(EdxappUserSerializer):
     terms_of_service = serializers.HiddenField(default='true')
     honor_code = serializers.HiddenField(default='true')
 
-    def __init__(self, *args, **kwargs):  # pylint: disable=too-many-locals
+    # True on the per-site subclasses built by compile_for_site
+    compiled = False
+    # Fields that go to the UserProfile or its meta, set by compile_for_site
+    registration_field_names = frozenset()
+
+    def __new__(cls, *args, **kwargs):
         """
-        Add the custom registration fields specified in the settings.
+        Instantiate the subclass compiled for the registration settings of the
+        current site instead of the class itself.
         """
-        super().__init__(*args, **kwargs)
+        site_class = cls if cls.compiled else cls.compile_for_site(get_site_snapshot())
+        return super(EdxappExtendedUserSerializer, cls).__new__(site_class, *args, **kwargs)
+
+    @classmethod
+    def compile_for_site(cls, snapshot):
+        """
+        Return the subclass of cls with the custom registration fields of the
+        site already applied, building it once per registration settings.
+        """
+        return get_local_cache(COMPILED_SERIALIZERS_NAMESPACE).get_or_set(
+            (cls, snapshot.registration_hash),
+            lambda: cls._build_site_class(snapshot),
+        )
 
-        extended_profile_fields = getattr(settings, "extended_profile_fields", [])
-        extra_fields = get_registration_extra_fields()
-        ednx_custom_registration_fields = getattr(settings, "EDNX_CUSTOM_REGISTRATION_FIELDS", [])
-        all_fields = set(self.fields)
+    @classmethod
+    def _build_site_class(cls, snapshot):  # pylint: disable=too-many-locals
+        """
+        Add the custom registration fields specified in the settings.
+        """
+        extended_profile_fields = snapshot.extended_profile_fields
+        extra_fields = snapshot.registration_extra_fields
+        ednx_custom_registration_fields = snapshot.custom_registration_fields
+        fields = copy.deepcopy(cls._declared_fields)
         # Obtain only the fields defined in the EdxappExtendedUserSerializer
-        non_profile_fields = set(EdxappUserSerializer().fields)
-        non_profile_fields.update(["activate_user", "skip_password"])
-        profile_fields = all_fields - non_profile_fields
+        non_profile_fields = set(EdxappUserSerializer._declared_fields)  # pylint: disable=protected-access
+        non_profile_fields.update(["activate_user", "skip_password", "password_hash"])
+        profile_fields = set(fields) - non_profile_fields
 
         # Delete the profile fields that are not allowed or are redefined in the ednx_custom_registration setting
         # In case the field IS allowed, check if is required or not
         for field in profile_fields:
             if field not in extra_fields or field in extended_profile_fields:
                 if field not in {"first_name", "last_name"}: # Added by me :)
-                    self.fields.pop(field)
+                    fields.pop(field)
             else:
                 # Hidden fields take their value from the default, so we should not alter the "required" attribute.
-                if not isinstance(self.fields[field], HiddenField):
-                    self.fields[field].required = extra_fields.get(field) == "required"
+                if not isinstance(fields[field], HiddenField):
+                    fields[field].required = extra_fields.get(field) == "required"
 
         # Adding fields that go inside the UserProfile.meta
         for custom_field in ednx_custom_registration_fields:
@@ -189,13 +330,22 @@ class EdxappExtendedUserSerializer(EdxappUserSerializer):
 
                 # Now we add the field to the serializer according to the custom field type defined in the settings
                 if field_type == "select":
-                    self.fields[field_name] = serializers.ChoiceField(**set_select_custom_field(custom_field, serializer_field))
+                    fields[field_name] = serializers.ChoiceField(**set_select_custom_field(custom_field, serializer_field))
 
                 elif field_type == "checkbox":
-                    self.fields[field_name] = serializers.BooleanField(**serializer_field)
+                    fields[field_name] = serializers.BooleanField(**serializer_field)
 
                 else:
-                    self.fields[field_name] = serializers.CharField(**serializer_field)
+                    fields[field_name] = serializers.CharField(**serializer_field)
+
+        site_class = type(cls.__name__, (cls,), {
+            "__module__": cls.__module__,
+            "__doc__": cls.__doc__,
+            "compiled": True,
+            "registration_field_names": frozenset(set(fields) - non_profile_fields),
+        })
+        site_class._declared_fields = fields  # pylint: disable=protected-access
+        return site_class
 
 
 class WrittableEdxappUserSerializer(EdxappExtendedUserSerializer):
@@ -225,40 +375,70 @@ class WrittableEdxappUserSerializer(EdxappExtendedUserSerializer):
         # if self.instance.is_staff or self.instance.is_superuser:
         #     raise serializers.ValidationError({"detail": "You can't update users with roles like staff or superuser."})
 
-        if UserSignupSource.objects.filter(user__email=self.instance.email).count() > MAX_SIGNUP_SOURCES_ALLOWED:
+        signup_source_counts = self.context.get("signup_source_counts")
+        if signup_source_counts is not None:
+            too_many_signup_sources = signup_source_counts.get(self.instance.email, 0) > MAX_SIGNUP_SOURCES_ALLOWED
+        else:
+            too_many_signup_sources = self.has_too_many_signup_sources(self.instance)
+        if too_many_signup_sources:
             raise serializers.ValidationError({"detail": "You can't update users with more than one sign up source."})
 
         return attrs
 
+    @staticmethod
+    def has_too_many_signup_sources(user):
+        """
+        Check if the user has more than MAX_SIGNUP_SOURCES_ALLOWED signup sources,
+        reading no more rows than needed to tell.
+        """
+        signup_sources = UserSignupSource.objects.filter(user__email=user.email).values_list("pk", flat=True)
+        return len(signup_sources[:MAX_SIGNUP_SOURCES_ALLOWED + 1]) > MAX_SIGNUP_SOURCES_ALLOWED
+
     def update(self, instance, validated_data):
         """
         Update method for safe fields.
+
+        Only the columns whose value changes are written: the profile and its
+        meta are saved only if something in them changed, and a PATCH that
+        changes nothing does not write at all.
         """
-        extended_profile_fields = getattr(settings, 'extended_profile_fields', [])
-        # Obtain only the User profile fields defined in the EdxappExtendedUserSerializer
-        all_fields = set(EdxappExtendedUserSerializer().fields)
-        non_profile_fields = set(EdxappUserSerializer().fields)
-        extra_registration_fields = all_fields - non_profile_fields
-        # Check if the User has a Profile
-        has_profile = hasattr(instance, 'profile')
+        user_fields, profile_fields = self.apply_changes(instance, validated_data)
+
+        if profile_fields:
+            instance.profile.save(update_fields=profile_fields)
+        if user_fields:
+            instance.save(update_fields=user_fields)
+
+        return instance
 
+    def apply_changes(self, instance, validated_data):
+        """
+        Set the values of validated_data that differ on the user and its
+        profile, without saving them. A missing profile is created. Keys that
+        are not columns of the user or the profile are dropped.
+
+        Returns (user_fields, profile_fields), the lists of changed columns.
+        """
+        snapshot = get_site_snapshot()
+        extended_profile_fields = snapshot.extended_profile_fields
+        # Obtain only the User profile fields defined in the EdxappExtendedUserSerializer
+        extra_registration_fields = set(
+            EdxappExtendedUserSerializer.compile_for_site(snapshot).registration_field_names
+        )
         extra_registration_fields.update(extended_profile_fields)
-        if has_profile:
-            profile_meta = instance.profile.get_meta()
 
+        user_values = {}
+        profile_values = {}
+        meta_values = {}
+        password = None
         for key, value in validated_data.items():
             if key == "password":
-                instance.set_password(value)
+                password = value
 
             elif key in extra_registration_fields or key == "fullname":
-                if not has_profile:
-                    create_user_profile(instance)
-                    profile_meta = {}
-                    has_profile = True
-
                 # First check if the field belongs to the meta
                 if key in extended_profile_fields:
-                    profile_meta[key] = value
+                    meta_values[key] = value
 
                 # Key is one of the user profile fields
                 else:
@@ -267,19 +447,37 @@ class WrittableEdxappUserSerializer(EdxappExtendedUserSerializer):
                     # 'name' field is sent as 'fullname' in the request
                     if key == "fullname":
                         key = "name"
-                    setattr(instance.profile, key, value)
+                    profile_values[key] = value
 
             else:
-                setattr(instance, key, value)
-
-        if validated_data:
-            if has_profile:
+                user_values[key] = value
+
+        user_fields = get_changed_columns(instance, user_values)
+        for key in user_fields:
+            setattr(instance, key, user_values[key])
+        if password is not None:
+            instance.set_password(password)
+            user_fields.append("password")
+
+        profile_fields = []
+        if profile_values or meta_values:
+            # Check if the User has a Profile
+            if not hasattr(instance, 'profile'):
+                create_user_profile(instance)
+            profile = instance.profile
+
+            profile_fields = get_changed_columns(profile, profile_values)
+            for key in profile_fields:
+                setattr(profile, key, profile_values[key])
+
+            profile_meta = profile.get_meta()
+            if any(key not in profile_meta or profile_meta[key] != value for key, value in meta_values.items()):
+                profile_meta.update(meta_values)
                 # Update user profile meta
-                instance.profile.set_meta(profile_meta)
-                instance.profile.save()
-            instance.save()
+                profile.set_meta(profile_meta)
+                profile_fields.append("meta")
 
-        return instance
+        return user_fields, profile_fields
 
 
 class EdxappUserQuerySerializer(EdxappExtendedUserSerializer):
@@ -290,19 +488,30 @@ class EdxappUserQuerySerializer(EdxappExtendedUserSerializer):
 
     activate_user = serializers.BooleanField(default=False)  # We need to allow the api to activate users later on
     skip_password = serializers.BooleanField(default=False, write_only=True)
+    password_hash = serializers.CharField(max_length=128, required=False, write_only=True)
 
     def __init__(self, *args, **kwargs):  # pylint: disable=too-many-locals
         """
         Check skip_password flag to see if password
-        should be omitted.
+        should be omitted. A password_hash replaces the password.
         """
         super().__init__(*args, **kwargs)
 
         initial_data = getattr(self, "initial_data", {})
 
-        if initial_data.get("skip_password", False):  # pylint: disable=no-member
+        if initial_data.get("skip_password", False) or initial_data.get("password_hash"):  # pylint: disable=no-member
             self.fields.pop("password", None)
 
+    def validate_password_hash(self, value):
+        """
+        Check the hash is in a format of the configured PASSWORD_HASHERS
+        """
+        try:
+            identify_hasher(value)
+        except ValueError:
+            raise serializers.ValidationError("Unknown password hash format")
+        return value
+
 
 class EdxappEnrollmentAttributeSerializer(serializers.Serializer):
     """
@@ -348,7 +557,8 @@ class EdxappCourseEnrollmentSerializer(serializers.Serializer):
         """
         Check that there are no issues with enrollment
         """
-        errors = check_edxapp_enrollment_is_valid(**attrs)
+        account_conflicts = self.context.get("account_conflicts", {}).get((attrs.get("email"), attrs.get("username")))
+        errors = check_edxapp_enrollment_is_valid(account_conflicts=account_conflicts, **attrs)
         if errors:
             raise serializers.ValidationError(", ".join(errors))
         return attrs
@@ -357,6 +567,7 @@ class EdxappCourseEnrollmentSerializer(serializers.Serializer):
         """
         Add extra details for swagger
         """
+        list_serializer_class = AccountConflictsListSerializer
         swagger_schema_fields = {
             "example": OrderedDict(
                 [
@@ -9,9 +9,25 @@ app_name = 'eox_lms'  # pylint: disable=invalid-name
 
 urlpatterns = [  # pylint: disable=invalid-name
     re_path(r'^user/$', views.EdxappUser.as_view(), name='edxapp-user'),
+    re_path(r'^user/bulk/$', views.EdxappUserBulk.as_view(), name='edxapp-user-bulk'),
+    re_path(r'^user/bulk-set-active/$', views.EdxappUserBulkSetActive.as_view(), name='edxapp-user-bulk-set-active'),
+    re_path(r'^user/retirement-job/$', views.EdxappUserRetirementJobs.as_view(), name='edxapp-user-retirement-jobs'),
+    re_path(
+        r'^user/retirement-job/(?P<job_id>\d+)/$',
+        views.EdxappUserRetirementJob.as_view(),
+        name='edxapp-user-retirement-job',
+    ),
     re_path(r'^enrollment/$', views.EdxappEnrollment.as_view(), name='edxapp-enrollment'),
+    re_path(r'^group/$', views.EdxappGroups.as_view(), name='edxapp-groups'),
+    re_path(r'^group/(?P<name>[^/]+)/members/$', views.EdxappGroupMembers.as_view(), name='edxapp-group-members'),
     re_path(r'^update-user/$', views.EdxappUserUpdater.as_view(), name='edxapp-user-updater'),
-    re_path(r'^user-social-auth/$', views.EdxappUserSocialAuthentication.as_view(), name='edxapp-user-social-auth')
+    re_path(r'^update-user/bulk/$', views.EdxappUserUpdaterBulk.as_view(), name='edxapp-user-updater-bulk'),
+    re_path(r'^user-social-auth/$', views.EdxappUserSocialAuthentication.as_view(), name='edxapp-user-social-auth'),
+    re_path(
+        r'^user-social-auth/bulk/$',
+        views.EdxappUserSocialAuthenticationBulk.as_view(),
+        name='edxapp-user-social-auth-bulk',
+    ),
 
     # url(r'^course/$', views.EdxappCourse.as_view(), name='edxapp-courseinfo')
 
@@ -5,11 +5,13 @@ API v1 views.
 # pylint: disable=too-many-lines
 from __future__ import absolute_import, unicode_literals
 
+import hashlib
+import json
 import logging
 
 import edx_api_doc_tools as apidocs
-from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
+from django.http import StreamingHttpResponse
 #from django.utils import six
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
@@ -18,20 +20,42 @@ from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from eox_lms.api.v1.idempotency import idempotent
 from eox_lms.api.v1.permissions import EoxCoreAPIPermission
+from eox_lms.api.v1.representations import get_representation
+from eox_lms.cache import (
+    get_cached_group_names_for_users,
+    get_course_roster_version,
+    get_group_memberships_version,
+    get_groups_version,
+    get_user_fragments,
+    get_user_version,
+    get_user_versions,
+    set_user_fragments,
+    user_fragment_key,
+)
 from eox_lms.api.v1.serializers import (
     EdxappCourseEnrollmentQuerySerializer,
     EdxappCourseEnrollmentSerializer,
+    EdxappGroupMembersSerializer,
+    EdxappRetirementJobSerializer,
     # EdxappCoursePreEnrollmentSerializer,
     # EdxappGradeSerializer,
     EdxappUserQuerySerializer,
     EdxappUserReadOnlySerializer,
     EdxappUserSerializer,
+    EdxappUsersSetActiveSerializer,
     WrittableEdxappUserSerializer,
     EdxappUserSocialAuthSerializer,
-    EdxappUserSocialAuthQuerySerializer
+    EdxappUserSocialAuthQuerySerializer,
+    get_account_conflicts,
+    get_signup_source_counts,
 )
 from eox_lms.edxapp_wrapper.bearer_authentication import BearerAuthentication
+from eox_lms.models import RetirementJob, RetirementJobItem
+from eox_lms.profile_index import find_user_ids, get_indexed_fields
+from eox_lms.snapshots import get_site_snapshot
+from eox_lms.tasks import get_retirement_job_progress, start_retirement_job
 # from eox_lms.edxapp_wrapper.coursekey import get_valid_course_key
 # from eox_lms.edxapp_wrapper.courseware import get_courseware_courses
 from eox_lms.edxapp_wrapper.enrollments import create_enrollment, delete_enrollment, get_enrollment, update_enrollment, get_user_enrollments_for_course, get_user_enrollment_attributes
@@ -42,9 +66,28 @@ from eox_lms.edxapp_wrapper.enrollments import create_enrollment, delete_enrollm
 #     get_pre_enrollment,
 #     update_pre_enrollment,
 # )
-from eox_lms.edxapp_wrapper.users import create_edxapp_user, get_edxapp_user, get_edxapp_users, get_user_read_only_serializer
-from eox_lms.edxapp_wrapper.groups import get_group, get_groups, get_all_groups
-from eox_lms.edxapp_wrapper.user_social_auth import get_user_social_auths, add_user_social_auth
+from eox_lms.edxapp_wrapper.users import (
+    create_edxapp_user,
+    create_edxapp_users,
+    get_edxapp_user,
+    get_edxapp_users,
+    get_edxapp_users_by_identifiers,
+    get_user_read_only_serializer,
+    set_edxapp_users_active,
+    update_edxapp_users,
+)
+from eox_lms.edxapp_wrapper.groups import (
+    get_all_groups,
+    get_groups_with_member_counts,
+    set_user_groups,
+    sync_group_members,
+)
+from eox_lms.edxapp_wrapper.user_social_auth import (
+    add_user_social_auth,
+    add_user_social_auths,
+    get_user_social_auths,
+    get_user_social_auths_page,
+)
 # from eox_lms.edxapp_wrapper.courses import create_coursee
 
 try:
@@ -55,6 +98,20 @@ except ImportError:
         return lambda x: x
 
 LOG = logging.getLogger(__name__)
+MAX_PAGE_SIZE = 1000
+
+
+def get_page_param(query_params, name, default, minimum=0, maximum=None):
+    """
+    Read an integer paging parameter, e.g. OFFSET or LIMIT, clamped to
+    [minimum, maximum]. A value that is not an integer is a 400.
+    """
+    try:
+        value = int(query_params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValidationError(detail={name: "An integer is expected"})
+    value = max(value, minimum)
+    return value if maximum is None else min(value, maximum)
 
 
 class EdxappUserSocialAuthentication(APIView):
@@ -63,11 +120,97 @@ class EdxappUserSocialAuthentication(APIView):
     permission_classes = (EoxCoreAPIPermission,)
     renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
 
+    @apidocs.schema(
+        parameters=[
+            apidocs.query_parameter(
+                name="provider",
+                param_type=str,
+                description="**optional**, Only the social auths of this provider.",
+            ),
+            apidocs.query_parameter(
+                name="uid",
+                param_type=str,
+                description="**optional**, Only the social auths with this uid.",
+            ),
+            apidocs.query_parameter(
+                name="username",
+                param_type=str,
+                description="**optional**, Only the social auths of this user.",
+            ),
+            apidocs.query_parameter(
+                name="AFTER",
+                param_type=int,
+                description="**optional**, Cursor of the page, taken from the Link header of the previous one.",
+            ),
+            apidocs.query_parameter(
+                name="LIMIT",
+                param_type=int,
+                description="**optional**, Maximum number of social auths in the page, 1000 by default and at most.",
+            ),
+            apidocs.query_parameter(
+                name="stream",
+                param_type=bool,
+                description="**optional**, Stream every matching social auth as NDJSON instead of a page.",
+            ),
+        ],
+    )
     def get(self, request, *args, **kwargs):
         """
         Get the user Social Auths
+
+        **Example Requests**
+
+            GET /eox-lms/api/v1/user-social-auth/?provider=tpa-saml&LIMIT=500
+
+        The social auths are returned by pages in id order. When there may be
+        more of them, the response has a `Link` header with the URL of the next
+        page. With `stream=true` all the matching social auths are sent as
+        NDJSON, one object per line, read from the database page by page.
+
+        **Response details**
+
+        - `provider (str)`: Provider of the social auth
+        - `uid (str)`: Id of the user at the provider
+        - `username (str)`: Username of the user
+        """
+        filters = {
+            key: request.query_params[key] for key in ("provider", "uid", "username") if request.query_params.get(key)
+        }
+        after = get_page_param(request.query_params, "AFTER", 0)
+        limit = get_page_param(request.query_params, "LIMIT", MAX_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+
+        if request.query_params.get("stream", "").lower() in ("1", "true"):
+            return StreamingHttpResponse(
+                self.stream_auths(after, limit, filters),
+                content_type="application/x-ndjson",
+            )
+
+        auths = get_user_social_auths_page(after=after, limit=limit, **filters)
+        headers = {}
+        if auths and len(auths) == limit:
+            next_params = request.query_params.copy()
+            next_params["AFTER"] = auths[-1]["id"]
+            headers["Link"] = '<{}>; rel="next"'.format(request.build_absolute_uri("?" + next_params.urlencode()))
+        return Response([self.auth_row(auth) for auth in auths], headers=headers)
+
+    def stream_auths(self, after, limit, filters):
+        """
+        Yield every social auth after the given id as a line of NDJSON.
         """
-        return Response(self.get_auth_data(get_user_social_auths()))
+        while True:
+            auths = get_user_social_auths_page(after=after, limit=limit, **filters)
+            for auth in auths:
+                yield json.dumps(self.auth_row(auth)) + "\n"
+            if len(auths) < limit:
+                return
+            after = auths[-1]["id"]
+
+    @staticmethod
+    def auth_row(auth):
+        """
+        Return the representation of a social auth read by get_user_social_auths_page.
+        """
+        return {"provider": auth["provider"], "uid": auth["uid"], "username": auth["username"]}
 
     def post(self, request, *args, **kwargs):
         """
@@ -92,7 +235,8 @@ class EdxappUserSocialAuthentication(APIView):
         """
         Get the data from an auth query array
         """
-        data = [self.translate(EdxappUserSocialAuthSerializer(next).data) for next in auths]
+        represent = get_representation(EdxappUserSocialAuthSerializer)
+        data = [self.translate(represent(next)) for next in auths]
         return data
 
     def translate(self, auth):
@@ -113,6 +257,129 @@ class EdxappUserSocialAuthentication(APIView):
         return get_edxapp_user(**kwargs)
 
 
+class EdxappUserSocialAuthenticationBulk(APIView):
+    """
+    Handles the creation of many user social auths in a single request
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        body=EdxappUserSocialAuthQuerySerializer,
+        responses={
+            200: "Success, every link was created or already existed.",
+            202: "At least one of the links could not be created, see the error of each row.",
+            400: "Bad request, the body is not a list.",
+            401: "Unauthorized user to make the request.",
+        },
+    )
+    @audit_drf_api(
+        action="Create user social auths in bulk",
+        save_all_parameters=False,
+        method_name='eox_core_api_method',
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Creates many user social auths
+
+        **Example Requests**
+
+            POST /eox-lms/api/v1/user-social-auth/bulk/
+
+            Request data: [
+                {"username": "johndoe", "provider": "tpa-saml", "uid": "idp:johndoe"},
+                {"username": "janedoe", "provider": "tpa-saml", "uid": "idp:janedoe"}
+            ]
+
+        **Parameters**
+
+        Each row takes the same parameters as POST /eox-lms/api/v1/user-social-auth/.
+        The usernames and the existing links are read with one query per chunk of
+        rows, and the new links are inserted with a single bulk insert per chunk.
+        A link that already exists for the same user is not an error, so the
+        request can be repeated safely.
+
+        **Response details**
+
+        A list with one result per row, in the same order, with the row and:
+
+        - `status (str)`: `created`, or `exists` if the link was already there
+
+        Rows that could not be created have an `error` key instead.
+
+        **Returns**
+
+        - 200: Success, every link was created or already existed.
+        - 202: At least one of the links could not be created.
+        - 400: Bad request, the body is not a list.
+        - 401: Unauthorized user to make the request.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError(detail="A list of social auths is expected")
+
+        response_data = [None] * len(request.data)
+        valid_rows = []
+        for index, row in enumerate(request.data):
+            serializer = EdxappUserSocialAuthQuerySerializer(data=row)
+            if serializer.is_valid():
+                valid_rows.append((index, serializer.validated_data))
+            else:
+                response_data[index] = dict(row if isinstance(row, dict) else {}, error={"detail": serializer.errors})
+
+        results = add_user_social_auths([row for _, row in valid_rows])
+        for (index, row), (auth_status, error) in zip(valid_rows, results):
+            if error:
+                response_data[index] = dict(row, error={"detail": error})
+            else:
+                response_data[index] = dict(row, status=auth_status)
+
+        errors_in_bulk_response = any("error" in row for row in response_data)
+        return Response(
+            response_data,
+            status=status.HTTP_202_ACCEPTED if errors_in_bulk_response else status.HTTP_200_OK,
+        )
+
+
+class ConditionalGetMixin:
+    """
+    Provides strong ETags built from version stamps, so that a client polling
+    an unchanged resource gets a 304 without the response being serialized.
+    """
+
+    @staticmethod
+    def compute_etag(*parts):
+        """
+        Build a strong ETag out of the parts that identify a representation.
+        """
+        digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+        return '"{}"'.format(digest)
+
+    @staticmethod
+    def etag_matches(request, etag):
+        """
+        Check the If-None-Match header of the request against the etag.
+        """
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses the weak comparison function.
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        return etag in [candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates]
+
+    def conditional_response(self, request, etag, get_data):
+        """
+        Return a 304 if the client already has the representation identified by
+        etag, otherwise call get_data and return its result with the ETag header.
+        """
+        if self.etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(get_data(), headers={"ETag": etag})
+
+
 class UserQueryMixin:
     """
     Provides tools to create user queries
@@ -183,42 +450,76 @@ class UserQueryMixin:
         return user_query
 
 
-    def serialize(self, user, request):
-        """ Serialize the user data addming the groups """
-        admin_fields = getattr(settings, "ACCOUNT_VISIBILITY_CONFIGURATION", {}).get(
-            "admin_fields", {}
-        )
-        serialized_user = EdxappUserReadOnlySerializer(
-            user, custom_fields=admin_fields, context={"request": request}
+    def get_admin_fields(self):
+        """ Get the fields exposed to admins on the user representation """
+        return get_site_snapshot(self.site).admin_fields
+
+    def get_representation_variant(self, request):
+        """ Identify everything besides the user that changes the user representation """
+        return ConditionalGetMixin.compute_etag(
+            getattr(self.site, "domain", None),
+            request.get_host(),
+            get_site_snapshot(self.site).admin_fields_hash,
+            get_groups_version(),
+        ).strip('"')
+
+    def get_user_etag(self, user, request):
+        """ Get the ETag of the representation built by serialize """
+        return ConditionalGetMixin.compute_etag(
+            "user",
+            user.pk,
+            get_user_version(user.pk),
+            self.get_representation_variant(request),
         )
-        user_json = self.write_groups(user, serialized_user.data)
-        user_json["first_name"] = getattr(user, "first_name")
-        user_json["last_name"] = getattr(user, "last_name")
-        return user_json
 
+    def serialize(self, user, request):
+        """ Serialize the user data addming the groups """
+        return self.serialize_many([user], request)[0]
 
-    def write_groups(self, user, json):
+    def serialize_many(self, users, request):
+        """
+        Serialize a list of users, reading the representations from the cache
+        and serializing only the missing ones in a single batch.
+        """
+        variant = self.get_representation_variant(request)
+        versions = get_user_versions([user.pk for user in users])
+        keys = {user.pk: user_fragment_key(user.pk, versions[user.pk], variant) for user in users}
+        fragments = get_user_fragments(list(keys.values()))
+
+        misses = [user for user in users if keys[user.pk] not in fragments]
+        if misses:
+            serialized_users = EdxappUserReadOnlySerializer(
+                misses, many=True, custom_fields=self.get_admin_fields(), context={"request": request}
+            ).data
+            group_names = get_cached_group_names_for_users([user.pk for user in misses])
+            fresh_fragments = {}
+            for user, serialized_user in zip(misses, serialized_users):
+                user_json = self.write_groups(user, serialized_user, group_names[user.pk])
+                user_json["first_name"] = getattr(user, "first_name")
+                user_json["last_name"] = getattr(user, "last_name")
+                fresh_fragments[keys[user.pk]] = user_json
+            set_user_fragments(fresh_fragments)
+            fragments.update(fresh_fragments)
+
+        return [fragments[keys[user.pk]] for user in users]
+
+    def write_groups(self, user, json, group_names=None):
         """ Add the group data into the user response """
         user_json = {}
         for next in json:
             user_json[next] = json[next]
 
-        user_json[self.groups_attr()] = []
-        for next in get_groups(user):
-            user_json[self.groups_attr()].append(next.name)
+        if group_names is None:
+            group_names = get_cached_group_names_for_users([user.pk])[user.pk]
+        user_json[self.groups_attr()] = list(group_names)
 
         return user_json
 
 
     def manage_groups(self, user, add, remove):
-        """ Manage the groups for the user """
-        for next in add:
-            group = get_group(next)
-            user.groups.add(group)
-
-        for next in remove:
-            group = get_group(next)
-            user.groups.remove(group)
+        """ Manage the groups for the user, returning a message for the unknown group names """
+        unknown = set_user_groups(user, add=add, remove=remove)
+        return ["Unknown groups: {}".format(", ".join(unknown))] if unknown else []
 
     def groups(self, json):
         """ Get the groups from the json """
@@ -247,7 +548,7 @@ class UserQueryMixin:
         return "remove"
 
 
-class EdxappUser(UserQueryMixin, APIView):
+class EdxappUser(UserQueryMixin, ConditionalGetMixin, APIView):
 
     """
     Handles the creation of a User on edxapp
@@ -318,10 +619,11 @@ class EdxappUser(UserQueryMixin, APIView):
             "username",
             "fullname",
         ],
-        hidden_fields=["password"],
+        hidden_fields=["password", "password_hash"],
         save_all_parameters=True,
         method_name='eox_core_api_method',
     )
+    @idempotent
     def post(self, request, *args, **kwargs):
         """
         Handles the creation of a User on edxapp
@@ -357,6 +659,14 @@ class EdxappUser(UserQueryMixin, APIView):
         - `skip_password` (**optional**, boolean, default=False, _body_):
             Flag indicating whether the password should be omitted.
 
+        - `password_hash` (**optional**, string, _body_):
+            A password already hashed in a format of the PASSWORD_HASHERS setting, e.g. exported
+            from another Open edX. It is stored as is and replaces `password`.
+
+        - `Idempotency-Key` (string, _header_):
+            A key chosen by the client. A retry with the same key gets the response of the first request
+            back instead of running again.
+
         If you have extra registration fields configured in your settings or extended_profile fields, you can send them with the rest of the parameters.
         These extra fields would be required depending on the site settings.
         For example:
@@ -383,7 +693,8 @@ class EdxappUser(UserQueryMixin, APIView):
         data["site"] = get_current_site(request)
         user, msg = create_edxapp_user(**data)
 
-        self.groups(request.data) and self.manage_groups(user, self.groups(request.data), [])
+        if self.groups(request.data):
+            msg = (msg or []) + self.manage_groups(user, self.groups(request.data), [])
 
         serialized_user = EdxappUserSerializer(user)
         response_data = serialized_user.data
@@ -427,6 +738,11 @@ class EdxappUser(UserQueryMixin, APIView):
               "username": "johndoe",
             }
 
+        Without username or email, the users can be looked up by one of the extended
+        profile fields listed in EOX_CORE_INDEXED_PROFILE_FIELDS, e.g.
+        GET /eox-lms/api/v1/user/?personal_id=00099. The value is matched ignoring
+        case and surrounding spaces, and a list with the matching users is returned.
+
         **Response details**
 
         - `username (str)`: Username of the edxapp user
@@ -469,9 +785,28 @@ class EdxappUser(UserQueryMixin, APIView):
         query = self.get_user_query(request)
         print("Query = {}".format(query))
 
-        data = self.get_single_user(query, request) if self.single_request(query) else self.get_all_users(query, request)
-
-        return Response(data)
+        if self.single_request(query):
+            user = get_edxapp_user(**query)
+            return self.conditional_response(
+                request,
+                self.get_user_etag(user, request),
+                lambda: self.serialize(user, request),
+            )
+
+        indexed_field = self.get_indexed_field_query(request)
+        if indexed_field:
+            user_ids = find_user_ids(*indexed_field, site=self.site)
+            users = get_edxapp_users_by_identifiers(ids=user_ids) if user_ids else []
+            return Response(self.serialize_many(sorted(users, key=lambda user: user.pk), request))
+
+        return Response(self.get_all_users(query, request))
+
+    def get_indexed_field_query(self, request):
+        """ Return the (field_name, value) of the first indexed profile field in the query params, if any """
+        for field_name in get_indexed_fields():
+            if request.query_params.get(field_name):
+                return field_name, request.query_params[field_name]
+        return None
 
     def single_request(self, query):
         """ Return true if the query is a single user request """
@@ -486,10 +821,383 @@ class EdxappUser(UserQueryMixin, APIView):
     def get_all_users(self, query, request):
         """ Get all the users for edx """
         users = get_edxapp_users(**query)
-        data = []
-        for next in users:
-            data.append(self.serialize(next, request))
-        return data
+        return self.serialize_many(list(users), request)
+
+
+class EdxappUserBulk(UserQueryMixin, APIView):
+    """
+    Handles the creation of many Users on edxapp in a single request
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        body=EdxappUserQuerySerializer,
+        responses={
+            200: EdxappUserSerializer,
+            202: "At least one of the users could not be created, see the error of each row.",
+            400: "Bad request, the body is not a list.",
+            401: "Unauthorized user to make the request.",
+        },
+    )
+    @audit_drf_api(
+        action="Create edxapp users in bulk",
+        hidden_fields=["password", "password_hash"],
+        save_all_parameters=False,
+        method_name='eox_core_api_method',
+    )
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        """
+        Handles the creation of many Users on edxapp
+
+        **Example Requests**
+
+            POST /eox-lms/api/v1/user/bulk/
+
+            Request data: [
+                {
+                    "username": "johndoe",
+                    "email": "johndoe@example.com",
+                    "fullname": "John Doe",
+                    "password": "p@ssword",
+                },
+                {
+                    "username": "janedoe",
+                    "email": "janedoe@example.com",
+                    "fullname": "Jane Doe",
+                    "skip_password": true,
+                    "groups": ["learners"],
+                }
+            ]
+
+        **Parameters**
+
+        Each row takes the same parameters as POST /eox-lms/api/v1/user/.
+        The rows are validated first, then the valid ones are inserted in chunks.
+        Sending `password_hash` instead of `password` avoids hashing the passwords
+        during the request.
+        The `Idempotency-Key` header is supported as in POST /eox-lms/api/v1/user/.
+
+        **Returns**
+
+        A list with one result per row, in the same order. Rows that could not be
+        created are returned without the password and with an `error` key.
+
+        - 200: Success, all the users were created.
+        - 202: At least one of the users could not be created.
+        - 400: Bad request, the body is not a list.
+        - 401: Unauthorized user to make the request.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError(detail="A list of users is expected")
+
+        response_data = [None] * len(request.data)
+        valid_rows = []
+        account_conflicts = get_account_conflicts(request.data)
+        for index, row in enumerate(request.data):
+            serializer = EdxappUserQuerySerializer(data=row, context={"account_conflicts": account_conflicts})
+            if serializer.is_valid():
+                valid_rows.append((index, serializer.validated_data))
+            else:
+                response_data[index] = self.row_error(row, serializer.errors)
+
+        results = create_edxapp_users(
+            [row for _, row in valid_rows],
+            site=get_current_site(request),
+        )
+        represent = get_representation(EdxappUserSerializer)
+        for (index, row), (user, msg) in zip(valid_rows, results):
+            if user is None:
+                response_data[index] = self.row_error(row, msg)
+                continue
+
+            groups = self.groups(request.data[index])
+            if groups:
+                msg = (msg or []) + self.manage_groups(user, groups, [])
+
+            user_data = self.write_groups(user, represent(user))
+            if msg:
+                user_data["messages"] = msg
+            response_data[index] = user_data
+
+        errors_in_bulk_response = any("error" in row for row in response_data)
+        return Response(
+            response_data,
+            status=status.HTTP_202_ACCEPTED if errors_in_bulk_response else status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def row_error(row, detail):
+        """
+        Return a row of the request, without its password, marked with an error.
+        """
+        row_data = {key: value for key, value in row.items() if key not in ("password", "password_hash")}
+        row_data["error"] = {
+            "detail": detail,
+        }
+        return row_data
+
+
+class EdxappUserBulkSetActive(APIView):
+    """
+    Activates or deactivates all the users that match a predicate
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        body=EdxappUsersSetActiveSerializer,
+        responses={
+            200: "Success, the matching users were updated, or counted with dry_run.",
+            400: "Bad request, is_active or the predicate is missing or invalid.",
+            401: "Unauthorized user to make the request.",
+        },
+    )
+    @audit_drf_api(
+        action="Activate or deactivate edxapp users in bulk",
+        save_all_parameters=True,
+        method_name='eox_core_api_method',
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Activates or deactivates all the users that match a predicate.
+
+        **Example Requests**
+
+            POST /eox-lms/api/v1/user/bulk-set-active/
+
+            Request data: {
+                "is_active": false,
+                "last_login_before": "2024-01-01T00:00:00Z",
+                "email_domain": "example.com",
+                "dry_run": true
+            }
+
+        **Parameters**
+
+        - `is_active` (**required**, boolean, _body_):
+            Value set on the matching users.
+
+        - `usernames`, `emails` (**optional**, list, _body_):
+            Explicit list of users.
+
+        - `last_login_before` (**optional**, datetime, _body_):
+            Users that did not log in since that moment, or never did.
+
+        - `email_domain` (**optional**, string, _body_):
+            Users with an email in that domain.
+
+        - `group` (**optional**, string, _body_):
+            Members of that group.
+
+        - `current_site` (**optional**, boolean, _body_):
+            Users with a signup source on the current site.
+
+        - `dry_run` (**optional**, boolean, _body_):
+            Only count the users that would be updated.
+
+        At least one of the conditions is required, and the users must match all
+        of the given ones. Staff users and superusers are never changed. The users
+        are updated with set based UPDATEs in chunks, without loading them.
+
+        **Response details**
+
+        - `updated (int)`: Users updated, or that would be with dry_run
+        - `unchanged (int)`: Users matched that already had the given is_active
+
+        **Returns**
+
+        - 200: Success, the matching users were updated, or counted with dry_run.
+        - 400: Bad request, is_active or the predicate is missing or invalid.
+        - 401: Unauthorized user to make the request.
+        """
+        serializer = EdxappUsersSetActiveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+
+        if data.pop("current_site"):
+            data["domain"] = get_current_site(request).domain
+        return Response(dict(set_edxapp_users_active(**data), dry_run=data["dry_run"]))
+
+
+class EdxappUserRetirementJobs(APIView):
+    """
+    Starts bulk retirements of users
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        body=EdxappRetirementJobSerializer,
+        responses={
+            202: "Accepted, the users will be retired by the task worker.",
+            400: "Bad request, the case_id or the users are missing.",
+            401: "Unauthorized user to make the request.",
+        },
+    )
+    @audit_drf_api(
+        action="Retire edxapp users in bulk",
+        save_all_parameters=True,
+        method_name='eox_core_api_method',
+    )
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        """
+        Starts the retirement of many users from the current site.
+
+        **Example Requests**
+
+            POST /eox-lms/api/v1/user/retirement-job/
+
+            Request data: {
+                "usernames": ["johndoe", "janedoe"],
+                "emails": ["jimdoe@example.com"],
+                "case_id": "GDPR-1234",
+                "is_support_user": false
+            }
+
+        **Parameters**
+
+        - `usernames`, `emails` (**optional**, list, _body_):
+            Users to retire, at least one is required.
+
+        - `case_id` (**required**, string, _body_):
+            Case of the retirement, added to the retired emails.
+
+        - `is_support_user` (**optional**, boolean, _body_):
+            Whether the retirement is requested by support.
+
+        The users are retired in the background by the eox_lms_run_tasks worker,
+        in transactions of EOX_CORE_RETIREMENT_CHUNK_SIZE users, each user like
+        a single deletion does: a user that only signed up on the current site is
+        retired, a user with other signup sources only loses the one of this site.
+        Follow the progress with GET /eox-lms/api/v1/user/retirement-job/<id>/.
+
+        **Response details**
+
+        - `id (int)`: Id of the retirement job
+        - `total (int)`: Users to retire
+        - `not_found (list)`: Usernames and emails that match no user
+
+        **Returns**
+
+        - 202: Accepted, the users will be retired by the task worker.
+        - 400: Bad request, the case_id or the users are missing.
+        - 401: Unauthorized user to make the request.
+        """
+        serializer = EdxappRetirementJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        usernames = data.get("usernames", [])
+        emails = data.get("emails", [])
+
+        users = get_edxapp_users_by_identifiers(usernames=usernames, emails=emails)
+        # The identifiers match the users case insensitively
+        found = {user.username.lower() for user in users} | {user.email.lower() for user in users}
+        not_found = [identifier for identifier in usernames + emails if identifier.lower() not in found]
+
+        job = start_retirement_job(
+            [user.id for user in users],
+            case_id=data["case_id"],
+            site=get_current_site(request),
+            is_support_user=data["is_support_user"],
+        )
+        return Response(
+            {"id": job.id, "total": len({user.id for user in users}), "not_found": not_found},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class EdxappUserRetirementJob(APIView):
+    """
+    Reports the progress of a bulk retirement of users
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        parameters=[
+            apidocs.query_parameter(
+                name="status",
+                param_type=str,
+                description="**optional**, Only the users with this outcome: pending, succeeded or failed.",
+            ),
+            apidocs.query_parameter(
+                name="OFFSET",
+                param_type=int,
+                description="**optional**, Number of users to skip, 0 by default.",
+            ),
+            apidocs.query_parameter(
+                name="LIMIT",
+                param_type=int,
+                description="**optional**, Maximum number of users returned, 1000 by default and at most.",
+            ),
+        ],
+        responses={
+            200: "Success, the progress of the job.",
+            400: "Bad request, OFFSET or LIMIT is not an integer.",
+            401: "Unauthorized user to make the request.",
+            404: "Retirement job not found on the current site.",
+        },
+    )
+    def get(self, request, job_id, *args, **kwargs):
+        """
+        Reports the progress of a retirement job and the outcome of its users.
+
+        **Example Requests**
+
+            GET /eox-lms/api/v1/user/retirement-job/12/?status=failed
+
+        **Parameters**
+
+        - `status` (**optional**, string, _query_):
+            Only list the users with this outcome.
+
+        - `OFFSET` and `LIMIT` (**optional**, integer, _query_):
+            Page of the users, ordered by id.
+
+        **Response details**
+
+        - `id (int)`: Id of the retirement job
+        - `case_id (str)`: Case of the retirement
+        - `total`, `pending`, `succeeded`, `failed` (int): Users of the job by outcome
+        - `finished (bool)`: Whether no user is pending
+        - `users (list)`: Page of the users, with their `user_id`, `status` and `detail`.
+          The details of the failures leave out the usernames and emails.
+
+        **Returns**
+
+        - 200: Success, the progress of the job.
+        - 401: Unauthorized user to make the request.
+        - 404: Retirement job not found on the current site.
+        """
+        job = RetirementJob.objects.filter(pk=job_id, site_id=get_current_site(request).id).first()
+        if job is None:
+            raise NotFound("Retirement job {} not found".format(job_id))
+
+        offset = get_page_param(request.query_params, "OFFSET", 0)
+        limit = get_page_param(request.query_params, "LIMIT", MAX_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+        items = RetirementJobItem.objects.filter(job=job).order_by("user_id")
+        if request.query_params.get("status"):
+            items = items.filter(status=request.query_params["status"])
+
+        progress = get_retirement_job_progress(job)
+        return Response(dict(
+            progress,
+            id=job.id,
+            case_id=job.case_id,
+            finished=not progress[RetirementJobItem.STATUS_PENDING],
+            users=list(items.values("user_id", "status", "detail")[offset:offset + limit]),
+        ))
 
 
 class EdxappUserUpdater(UserQueryMixin, APIView):
@@ -665,13 +1373,333 @@ class EdxappUserUpdater(UserQueryMixin, APIView):
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
-        self.manage_groups(user, self.groups_add(data), self.groups_remove(data))
+        messages = self.manage_groups(user, self.groups_add(data), self.groups_remove(data))
 
         data = self.serialize(user, request)
+        if messages:
+            data = dict(data, messages=messages)
         return Response(data)
 
 
-class EdxappEnrollment(UserQueryMixin, APIView):
+class EdxappUserUpdaterBulk(UserQueryMixin, APIView):
+    """
+    Partially updates many users from edxapp in a single request
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        body=WrittableEdxappUserSerializer,
+        parameters=[
+            apidocs.query_parameter(
+                name="full",
+                param_type=bool,
+                description="**optional**, Return the full representation of every updated user.",
+            ),
+        ],
+        responses={
+            200: "Success, all the users were updated.",
+            202: "At least one of the users could not be updated, see the error of each row.",
+            400: "Bad request, the body is not a list.",
+            401: "Unauthorized user to make the request.",
+        },
+    )
+    @audit_drf_api(
+        action="Partially update edxapp users in bulk",
+        hidden_fields=["password"],
+        save_all_parameters=False,
+        method_name='eox_core_api_method',
+    )
+    def patch(self, request, *args, **kwargs):
+        """
+        Partially updates many users from edxapp.
+
+        **Example Requests**
+
+            PATCH /eox-lms/api/v1/update-user/bulk/
+
+            Request data: [
+                {
+                    "username": "johndoe",
+                    "fullname": "John Doe R",
+                },
+                {
+                    "email": "janedoe@example.com",
+                    "is_active": false,
+                    "groups": {"remove": ["learners"]},
+                }
+            ]
+
+        **Parameters**
+
+        Each row takes the same parameters as PATCH /eox-lms/api/v1/update-user/,
+        and identifies its user by `username`, or by `email` when no username is
+        given. All the users are read with a single query, and the changed
+        columns are written with bulk updates in chunks.
+
+        - `full` (**optional**, boolean, _query_):
+            Return the full representation of every updated user, as
+            PATCH /eox-lms/api/v1/update-user/ does.
+
+        **Response details**
+
+        A list with one result per row, in the same order. By default the result
+        of an updated row only has:
+
+        - `id (int)`: Id of the user
+        - `username (str)`: Username of the user
+        - `updated (list)`: Columns that changed, empty if the row changed nothing
+        - `messages (list)`: Only present if some of the groups of the row do not exist
+
+        Rows that could not be updated are returned without the password and with
+        an `error` key.
+
+        **Returns**
+
+        - 200: Success, all the users were updated.
+        - 202: At least one of the users could not be updated.
+        - 400: Bad request, the body is not a list.
+        - 401: Unauthorized user to make the request.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError(detail="A list of users is expected")
+
+        rows = request.data
+        response_data = [None] * len(rows)
+        users = get_edxapp_users_by_identifiers(
+            usernames=[row["username"] for row in rows if isinstance(row, dict) and row.get("username")],
+            emails=[
+                row["email"] for row in rows if isinstance(row, dict) and not row.get("username") and row.get("email")
+            ],
+        )
+        users_by_username = {user.username.lower(): user for user in users}
+        users_by_email = {user.email.lower(): user for user in users}
+        context = {"signup_source_counts": get_signup_source_counts(users)}
+
+        updates = []
+        claimed_users = set()
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                response_data[index] = {"error": {"detail": "A JSON object is expected"}}
+                continue
+            if row.get("username"):
+                user = users_by_username.get(str(row["username"]).lower())
+            elif row.get("email"):
+                user = users_by_email.get(str(row["email"]).lower())
+            else:
+                response_data[index] = EdxappUserBulk.row_error(row, "Email or username needed")
+                continue
+            if user is None:
+                response_data[index] = EdxappUserBulk.row_error(row, "No user found")
+                continue
+            if user.pk in claimed_users:
+                response_data[index] = EdxappUserBulk.row_error(row, "The user is updated by a previous row")
+                continue
+            claimed_users.add(user.pk)
+
+            serializer = WrittableEdxappUserSerializer(user, data=row, partial=True, context=context)
+            if not serializer.is_valid():
+                response_data[index] = EdxappUserBulk.row_error(row, serializer.errors)
+                continue
+            user_fields, profile_fields = serializer.apply_changes(user, serializer.validated_data)
+            updates.append((index, user, user_fields, profile_fields))
+
+        errors = update_edxapp_users([update[1:] for update in updates])
+        return self.bulk_response(request, rows, response_data, updates, errors)
+
+    def bulk_response(self, request, rows, response_data, updates, errors):
+        """
+        Manage the groups of the updated rows and fill in their results.
+        """
+        updated = []
+        for (index, user, user_fields, profile_fields), error in zip(updates, errors):
+            if error:
+                response_data[index] = EdxappUserBulk.row_error(rows[index], error)
+                continue
+            messages = self.manage_groups(user, self.groups_add(rows[index]), self.groups_remove(rows[index]))
+            updated.append((index, user, user_fields + profile_fields, messages))
+
+        if request.query_params.get("full", "").lower() in ("1", "true"):
+            serialized_users = self.serialize_many([user for _, user, _, _ in updated], request)
+        else:
+            serialized_users = [
+                {"id": user.pk, "username": user.username, "updated": sorted(fields)} for _, user, fields, _ in updated
+            ]
+        for (index, _, _, messages), user_data in zip(updated, serialized_users):
+            response_data[index] = dict(user_data, messages=messages) if messages else user_data
+
+        errors_in_bulk_response = any("error" in row for row in response_data)
+        return Response(
+            response_data,
+            status=status.HTTP_202_ACCEPTED if errors_in_bulk_response else status.HTTP_200_OK,
+        )
+
+
+class EdxappGroups(ConditionalGetMixin, APIView):
+    """
+    Handles the listing of the groups
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        parameters=[
+            apidocs.query_parameter(
+                name="current_site",
+                param_type=bool,
+                description="**optional**, Only count the members that signed up on the current site.",
+            ),
+            apidocs.query_parameter(
+                name="OFFSET",
+                param_type=int,
+                description="**optional**, Number of groups to skip, 0 by default.",
+            ),
+            apidocs.query_parameter(
+                name="LIMIT",
+                param_type=int,
+                description="**optional**, Maximum number of groups returned, 1000 by default and at most.",
+            ),
+        ],
+        responses={
+            200: "Success, a page of the groups.",
+            304: "The groups and their members did not change since the given ETag.",
+            400: "Bad request, OFFSET or LIMIT is not an integer.",
+            401: "Unauthorized user to make the request.",
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Lists the groups with the number of members of each.
+
+        **Example Requests**
+
+            GET /eox-lms/api/v1/group/?current_site=true&LIMIT=100
+
+        **Parameters**
+
+        - `current_site` (**optional**, boolean, _query_):
+            Only count the members that signed up on the current site.
+
+        - `OFFSET` and `LIMIT` (**optional**, integer, _query_):
+            Page of the groups, ordered by name.
+
+        The counts are computed with a single query. The response carries an ETag
+        that only changes when a group or a membership changes, send it back in
+        If-None-Match to get a 304.
+
+        **Response details**
+
+        A list with an item per group:
+
+        - `name (str)`: Name of the group
+        - `member_count (int)`: Number of members of the group
+
+        **Returns**
+
+        - 200: Success, a page of the groups.
+        - 304: The groups and their members did not change since the given ETag.
+        - 401: Unauthorized user to make the request.
+        """
+        offset = get_page_param(request.query_params, "OFFSET", 0)
+        limit = get_page_param(request.query_params, "LIMIT", MAX_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+        domain = None
+        if request.query_params.get("current_site", "").lower() in ("1", "true"):
+            domain = get_current_site(request).domain
+
+        etag = self.compute_etag(
+            "groups",
+            get_groups_version(),
+            get_group_memberships_version(),
+            domain,
+            offset,
+            limit,
+        )
+        return self.conditional_response(
+            request,
+            etag,
+            lambda: get_groups_with_member_counts(domain=domain, offset=offset, limit=limit),
+        )
+
+
+class EdxappGroupMembers(APIView):
+    """
+    Handles the membership of a group as a whole
+    """
+
+    authentication_classes = (BearerAuthentication, SessionAuthentication)
+    permission_classes = (EoxCoreAPIPermission,)
+    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+
+    @apidocs.schema(
+        body=EdxappGroupMembersSerializer,
+        responses={
+            200: "Success, the group has exactly the given members.",
+            400: "Bad request, neither usernames nor emails were given.",
+            401: "Unauthorized user to make the request.",
+            404: "Group not found.",
+        },
+    )
+    @audit_drf_api(
+        action="Replace the members of a group",
+        save_all_parameters=False,
+        method_name='eox_core_api_method',
+    )
+    def put(self, request, name, *args, **kwargs):
+        """
+        Replaces the members of a group.
+
+        **Example Requests**
+
+            PUT /eox-lms/api/v1/group/learners/members/
+
+            Request data: {
+                "usernames": ["johndoe", "janedoe"],
+                "emails": ["jimdoe@example.com"]
+            }
+
+        **Parameters**
+
+        - `usernames` (**optional**, list, _body_):
+            Usernames of the desired members.
+
+        - `emails` (**optional**, list, _body_):
+            Emails of the desired members.
+
+        At least one of the lists is required. The users in either of them become
+        the members of the group and every other member is removed, so an empty
+        list removes all the members. The current membership is compared with the
+        desired one and only the difference is written, with bulk inserts and
+        deletes.
+
+        **Response details**
+
+        - `added (int)`: Users added to the group
+        - `removed (int)`: Users removed from the group
+        - `unchanged (int)`: Users that already were members
+        - `not_found (list)`: Usernames and emails that match no user
+
+        **Returns**
+
+        - 200: Success, the group has exactly the given members.
+        - 400: Bad request, neither usernames nor emails were given.
+        - 401: Unauthorized user to make the request.
+        - 404: Group not found.
+        """
+        serializer = EdxappGroupMembersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(sync_group_members(
+            name,
+            usernames=serializer.validated_data.get("usernames", []),
+            emails=serializer.validated_data.get("emails", []),
+        ))
+
+
+class EdxappEnrollment(UserQueryMixin, ConditionalGetMixin, APIView):
     """
     Handles API requests to create users
     """
@@ -700,6 +1728,7 @@ class EdxappEnrollment(UserQueryMixin, APIView):
         ],
         method_name='eox_core_api_method',
     )
+    @idempotent
     def post(self, request, *args, **kwargs):
         """
         Handle creation of single or bulk enrollments
@@ -752,6 +1781,10 @@ class EdxappEnrollment(UserQueryMixin, APIView):
             - name: name of the attribute
             - value: value of the attribute
 
+        - `Idempotency-Key` (string, _header_):
+            A key chosen by the client. A retry with the same key gets the response of the first request
+            back instead of running again.
+
         In case the case of bulk enrollments, you must provide a list of dictionaries containing
         the parameters specified above; the same restrictions apply.
         For example:
@@ -811,6 +1844,7 @@ class EdxappEnrollment(UserQueryMixin, APIView):
         ],
         method_name='eox_core_api_method',
     )
+    @idempotent
     def put(self, request, *args, **kwargs):
         """
         Update enrollments on edxapp
@@ -910,18 +1944,9 @@ class EdxappEnrollment(UserQueryMixin, APIView):
         # if errors:
         #     raise ValidationError(detail=errors)
 
-        enrollments_serialized = []
-        for enrollment in enrollment_set.iterator():
-            enrollment_model_serialized = EdxappCourseEnrollmentSerializer(enrollment).data
-            #enrollment_model_serialized['enrollment_attributes'] = get_user_enrollment_attributes(enrollment.username,
-            #                                                                                      course_id.replace(' ',
-            #                                                                                                        '+'))
-            # enrollment_model_serialized['course_id'] = course_id.replace(' ', '+')
-            enrollment_model_serialized['user'] = enrollment.username
-            enrollments_serialized.append(enrollment_model_serialized)
-
-        response = EdxappCourseEnrollmentSerializer(enrollments_serialized, many=True).data
-        return response
+        # Serialized once, the username field reads the user of the enrollment
+        represent = get_representation(EdxappCourseEnrollmentSerializer)
+        return [represent(enrollment) for enrollment in enrollment_set.iterator()]
 
 
     def get_single_user_enrollment(self , course_id , request):
@@ -975,10 +2000,20 @@ class EdxappEnrollment(UserQueryMixin, APIView):
 
         if self.is_get_single_user_enrollment(request):
             response = self.get_single_user_enrollment(course_id , request)
-        else:
-            response = self.get_users_enrolled_in_course(course_id, query_params)
-
-        return Response(response)
+            return Response(response)
+
+        roster_etag = self.compute_etag(
+            "course-roster",
+            course_id,
+            get_course_roster_version(course_id.replace(' ', '+')),
+            query_params.get("OFFSET", 0),
+            query_params.get("LIMIT", 1000),
+        )
+        return self.conditional_response(
+            request,
+            roster_etag,
+            lambda: self.get_users_enrolled_in_course(course_id, query_params),
+        )
 
 
     @apidocs.schema(
@@ -37,6 +37,9 @@ class EoxCoreConfig(AppConfig):
             # During image build / translations / collectstatic
             pass
 
+        from eox_lms.receivers import connect_receivers
+        connect_receivers()
+
 
 # class EoxCoreCMSConfig(EoxCoreConfig):
 #     """App configuration"""
@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Bloom filter of the usernames and emails already taken in the platform.
+
+Most conflict checks are for names that do not exist yet. The filter answers
+those without going through the exact checks: a definite "absent" skips them,
+while a "maybe" falls through to the database. The filter holds the
+lowercased usernames and emails of every user, which include the retired
+hashes that retired accounts are renamed to, and the original usernames of
+the retirement statuses, so looking up a name together with its retired
+hashes covers the same ground as username_exists_or_retired and
+email_exists_or_retired.
+
+The bits live in the file EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH, memory mapped
+by every worker of a host. The file is built by the
+eox_lms_build_account_filter command or, when
+EOX_CORE_ACCOUNT_BLOOM_FILTER_BUILD_ON_WARMUP is set, by a task queued on
+first use for the task worker of the host. Until the file exists every check
+goes to the database.
+
+New identifiers reach the filters of every host through a log kept in the
+shared cache: add_account_identifiers appends them once the transaction
+commits and, before answering "absent", a worker replays the entries its host
+has not applied yet. If the log cannot be followed (the cache lost it, or an
+entry is missing) the filter answers "maybe" until it is rebuilt.
+
+Bits are never cleared, so a stale filter only produces more "maybe" answers;
+rebuilding with reset drops them.
+"""
+import fcntl
+import functools
+import hashlib
+import logging
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from eox_lms.cache import cache
+from eox_lms.edxapp_wrapper.users import get_account_identifiers
+
+LOG = logging.getLogger(__name__)
+
+# magic, size in bits, number of hashes, applied log sequence, log id
+HEADER = struct.Struct("<8sQQQ32s")
+MAGIC = b"EOXBLOOM"
+
+LOG_ID_KEY = "eox-lms:account-filter:log-id"
+LOG_SEQUENCE_KEY = "eox-lms:account-filter:log-sequence"
+LOG_ENTRY_KEY_PREFIX = "eox-lms:account-filter:log-entry"
+BUILD_QUEUED_KEY_PREFIX = "eox-lms:account-filter:build-queued"
+# Seconds before the build of a filter that is still missing is queued again
+BUILD_QUEUED_TIMEOUT = 3600
+MAX_REPLAYED_ENTRIES = 1000
+
+
+def normalize(value):
+    """
+    Return the form in which a username or email is stored in the filter.
+    """
+    return value.lower()
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """
+    Hold an exclusive lock on path across processes.
+
+    Yields False, without the lock, when blocking is False and the lock is
+    held by someone else.
+    """
+    with open(path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class BloomFilter:
+    """
+    Bloom filter stored in a memory mapped file shared between processes.
+
+    Writers must hold file_lock(lock_path), since setting a bit rewrites its
+    whole byte.
+    """
+
+    def __init__(self, path, lock_path=None):
+        self.path = path
+        self.lock_path = lock_path or path + ".lock"
+        with open(path, "r+b") as bloom_file:
+            self._mmap = mmap.mmap(bloom_file.fileno(), 0)
+            stat = os.fstat(bloom_file.fileno())
+        self.file_id = (stat.st_dev, stat.st_ino)
+
+        magic, self.size, self.hashes, _, _ = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or len(self._mmap) != HEADER.size + self.size // 8:
+            self._mmap.close()
+            raise ValueError("{} is not a valid account filter".format(path))
+
+    @classmethod
+    def create(cls, path, size, hashes, lock_path=None):
+        """
+        Write an empty filter of size bits to path and open it.
+        """
+        size -= size % 8
+        with open(path, "wb") as bloom_file:
+            bloom_file.write(HEADER.pack(MAGIC, size, hashes, 0, b""))
+            bloom_file.truncate(HEADER.size + size // 8)
+        return cls(path, lock_path)
+
+    @property
+    def log_position(self):
+        """
+        Return the (log id, sequence) of the last log entry applied.
+        """
+        _, _, _, sequence, log_id = HEADER.unpack_from(self._mmap)
+        return log_id.rstrip(b"\0").decode("ascii"), sequence
+
+    def set_log_position(self, log_id, sequence):
+        """
+        Record the last log entry applied.
+        """
+        HEADER.pack_into(self._mmap, 0, MAGIC, self.size, self.hashes, sequence, log_id.encode("ascii"))
+
+    def _positions(self, value):
+        """
+        Return the bits of a value, derived from two halves of a single digest.
+        """
+        digest = hashlib.blake2b(normalize(value).encode("utf-8"), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def __contains__(self, value):
+        for position in self._positions(value):
+            if not self._mmap[HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, values):
+        """
+        Set the bits of every value.
+        """
+        for value in values:
+            for position in self._positions(value):
+                index = HEADER.size + (position >> 3)
+                self._mmap[index] = self._mmap[index] | (1 << (position & 7))
+
+    def close(self):
+        """
+        Unmap the file.
+        """
+        self._mmap.close()
+
+
+def _entry_key(log_id, sequence):
+    return "{}:{}:{}".format(LOG_ENTRY_KEY_PREFIX, log_id, sequence)
+
+
+def _get_log_position():
+    """
+    Return the (log id, sequence) of the shared log, starting a new log if the
+    cache lost it.
+    """
+    state = cache.get_many([LOG_ID_KEY, LOG_SEQUENCE_KEY])
+    if LOG_ID_KEY in state and LOG_SEQUENCE_KEY in state:
+        return state[LOG_ID_KEY], state[LOG_SEQUENCE_KEY]
+
+    # Any filter following the lost log may have missed entries, a new id
+    # makes them answer "maybe" until they are rebuilt.
+    cache.delete(LOG_SEQUENCE_KEY)
+    cache.set(LOG_ID_KEY, uuid.uuid4().hex, None)
+    cache.add(LOG_SEQUENCE_KEY, 0, None)
+    return cache.get(LOG_ID_KEY), cache.get(LOG_SEQUENCE_KEY, 0)
+
+
+def _append_to_log(values):
+    """
+    Store a log entry with values for the filters of every host.
+    """
+    log_id, _ = _get_log_position()
+    try:
+        sequence = cache.incr(LOG_SEQUENCE_KEY)
+    except ValueError:
+        LOG.warning("The account filter log was lost, the filters will be untrusted until rebuilt")
+        return
+    cache.set(
+        _entry_key(log_id, sequence),
+        values,
+        getattr(settings, "EOX_CORE_ACCOUNT_BLOOM_FILTER_LOG_TIMEOUT", 86400),
+    )
+
+
+def _replay_log(bloom):
+    """
+    Apply the log entries the filter has not seen yet.
+
+    Returns True when the filter is up to date with the shared log.
+    """
+    state = cache.get_many([LOG_ID_KEY, LOG_SEQUENCE_KEY])
+    log_id = state.get(LOG_ID_KEY)
+    sequence = state.get(LOG_SEQUENCE_KEY)
+    if log_id is None or sequence is None:
+        return False
+
+    applied_log_id, applied = bloom.log_position
+    if applied_log_id != log_id:
+        return False
+    if applied >= sequence:
+        return True
+
+    with file_lock(bloom.lock_path):
+        applied = bloom.log_position[1]
+        keys = [
+            _entry_key(log_id, entry)
+            for entry in range(applied + 1, min(sequence, applied + MAX_REPLAYED_ENTRIES) + 1)
+        ]
+        entries = cache.get_many(keys)
+        for key in keys:
+            if key not in entries:
+                # Not written yet, or evicted: stay behind and answer "maybe"
+                break
+            bloom.add(entries[key])
+            applied += 1
+        bloom.set_log_position(log_id, applied)
+    return applied >= sequence
+
+
+class SharedAccountFilter:
+    """
+    Handle on the account filter of this process, reopened when the file is
+    replaced or appears, checked at most once every
+    EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL milliseconds.
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Return the BloomFilter of this host, or None if there is none.
+        """
+        path = getattr(settings, "EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH", None)
+        if not path:
+            return None
+
+        interval = getattr(settings, "EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL", 1000) / 1000.0
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < interval:
+            return self._filter
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._filter = None
+                if getattr(settings, "EOX_CORE_ACCOUNT_BLOOM_FILTER_BUILD_ON_WARMUP", False):
+                    transaction.on_commit(functools.partial(_queue_build, socket.gethostname()))
+                return self._filter
+
+            if self._filter is None or self._filter.file_id != (stat.st_dev, stat.st_ino):
+                return self._reopen(path)
+        return self._filter
+
+    def _reopen(self, path):
+        """
+        Map the current file, keeping no filter if it is not valid.
+        """
+        try:
+            self._filter = BloomFilter(path)
+        except (OSError, ValueError):
+            LOG.exception("Could not open the account filter %s", path)
+            self._filter = None
+        return self._filter
+
+
+def _queue_build(host):
+    """
+    Queue the build of the missing filter of host for its task worker, unless
+    it was queued less than BUILD_QUEUED_TIMEOUT seconds ago.
+    """
+    from eox_lms.tasks import ACCOUNT_FILTER_BUILD_TASK, enqueue_task  # pylint: disable=import-outside-toplevel
+
+    key = "{}:{}".format(BUILD_QUEUED_KEY_PREFIX, host)
+    if not cache.add(key, True, BUILD_QUEUED_TIMEOUT):
+        return
+    try:
+        enqueue_task(ACCOUNT_FILTER_BUILD_TASK, {"host": host})
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception("Could not queue the build of the account filter of %s", host)
+        cache.delete(key)
+
+
+_SHARED_ACCOUNT_FILTER = SharedAccountFilter()
+
+
+def get_account_filter():
+    """
+    Return the account BloomFilter of this host, or None if it is disabled.
+    """
+    return _SHARED_ACCOUNT_FILTER.get()
+
+
+def account_may_exist(values):
+    """
+    Return False only when none of the values can be a taken username or email.
+
+    Without an up to date filter every value may exist.
+    """
+    bloom = get_account_filter()
+    if bloom is None:
+        return True
+    if any(value in bloom for value in values):
+        return True
+    if not _replay_log(bloom):
+        return True
+    return any(value in bloom for value in values)
+
+
+def add_account_identifiers(values):
+    """
+    Record usernames or emails that are now taken, once the current
+    transaction commits.
+    """
+    values = [value for value in values if value]
+    if values and getattr(settings, "EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH", None):
+        transaction.on_commit(lambda: _append_to_log(values))
+
+
+def _fill(bloom):
+    """
+    Add every taken username and email to the filter, in chunks.
+    """
+    chunk_size = getattr(settings, "EOX_CORE_BULK_CREATE_CHUNK_SIZE", 500)
+    chunk = []
+    for value in get_account_identifiers():
+        if value:
+            chunk.append(value)
+        if len(chunk) >= chunk_size:
+            with file_lock(bloom.lock_path):
+                bloom.add(chunk)
+            chunk = []
+    with file_lock(bloom.lock_path):
+        bloom.add(chunk)
+
+
+def build_account_filter(reset=False, wait=True):
+    """
+    Build or refresh the account filter file.
+
+    Only one build runs at a time on a host. When wait is False and another
+    build is running, nothing is done and False is returned.
+
+    The log position is taken before reading the database, so the entries of
+    the accounts committed while the build runs are replayed afterwards. An
+    existing valid file is refreshed in place, keeping the bits set meanwhile;
+    with reset, or when there is no valid file, a new one is filled aside and
+    swapped in.
+    """
+    path = settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH
+    with file_lock(path + ".build", blocking=wait) as locked:
+        if locked:
+            _build(path, reset)
+        return locked
+
+
+def _build(path, reset):
+    """
+    Refresh the filter at path in place or replace it with a new one.
+    """
+    log_id, sequence = _get_log_position()
+
+    bloom = None
+    if not reset:
+        try:
+            bloom = BloomFilter(path)
+        except (OSError, ValueError):
+            pass
+
+    if bloom is not None:
+        _fill(bloom)
+        # A filter that lost track of the log is only trusted again once filled
+        with file_lock(bloom.lock_path):
+            if bloom.log_position[0] != log_id:
+                bloom.set_log_position(log_id, sequence)
+        bloom.close()
+        return
+
+    temporary_path = "{}.{}.tmp".format(path, os.getpid())
+    bloom = BloomFilter.create(
+        temporary_path,
+        getattr(settings, "EOX_CORE_ACCOUNT_BLOOM_FILTER_SIZE", 2 ** 27),
+        getattr(settings, "EOX_CORE_ACCOUNT_BLOOM_FILTER_HASHES", 7),
+        lock_path=path + ".lock",
+    )
+    bloom.set_log_position(log_id, sequence)
+    _fill(bloom)
+    bloom.close()
+    os.replace(temporary_path, path)
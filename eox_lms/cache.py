@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Version stamps and serialized fragments stored in the shared django cache.
+
+A version stamp is an opaque token that changes every time the data it
+describes changes. The API uses them to answer conditional requests and to
+build cache keys that never need an explicit delete: once a stamp changes,
+the fragments stored under the old one are simply not read again. Writes
+bump the stamps with bump_on_commit: a stamp changed before the transaction
+commits could be read together with the old rows, and their stale fragments
+would be stored under the new stamp.
+
+Process-local caches (LocalCache) use the same stamps as the generation of
+their namespace: every worker compares its generation with the shared one at
+most once every EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL milliseconds and drops its
+entries when they differ, so an invalidation reaches every worker on every
+host.
+"""
+import functools
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import cache as django_cache
+from django.db import transaction
+
+from eox_lms.edxapp_wrapper.groups import get_group_ids, get_groups_for_users
+
+try:
+    cache = django_cache.caches['general']  # pylint: disable=invalid-name
+except Exception:  # pylint: disable=broad-except
+    cache = django_cache.cache  # pylint: disable=invalid-name
+
+VERSION_KEY_PREFIX = "eox-lms:version"
+USER_FRAGMENT_KEY_PREFIX = "eox-lms:user-fragment"
+USER_GROUPS_KEY_PREFIX = "eox-lms:user-groups"
+USER_NAMESPACE = "user"
+COURSE_ROSTER_NAMESPACE = "course-roster"
+GROUPS_NAMESPACE = "groups"
+LOCAL_CACHE_NAMESPACE = "local-cache"
+
+
+def _version_key(namespace, identifier):
+    """
+    Return the cache key that holds the version stamp of the identifier.
+    """
+    return "{prefix}:{namespace}:{identifier}".format(
+        prefix=VERSION_KEY_PREFIX,
+        namespace=namespace,
+        identifier=identifier,
+    )
+
+
+def get_version(namespace, identifier):
+    """
+    Return the current version stamp of the identifier in the namespace.
+
+    Missing stamps (never set or evicted) are initialized with a fresh token,
+    so losing the cache only causes a miss and never serves stale data.
+    """
+    key = _version_key(namespace, identifier)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # Another worker may have initialized the stamp in the meantime.
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def get_versions(namespace, identifiers):
+    """
+    Return a dict with the version stamp of each identifier in the namespace,
+    reading all of them with a single cache round trip.
+    """
+    keys = {identifier: _version_key(namespace, identifier) for identifier in identifiers}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for identifier, key in keys.items():
+        version = found.get(key)
+        versions[identifier] = version if version is not None else get_version(namespace, identifier)
+    return versions
+
+
+def bump_version(namespace, identifier):
+    """
+    Replace the version stamp of the identifier in the namespace.
+    """
+    cache.set(_version_key(namespace, identifier), uuid.uuid4().hex, None)
+
+
+def bump_versions(namespace, identifiers):
+    """
+    Replace the version stamps of many identifiers with a single cache round trip.
+    """
+    cache.set_many({_version_key(namespace, identifier): uuid.uuid4().hex for identifier in identifiers}, None)
+
+
+def bump_on_commit(bump, *args):
+    """
+    Call bump(*args) once the current transaction commits, or right away
+    outside of a transaction.
+    """
+    transaction.on_commit(functools.partial(bump, *args))
+
+
+def get_user_version(user_id):
+    """
+    Return the version stamp of a user.
+    """
+    return get_version(USER_NAMESPACE, user_id)
+
+
+def get_user_versions(user_ids):
+    """
+    Return a dict with the version stamp of each user.
+    """
+    return get_versions(USER_NAMESPACE, user_ids)
+
+
+def bump_user_version(user_id):
+    """
+    Mark every cached representation of a user as outdated.
+    """
+    bump_version(USER_NAMESPACE, user_id)
+
+
+def bump_user_versions(user_ids):
+    """
+    Mark every cached representation of many users as outdated.
+    """
+    bump_versions(USER_NAMESPACE, user_ids)
+
+
+def get_course_roster_version(course_id):
+    """
+    Return the version stamp of the enrollments of a course.
+    """
+    return get_version(COURSE_ROSTER_NAMESPACE, course_id)
+
+
+def bump_course_roster_version(course_id):
+    """
+    Mark every cached representation of the course enrollments as outdated.
+    """
+    bump_version(COURSE_ROSTER_NAMESPACE, course_id)
+
+
+def bump_course_roster_versions(course_ids):
+    """
+    Mark every cached representation of the enrollments of many courses as outdated.
+    """
+    bump_versions(COURSE_ROSTER_NAMESPACE, course_ids)
+
+
+def user_fragment_key(user_id, version, variant):
+    """
+    Return the cache key of a serialized user.
+
+    The variant identifies everything besides the user that changes the
+    representation, e.g. the site or the admin fields.
+    """
+    return "{prefix}:{user_id}:{version}:{variant}".format(
+        prefix=USER_FRAGMENT_KEY_PREFIX,
+        user_id=user_id,
+        version=version,
+        variant=variant,
+    )
+
+
+def get_user_fragments(keys):
+    """
+    Return a dict with the serialized users found for the keys.
+    """
+    return cache.get_many(keys)
+
+
+def set_user_fragments(fragments):
+    """
+    Store serialized users, a dict of user_fragment_key to representation.
+    """
+    cache.set_many(fragments, getattr(settings, "EOX_CORE_USER_FRAGMENT_CACHE_TIMEOUT", 3600))
+
+
+class LocalCache:
+    """
+    Process-local cache whose entries are dropped in every worker when the
+    generation of its namespace changes in the shared cache.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._data = {}
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_generation(self):
+        """
+        Return the local generation, syncing it with the shared one when the
+        check interval has elapsed.
+        """
+        interval = getattr(settings, "EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL", 1000) / 1000.0
+        now = time.monotonic()
+        if self._generation is not None and now - self._checked_at < interval:
+            return self._generation
+
+        generation = get_version(LOCAL_CACHE_NAMESPACE, self.namespace)
+        with self._lock:
+            if generation != self._generation:
+                self._data.clear()
+                self._generation = generation
+            self._checked_at = now
+        return generation
+
+    def get(self, key, default=None):
+        """
+        Return the value stored for key in this worker.
+        """
+        self._current_generation()
+        return self._data.get(key, default)
+
+    def get_or_set(self, key, build):
+        """
+        Return the value stored for key, calling build to create it when missing.
+
+        The value is discarded instead of stored if the generation changed while
+        it was being built.
+        """
+        generation = self._current_generation()
+        try:
+            return self._data[key]
+        except KeyError:
+            pass
+
+        value = build()
+        with self._lock:
+            if generation == self._generation:
+                self._data[key] = value
+        return value
+
+    def invalidate(self):
+        """
+        Drop the entries of this namespace in this worker and, by bumping the
+        shared generation, in every other worker.
+        """
+        bump_version(LOCAL_CACHE_NAMESPACE, self.namespace)
+        with self._lock:
+            self._data.clear()
+            self._generation = None
+
+
+_LOCAL_CACHES = {}
+
+
+def get_local_cache(namespace):
+    """
+    Return the LocalCache of the namespace, creating it on first use.
+    """
+    try:
+        return _LOCAL_CACHES[namespace]
+    except KeyError:
+        return _LOCAL_CACHES.setdefault(namespace, LocalCache(namespace))
+
+
+def get_groups_version():
+    """
+    Return the version stamp of the group definitions (names and existence).
+    """
+    return get_version(GROUPS_NAMESPACE, "all")
+
+
+def bump_groups_version():
+    """
+    Mark every cached group name or id as outdated.
+    """
+    bump_version(GROUPS_NAMESPACE, "all")
+    get_local_cache(GROUPS_NAMESPACE).invalidate()
+
+
+def get_group_memberships_version():
+    """
+    Return the version stamp of the memberships of all the groups.
+    """
+    return get_version(GROUPS_NAMESPACE, "memberships")
+
+
+def bump_group_memberships_version():
+    """
+    Mark every cached count or list of group members as outdated.
+    """
+    bump_version(GROUPS_NAMESPACE, "memberships")
+
+
+def get_cached_group_ids():
+    """
+    Return a dict mapping the name of every group to its id.
+    """
+    return get_local_cache(GROUPS_NAMESPACE).get_or_set("ids", get_group_ids)
+
+
+def get_cached_group_names_for_users(user_ids):
+    """
+    Return a dict with the list of group names of each user.
+
+    The membership of a user is stored under its version stamp, which is bumped
+    by m2m_changed, and under the groups version, which is bumped when a group is
+    renamed or deleted. Only the users missing from the cache are queried.
+    """
+    groups_version = get_groups_version()
+    versions = get_user_versions(user_ids)
+    keys = {
+        user_id: "{prefix}:{user_id}:{version}:{groups_version}".format(
+            prefix=USER_GROUPS_KEY_PREFIX,
+            user_id=user_id,
+            version=versions[user_id],
+            groups_version=groups_version,
+        )
+        for user_id in user_ids
+    }
+    found = cache.get_many(list(keys.values()))
+    group_names = {user_id: found[key] for user_id, key in keys.items() if key in found}
+
+    missing = [user_id for user_id in user_ids if user_id not in group_names]
+    if missing:
+        fetched = get_groups_for_users(missing)
+        cache.set_many(
+            {keys[user_id]: names for user_id, names in fetched.items()},
+            getattr(settings, "EOX_CORE_GROUPS_CACHE_TIMEOUT", 3600),
+        )
+        group_names.update(fetched)
+
+    return group_names
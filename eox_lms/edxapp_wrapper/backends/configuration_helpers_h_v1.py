@@ -1,7 +1,13 @@
 """ Backend abstraction. """
 from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers  # pylint: disable=import-error
+from openedx.core.djangoapps.site_configuration.models import SiteConfiguration  # pylint: disable=import-error
 
 
 def get_configuration_helper():
     """ Backend to get the configuration helper. """
     return configuration_helpers
+
+
+def get_site_configuration_model():
+    """ Backend to get the SiteConfiguration model. """
+    return SiteConfiguration
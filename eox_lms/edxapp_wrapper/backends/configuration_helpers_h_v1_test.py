@@ -8,3 +8,12 @@ def get_configuration_helper():
     except ImportError:
         configuration_helpers = object
     return configuration_helpers
+
+
+def get_site_configuration_model():
+    """ Backend to get the SiteConfiguration model. """
+    try:
+        from openedx.core.djangoapps.site_configuration.models import SiteConfiguration  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        SiteConfiguration = object
+    return SiteConfiguration
@@ -11,10 +11,7 @@ from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
 from rest_framework.serializers import ValidationError
 
-try:
-    from openedx.core.djangoapps.site_configuration.helpers import get_all_orgs, get_current_site_orgs
-except ImportError:
-    get_all_orgs, get_current_site_orgs = object, object  # pylint: disable=invalid-name
+from eox_lms.snapshots import get_site_snapshot
 
 
 def get_valid_course_key(course_id):
@@ -41,10 +38,11 @@ def validate_org(course_id):
         return True
 
     course_key = get_valid_course_key(course_id)
-    current_site_orgs = get_current_site_orgs() or []
+    snapshot = get_site_snapshot()
+    current_site_orgs = snapshot.site_orgs
 
     if not current_site_orgs:  # pylint: disable=no-else-return
-        if course_key.org in get_all_orgs():
+        if course_key.org in snapshot.all_orgs:
             return False
         return True
     else:
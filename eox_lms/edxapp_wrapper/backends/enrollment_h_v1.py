@@ -299,6 +299,8 @@ def check_edxapp_enrollment_is_valid(*args, **kwargs):
     program_uuid = kwargs.get('bundle_id')
     username = kwargs.get("username")
     email = kwargs.get("email")
+    # Conflicts already resolved by a bulk check of the caller, if any
+    account_conflicts = kwargs.get("account_conflicts")
 
     if program_uuid and course_id:
         return ['You have to provide a course_id or bundle_id but not both']
@@ -306,7 +308,9 @@ def check_edxapp_enrollment_is_valid(*args, **kwargs):
         return ['You have to provide a course_id or bundle_id']
     if not email and not username:
         return ['Email or username needed']
-    if not check_edxapp_account_conflicts(email=email, username=username):
+    if account_conflicts is None:
+        account_conflicts = check_edxapp_account_conflicts(email=email, username=username)
+    if not account_conflicts:
         return ['User not found']
     if mode not in CourseMode.ALL_MODES:
         return ['Invalid mode given:' + mode]
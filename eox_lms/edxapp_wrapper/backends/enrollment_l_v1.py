@@ -145,7 +145,9 @@ def get_user_enrollments_for_course(*args, **kwargs):
     offset = kwargs.pop('offset', 0)
     limit = kwargs.pop('limit', 1000)
 
-    enrolments = CourseEnrollment.objects.filter(course_id=course_id).order_by("user")[offset:offset + limit]
+    enrolments = CourseEnrollment.objects.filter(
+        course_id=course_id,
+    ).select_related("user").order_by("user")[offset:offset + limit]
     return enrolments
 
 #
@@ -344,6 +346,8 @@ def check_edxapp_enrollment_is_valid(*args, **kwargs):
     program_uuid = kwargs.get('bundle_id')
     username = kwargs.get("username")
     email = kwargs.get("email")
+    # Conflicts already resolved by a bulk check of the caller, if any
+    account_conflicts = kwargs.get("account_conflicts")
 
     if program_uuid and course_id:
         return ['You have to provide a course_id or bundle_id but not both']
@@ -351,7 +355,9 @@ def check_edxapp_enrollment_is_valid(*args, **kwargs):
         return ['You have to provide a course_id or bundle_id']
     if not email and not username:
         return ['Email or username needed']
-    if not check_edxapp_account_conflicts(email=email, username=username):
+    if account_conflicts is None:
+        account_conflicts = check_edxapp_account_conflicts(email=email, username=username)
+    if not account_conflicts:
         return ['User not found']
     if mode not in CourseMode.ALL_MODES:
         return ['Invalid mode given:' + mode]
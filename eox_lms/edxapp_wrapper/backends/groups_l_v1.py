@@ -5,7 +5,13 @@ Backend for the create_edxapp_user that works under the open-release/lilac.maste
 """
 import logging
 
-from django.contrib.auth.models import Group
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import Count, Q
+from rest_framework.exceptions import NotFound
+
+from eox_lms.cache import bump_group_memberships_version, bump_on_commit, bump_user_versions, get_cached_group_ids
 
 LOG = logging.getLogger(__name__)
 
@@ -21,8 +27,147 @@ def get_all_groups():
     """
     return Group.objects.all()
 
+def get_groups_with_member_counts(domain=None, offset=0, limit=1000):
+    """
+    Return a page of the groups ordered by name, as dicts with the name and the
+    member_count of each, in a single query.
+
+    With a domain only the members with a signup source on that site are
+    counted.
+    """
+    members = Q(user__usersignupsource__site=domain) if domain else Q()
+    groups = Group.objects.order_by("name").annotate(
+        member_count=Count("user", filter=members, distinct=True),
+    ).values("name", "member_count")
+    return list(groups[offset:offset + limit])
+
+
 def get_groups(user):
     """
     Return the groups for the user
     """
     return user.groups.all()
+
+
+def get_group_ids():
+    """
+    Return a dict mapping the name of every group to its id
+    """
+    return dict(Group.objects.values_list("name", "id"))
+
+
+def get_groups_for_users(user_ids):
+    """
+    Return a dict with the list of group names of each user, using one query
+    """
+    groups = {user_id: [] for user_id in user_ids}
+    memberships = User.groups.through.objects.filter(
+        user_id__in=user_ids,
+    ).order_by("group_id").values_list("user_id", "group__name")
+    for user_id, group_name in memberships:
+        groups[user_id].append(group_name)
+    return groups
+
+
+def set_user_groups(user, add=(), remove=()):
+    """
+    Add the user to the groups named in add and remove it from the ones named
+    in remove, with a single add() and a single remove().
+
+    The names are resolved with the cached map of group ids. Names missing from
+    the map are looked up with one query, in case the group was just created.
+
+    Returns the sorted list of names that match no group.
+    """
+    group_ids = get_cached_group_ids()
+    missing = (set(add) | set(remove)) - set(group_ids)
+    if missing:
+        group_ids = dict(group_ids, **dict(Group.objects.filter(name__in=missing).values_list("name", "id")))
+
+    add_ids = {group_ids[name] for name in add if name in group_ids}
+    remove_ids = {group_ids[name] for name in remove if name in group_ids}
+    if add_ids:
+        user.groups.add(*add_ids)
+    if remove_ids:
+        user.groups.remove(*remove_ids)
+
+    return sorted(name for name in missing if name not in group_ids)
+
+
+def _chunks(values, size):
+    """
+    Yield the values in lists of at most size items.
+    """
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def sync_group_members(name, usernames=(), emails=()):
+    """
+    Make the users with the given usernames or emails the only members of the
+    group.
+
+    The desired users and the current members are read as ids, and the
+    difference is applied with bulk inserts and deletes on the through table
+    of User.groups, in chunks of EOX_CORE_BULK_UPDATE_CHUNK_SIZE rows. The
+    current members are read and changed in a single transaction that locks
+    the group row, so concurrent syncs of a group are applied one after the
+    other. Writes on the through table do not send m2m_changed,
+    so the versions of the added and removed users are bumped here.
+
+    Returns a dict with the added, removed and unchanged counts, and the
+    usernames and emails that match no user.
+    """
+    if not Group.objects.filter(name=name).exists():
+        raise NotFound("Group {} not found".format(name))
+
+    chunk_size = getattr(settings, "EOX_CORE_BULK_UPDATE_CHUNK_SIZE", 500)
+    usernames = set(usernames)
+    emails = set(emails)
+    desired = set()
+    found_usernames = set()
+    found_emails = set()
+    for chunk in _chunks(usernames, chunk_size):
+        for user_id, username in User.objects.filter(username__in=chunk).values_list("id", "username"):
+            desired.add(user_id)
+            found_usernames.add(username.lower())
+    for chunk in _chunks(emails, chunk_size):
+        for user_id, email in User.objects.filter(email__in=chunk).values_list("id", "email"):
+            desired.add(user_id)
+            found_emails.add(email.lower())
+
+    membership = User.groups.through
+    with transaction.atomic():
+        # Syncs of the same group run one at a time, each on the membership left by the previous one
+        try:
+            group = Group.objects.select_for_update().get(name=name)
+        except Group.DoesNotExist:
+            raise NotFound("Group {} not found".format(name))
+
+        current = set(membership.objects.filter(group=group).values_list("user_id", flat=True))
+        added = desired - current
+        removed = current - desired
+
+        membership.objects.bulk_create(
+            [membership(user_id=user_id, group_id=group.pk) for user_id in added],
+            batch_size=chunk_size,
+            ignore_conflicts=True,
+        )
+        for chunk in _chunks(removed, chunk_size):
+            membership.objects.filter(group=group, user_id__in=chunk).delete()
+
+    # Writes on the through table do not send m2m_changed
+    if added or removed:
+        bump_on_commit(bump_user_versions, added | removed)
+        bump_on_commit(bump_group_memberships_version)
+
+    return {
+        "added": len(added),
+        "removed": len(removed),
+        "unchanged": len(desired & current),
+        "not_found": sorted(
+            [username for username in usernames if username.lower() not in found_usernames]
+            + [email for email in emails if email.lower() not in found_emails]
+        ),
+    }
@@ -5,9 +5,19 @@ Backend for the create_edxapp_user_social_auth that works under the open-release
 """
 import logging
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
 from social_django.models import UserSocialAuth
 
+from eox_lms.edxapp_wrapper.users import get_user_signup_source
+
 LOG = logging.getLogger(__name__)
+User = get_user_model()  # pylint: disable=invalid-name
+
+SOCIAL_AUTH_CREATED = "created"
+SOCIAL_AUTH_EXISTS = "exists"
 
 def get_user_social_auths(**kwargs):
     """
@@ -15,8 +25,169 @@ def get_user_social_auths(**kwargs):
     """
     return UserSocialAuth.objects.filter(**kwargs)
 
+def get_user_social_auths_page(after=0, limit=1000, provider=None, uid=None, username=None):
+    """
+    Return up to limit user social auths with an id greater than after, in id
+    order, as dicts with the id, provider, uid and username of each.
+
+    The usernames are read through the join with the users in the same query.
+    """
+    auths = UserSocialAuth.objects.filter(id__gt=after).order_by("id")
+    if provider:
+        auths = auths.filter(provider=provider)
+    if uid:
+        auths = auths.filter(uid=uid)
+    if username:
+        auths = auths.filter(user__username=username)
+    return list(auths.values("id", "provider", "uid", username=F("user__username"))[:limit])
+
 def add_user_social_auth(**kwargs):
     """
     Create the user social auth
     """
     return UserSocialAuth.objects.create(**kwargs)
+
+
+def add_user_social_auths(rows):
+    """
+    Create the user social auths described by rows, dicts with the username,
+    provider and uid of each.
+
+    Each chunk of EOX_CORE_BULK_CREATE_CHUNK_SIZE rows resolves its usernames
+    with one query, reads the existing (provider, uid) pairs with another and
+    inserts the new ones with bulk_create, ignoring the conflicts with links
+    created concurrently, which are detected by reading the pairs again.
+
+    Returns a list with a (status, error) tuple per row, in the same order,
+    where status is "created" or "exists" (the link was already there for the
+    same user) and error is None, or status is None and error says why the
+    row failed.
+    """
+    results = []
+    chunk_size = getattr(settings, "EOX_CORE_BULK_CREATE_CHUNK_SIZE", 500)
+    for start in range(0, len(rows), chunk_size):
+        results += _add_user_social_auths_chunk(rows[start:start + chunk_size])
+    return results
+
+
+def _get_social_auth_owners(pairs):
+    """
+    Return a dict with the user id of each existing (provider, uid) pair.
+    """
+    existing = UserSocialAuth.objects.filter(
+        provider__in={provider for provider, _ in pairs},
+        uid__in={uid for _, uid in pairs},
+    ).values_list("provider", "uid", "user_id")
+    return {(provider, uid): user_id for provider, uid, user_id in existing if (provider, uid) in pairs}
+
+
+def _add_user_social_auths_chunk(rows):
+    """
+    Create the user social auths of a chunk of rows.
+    """
+    user_ids = {
+        username.lower(): user_id
+        for username, user_id in User.objects.filter(
+            username__in={row["username"] for row in rows},
+        ).values_list("username", "id")
+    }
+    pairs = {(row["provider"], row["uid"]) for row in rows}
+    owners = _get_social_auth_owners(pairs)
+
+    results = [None] * len(rows)
+    pending = {}
+    for index, row in enumerate(rows):
+        pair = (row["provider"], row["uid"])
+        user_id = user_ids.get(row["username"].lower())
+        if user_id is None:
+            results[index] = (None, "No user found with username {}".format(row["username"]))
+        elif pair in owners:
+            if owners[pair] == user_id:
+                results[index] = (SOCIAL_AUTH_EXISTS, None)
+            else:
+                results[index] = (None, "The uid is already linked to another user for this provider")
+        elif pair in pending:
+            results[index] = (None, "The uid is repeated in a previous row")
+        else:
+            pending[pair] = (index, user_id)
+
+    if pending:
+        with transaction.atomic():
+            UserSocialAuth.objects.bulk_create(
+                [UserSocialAuth(user_id=user_id, provider=provider, uid=uid)
+                 for (provider, uid), (_, user_id) in pending.items()],
+                ignore_conflicts=True,
+            )
+        owners = _get_social_auth_owners(set(pending))
+        for pair, (index, user_id) in pending.items():
+            if owners.get(pair) == user_id:
+                results[index] = (SOCIAL_AUTH_CREATED, None)
+            else:
+                results[index] = (None, "The uid is already linked to another user for this provider")
+
+    return results
+
+
+def add_slug_to_user_social_auth_uids(provider, slug, site, after=0, limit=1000, dry_run=False):
+    """
+    Rewrite the uids of a batch of user social auths of provider to the
+    slug:uid format.
+
+    The provider column holds the backend name, which the provider
+    configurations of several sites may share, so only the auths of the users
+    with a signup source on site are migrated. Users that also signed up on
+    another site are skipped, their auth may belong to either configuration.
+
+    The batch is made of the first limit auths of the provider with an id
+    greater than after, in id order. Uids already in the slug:uid format are
+    left alone, and so are the ones whose new uid is too long or already
+    belongs to another auth of the provider. The rest are written with a
+    single bulk_update, unless dry_run is set.
+
+    Returns (last_id, read, migrated, skipped): the id to continue after, or
+    None when no auth is left, the number of auths read, the number of uids
+    rewritten, and a list with the (id, reason) of the skipped auths.
+    """
+    prefix = "{}:".format(slug)
+    auths = list(
+        UserSocialAuth.objects.filter(provider=provider, id__gt=after).order_by("id").only("id", "uid", "user_id")[:limit]
+    )
+    if not auths:
+        return None, 0, 0, []
+
+    legacy = [auth for auth in auths if not auth.uid.startswith(prefix)]
+    user_sites = {}
+    for user_id, signup_site in get_user_signup_source().objects.filter(
+            user_id__in={auth.user_id for auth in legacy},
+    ).values_list("user_id", "site"):
+        user_sites.setdefault(user_id, set()).add(signup_site.lower())
+
+    max_length = UserSocialAuth._meta.get_field("uid").max_length  # pylint: disable=protected-access
+    taken = set(UserSocialAuth.objects.filter(
+        provider=provider,
+        uid__in=[prefix + auth.uid for auth in legacy],
+    ).values_list("uid", flat=True))
+
+    migrated = []
+    skipped = []
+    for auth in legacy:
+        uid = prefix + auth.uid
+        sites = user_sites.get(auth.user_id, set())
+        if site.lower() not in sites:
+            # An auth of another site
+            continue
+        if len(sites) > 1:
+            skipped.append((auth.id, "The user also signed up on another site"))
+        elif len(uid) > max_length:
+            skipped.append((auth.id, "The new uid is longer than {} characters".format(max_length)))
+        elif uid in taken:
+            skipped.append((auth.id, "The new uid already belongs to another social auth"))
+        else:
+            auth.uid = uid
+            migrated.append(auth)
+
+    if migrated and not dry_run:
+        with transaction.atomic():
+            UserSocialAuth.objects.bulk_update(migrated, ["uid"])
+
+    return auths[-1].id, len(auths), len(migrated), skipped
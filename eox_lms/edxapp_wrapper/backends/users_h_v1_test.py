@@ -2,6 +2,7 @@
 Test backend to get CourseEnrollment Model.
 """
 
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 
 USERNAME_MAX_LENGTH = 30
@@ -47,6 +48,34 @@ def check_edxapp_account_conflicts(email, username):
     return check_account_exists(email=email, username=username)
 
 
+def check_edxapp_account_conflicts_bulk(pairs):
+    """
+    Runs check_edxapp_account_conflicts for every pair for tests
+    """
+    return [check_edxapp_account_conflicts(email, username) for email, username in pairs]
+
+
+def get_edxapp_users_by_identifiers(usernames=(), emails=(), ids=()):
+    """
+    Return no users for tests
+    """
+    return []
+
+
+def update_edxapp_users(updates):
+    """
+    Report every update as written for tests
+    """
+    return [None] * len(updates)
+
+
+def set_edxapp_users_active(is_active, dry_run=False, **predicate):
+    """
+    Report no users changed for tests
+    """
+    return {"updated": 0, "unchanged": 0}
+
+
 def get_course_enrollment():
     """
     Get Test CourseEnrollment model.
@@ -98,3 +127,30 @@ def get_user_attribute():
     except ImportError:
         UserAttribute = object
     return UserAttribute
+
+
+def get_social_link():
+    """
+    Get test SocialLink model
+    """
+    try:
+        from student.models import SocialLink  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        SocialLink = object
+    return SocialLink
+
+
+def get_user_related_models():
+    """
+    Get the test models read by the user representation
+    """
+    return []
+
+
+def get_account_identifiers():
+    """
+    Iterates over the usernames and emails of the test users
+    """
+    for username, email in get_user_model().objects.values_list("username", "email"):
+        yield username
+        yield email
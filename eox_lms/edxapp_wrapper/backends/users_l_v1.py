@@ -4,15 +4,20 @@
 Backend for the create_edxapp_user that works under the open-release/lilac.master tag
 """
 import logging
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from common.djangoapps.student.helpers import (  # pylint: disable=import-error,no-name-in-module
     create_or_set_user_attribute_created_on_site,
     do_create_account,
 )
 from common.djangoapps.student.models import (  # pylint: disable=import-error,no-name-in-module
+    AccountRecovery,
     CourseEnrollment,
+    LanguageProficiency,
     LoginFailures,
     Registration,
+    SocialLink,
     UserAttribute,
     UserProfile,
     UserSignupSource,
@@ -23,14 +28,18 @@ from common.djangoapps.student.models import (  # pylint: disable=import-error,n
 )
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from openedx.core.djangoapps.lang_pref import LANGUAGE_KEY  # pylint: disable=import-error
-from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers  # pylint: disable=import-error
 from openedx.core.djangoapps.user_api.accounts import USERNAME_MAX_LENGTH  # pylint: disable=import-error,unused-import
 from openedx.core.djangoapps.user_api.accounts.serializers import UserReadOnlySerializer  # pylint: disable=import-error
 from openedx.core.djangoapps.user_api.accounts.views import \
     _set_unusable_password  # pylint: disable=import-error,unused-import
-from openedx.core.djangoapps.user_api.models import UserRetirementStatus  # pylint: disable=import-error
+from openedx.core.djangoapps.user_api.models import (  # pylint: disable=import-error
+    UserPreference,
+    UserRetirementStatus,
+)
 from openedx.core.djangoapps.user_api.preferences import api as preferences_api  # pylint: disable=import-error
 from openedx.core.djangoapps.user_authn.views.registration_form import (  # pylint: disable=import-error
     AccountCreationForm,
@@ -40,10 +49,35 @@ from openedx.core.djangolib.oauth2_retirement_utils import \
 from rest_framework import status
 from rest_framework.exceptions import NotFound
 from social_django.models import UserSocialAuth  # pylint: disable=import-error
+from user_util import user_util  # pylint: disable=import-error
+
+from eox_lms.bloom import account_may_exist, add_account_identifiers
+from eox_lms.cache import (
+    bump_course_roster_versions,
+    bump_group_memberships_version,
+    bump_on_commit,
+    bump_user_versions,
+)
+from eox_lms.edxapp_wrapper.configuration_helpers import get_configuration_helper
+from eox_lms.profile_index import get_current_domain, index_profiles, remove_indexed_values
+from eox_lms.signals import users_active_changed
+from eox_lms.snapshots import get_site_snapshot
+from eox_lms.tasks import USERS_EXTERNAL_RECORDS_TASK, enqueue_tasks
 
 LOG = logging.getLogger(__name__)
 User = get_user_model()  # pylint: disable=invalid-name
 
+USER_PROFILE_FIELDS = [
+    "name",
+    "level_of_education",
+    "gender",
+    "mailing_address",
+    "city",
+    "country",
+    "goals",
+    "year_of_birth",
+]
+
 
 def get_user_read_only_serializer():
     """
@@ -57,15 +91,89 @@ def check_edxapp_account_conflicts(email, username):
     Exposed function to check conflicts
     """
     conflicts = []
-    if username and username_exists_or_retired(username):
+    if username and account_may_exist(_username_identifiers(username)) and username_exists_or_retired(username):
         conflicts.append("username")
 
-    if email and email_exists_or_retired(email):
+    if email and account_may_exist(_email_identifiers(email)) and email_exists_or_retired(email):
         conflicts.append("email")
 
     return conflicts
 
 
+def _username_identifiers(username):
+    """
+    Return a username followed by its retired hashes.
+    """
+    return [username] + list(user_util.get_all_retired_usernames(
+        username, settings.RETIRED_USER_SALTS, settings.RETIRED_USERNAME_FMT,
+    ))
+
+
+def _email_identifiers(email):
+    """
+    Return an email followed by its retired hashes.
+    """
+    return [email] + list(user_util.get_all_retired_emails(
+        email, settings.RETIRED_USER_SALTS, settings.RETIRED_EMAIL_FMT,
+    ))
+
+
+def check_edxapp_account_conflicts_bulk(pairs):
+    """
+    Checks many (email, username) pairs for conflicts at once.
+
+    Resolves the same conditions as check_edxapp_account_conflicts, existing
+    and retired usernames and emails, with a few IN queries per chunk of
+    EOX_CORE_BULK_CREATE_CHUNK_SIZE pairs instead of several queries per pair.
+    Names the account filter knows to be free are left out of the queries.
+
+    Returns a list with the conflicts of each pair, in the same order.
+    """
+    chunk_size = getattr(settings, "EOX_CORE_BULK_CREATE_CHUNK_SIZE", 500)
+    results = []
+
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        retired_usernames = {
+            username: _username_identifiers(username)[1:] for _, username in chunk if username
+        }
+        retired_emails = {email: _email_identifiers(email)[1:] for email, _ in chunk if email}
+
+        usernames = {
+            username for username, retired in retired_usernames.items()
+            if account_may_exist([username] + retired)
+        }
+        emails = {email for email, retired in retired_emails.items() if account_may_exist([email] + retired)}
+
+        taken_usernames = {
+            username.lower() for username in User.objects.filter(
+                username__in=usernames.union(*[retired_usernames[username] for username in usernames]),
+            ).values_list("username", flat=True)
+        }
+        taken_usernames.update(
+            username.lower() for username in UserRetirementStatus.objects.filter(
+                original_username__in=usernames,
+            ).values_list("original_username", flat=True)
+        )
+        taken_emails = {
+            email.lower() for email in User.objects.filter(
+                email__in=emails.union(*[retired_emails[email] for email in emails]),
+            ).values_list("email", flat=True)
+        }
+
+        for email, username in chunk:
+            conflicts = []
+            if username in usernames and not taken_usernames.isdisjoint(
+                    [username.lower()] + [retired.lower() for retired in retired_usernames[username]]):
+                conflicts.append("username")
+            if email in emails and not taken_emails.isdisjoint(
+                    [email.lower()] + [retired.lower() for retired in retired_emails[email]]):
+                conflicts.append("email")
+            results.append(conflicts)
+
+    return results
+
+
 def create_edxapp_user(*args, **kwargs):
     """
     Creates a user on the open edx django site using calls to
@@ -98,18 +206,18 @@ def create_edxapp_user(*args, **kwargs):
     if conflicts:
         return None, ["Fatal: account collition with the provided: {}".format(", ".join(conflicts))]
 
-    profile_fields = [ "name", "level_of_education", "gender", "mailing_address",
-                       "city", "country", "goals", "year_of_birth" ]
-
     # Go ahead and create the new user
     with transaction.atomic():
         # print("NEW CODE....")
         user = User(username=username, email=email, first_name = first_name, last_name=last_name,  is_active=True)
-        user.set_password(kwargs.pop("password"))
+        if kwargs.get("password_hash"):
+            user.password = kwargs.pop("password_hash")
+        else:
+            user.set_password(kwargs.pop("password"))
         user.save()
         registration = Registration()
         registration.register(user)
-        profile = UserProfile(user=user, **{key: kwargs.get(key) for key in profile_fields})
+        profile = UserProfile(user=user, **{key: kwargs.get(key) for key in USER_PROFILE_FIELDS})
         profile.save()
 
     site = kwargs.pop("site", False)
@@ -118,22 +226,9 @@ def create_edxapp_user(*args, **kwargs):
     else:
         errors.append("The user was not assigned to any site")
 
-    try:
-        create_comments_service_user(user)
-    except Exception:  # pylint: disable=broad-except
-        errors.append("No comments_service_user was created")
-
     # TODO: link account with third party auth
 
-    lang_pref = kwargs.pop("language_preference", False)
-    if lang_pref:
-        try:
-            preferences_api.set_user_preference(user, LANGUAGE_KEY, lang_pref)
-        except Exception:  # pylint: disable=broad-except
-            errors.append("Could not set lang preference '{} for user '{}'".format(
-                lang_pref,
-                user.username,
-            ))
+    errors += _handle_users_external_records([(user, kwargs.pop("language_preference", False))])[0]
 
     if kwargs.pop("activate_user", False):
         user.is_active = True
@@ -144,6 +239,419 @@ def create_edxapp_user(*args, **kwargs):
     return user, errors
 
 
+def _create_comments_service_users(users):
+    """
+    Create the comments service user of every user.
+
+    The comments service only creates its users one by one, so the calls are
+    made concurrently, EOX_CORE_COMMENTS_SERVICE_WORKERS at a time.
+
+    Returns the set of ids of the users that could not be created.
+    """
+    def create(user):
+        try:
+            create_comments_service_user(user)
+        except Exception:  # pylint: disable=broad-except
+            return user.id
+        return None
+
+    workers = getattr(settings, "EOX_CORE_COMMENTS_SERVICE_WORKERS", 4)
+    if workers <= 1 or len(users) < 2:
+        failed = [create(user) for user in users]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            failed = list(pool.map(create, users))
+    return {user_id for user_id in failed if user_id is not None}
+
+
+def _set_language_preferences(preferences):
+    """
+    Write the language preference of many users, given as a dict of user to
+    language, with one read and a bulk insert and update.
+
+    The writes send no post_save, so the versions of the users are bumped
+    here. Returns whether they were written.
+    """
+    try:
+        with transaction.atomic():
+            existing = {
+                preference.user_id: preference
+                for preference in UserPreference.objects.filter(user__in=list(preferences), key=LANGUAGE_KEY)
+            }
+            changed = []
+            for user, language in preferences.items():
+                if user.id in existing:
+                    existing[user.id].value = language
+                    changed.append(existing[user.id])
+            UserPreference.objects.bulk_update(changed, ["value"])
+            UserPreference.objects.bulk_create([
+                UserPreference(user=user, key=LANGUAGE_KEY, value=language)
+                for user, language in preferences.items() if user.id not in existing
+            ])
+    except Exception:  # pylint: disable=broad-except
+        LOG.exception("Could not set the language preference of %s users", len(preferences))
+        return False
+    bump_on_commit(bump_user_versions, [user.id for user in preferences])
+    return True
+
+
+def _create_users_external_records(records):
+    """
+    Create the records of new users that live outside their own tables, given
+    as (user, language_preference) tuples: the comments service users and the
+    language preferences, each kind for all the users at once.
+
+    Returns a list with the errors found for each record.
+    """
+    failed = _create_comments_service_users([user for user, _ in records])
+    preferences = {user: lang_pref for user, lang_pref in records if lang_pref}
+    preferences_written = not preferences or _set_language_preferences(preferences)
+
+    errors = []
+    for user, lang_pref in records:
+        user_errors = []
+        if user.id in failed:
+            user_errors.append("No comments_service_user was created")
+        if lang_pref and not preferences_written:
+            user_errors.append("Could not set lang preference '{} for user '{}'".format(lang_pref, user.username))
+        errors.append(user_errors)
+    return errors
+
+
+def _handle_users_external_records(records):
+    """
+    Create the external records of new users, given as (user, language_preference)
+    tuples.
+
+    When EOX_CORE_USER_SIDE_EFFECTS_ASYNC is set they are sent to the eox-lms
+    task queue and created by the worker, so the request does not wait for the
+    comments service. Otherwise they are created right away.
+
+    Returns a list with the errors found for each record.
+    """
+    if getattr(settings, "EOX_CORE_USER_SIDE_EFFECTS_ASYNC", False):
+        enqueue_tasks(USERS_EXTERNAL_RECORDS_TASK, [
+            {"user_id": user.id, "language_preference": lang_pref or None} for user, lang_pref in records
+        ])
+        return [[] for _ in records]
+
+    return _create_users_external_records(records)
+
+
+def create_edxapp_users_external_records(records):
+    """
+    Create the external records of existing users, given as
+    (user_id, language_preference) tuples, reading all the users with one query.
+
+    Returns a list with the errors found for each record.
+    """
+    users = User.objects.in_bulk([user_id for user_id, _ in records])
+    found = [(users[user_id], lang_pref) for user_id, lang_pref in records if user_id in users]
+    found_errors = iter(_create_users_external_records(found))
+    return [
+        next(found_errors) if user_id in users else ["User {} not found".format(user_id)]
+        for user_id, _ in records
+    ]
+
+
+def _hash_passwords(passwords, workers=0):
+    """
+    Hash plaintext passwords with the default hasher.
+
+    With more than one worker the hashing, which is CPU bound by design, is
+    spread over a pool of processes. None gives an unusable password, as
+    set_password(None) does.
+    """
+    if workers <= 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def create_edxapp_users(rows, site=None, password_hash_workers=None):
+    """
+    Creates many users at once using bulk inserts.
+
+    Each row takes the same keys as create_edxapp_user. The rows are checked
+    for conflicts, both against the database and among themselves, and the
+    User, Registration, UserProfile and created_on_site UserAttribute rows are
+    inserted with bulk_create in transactions of EOX_CORE_BULK_CREATE_CHUNK_SIZE
+    users. If a chunk hits an integrity error (e.g. a concurrent signup) its
+    rows are retried one by one so that only the offending rows fail.
+
+    Bulk inserts do not send post_save for the new rows. Of what the
+    edx-platform receivers of User would do, the UserSignupSource of
+    user_signup_handler is inserted here, and the comments service user and
+    language preference are created afterwards, inline or by the task worker.
+    The rest does not happen for these users: user_pre_save_callback and
+    user_post_save_callback do not emit the USER_FIELD_CHANGED events nor
+    auto enroll the user in the courses of its CourseEnrollmentAllowed rows,
+    and the UserProfile callbacks emit no events for the profile fields.
+
+    A row may carry a password_hash, in a format of the PASSWORD_HASHERS
+    setting, which is stored as is. The plaintext passwords of the other rows
+    are hashed up front by password_hash_workers processes, by default
+    EOX_CORE_BULK_PASSWORD_HASH_WORKERS; rows without password (skip_password)
+    get an unusable one.
+
+    Returns a list with a (user, errors) tuple per row, in the same order.
+    """
+    results = [None] * len(rows)
+    pending = []
+    seen_usernames = set()
+    seen_emails = set()
+
+    rows = [dict(row) for row in rows]
+    account_conflicts = check_edxapp_account_conflicts_bulk(
+        [(row.get("email"), row.get("username")) for row in rows]
+    )
+
+    for index, (row, conflicts) in enumerate(zip(rows, account_conflicts)):
+        if row.get("username", "").lower() in seen_usernames and "username" not in conflicts:
+            conflicts.append("username")
+        if row.get("email", "").lower() in seen_emails and "email" not in conflicts:
+            conflicts.append("email")
+
+        if conflicts:
+            results[index] = (None, ["Fatal: account collition with the provided: {}".format(", ".join(conflicts))])
+            continue
+
+        if row.get("password_hash"):
+            try:
+                identify_hasher(row["password_hash"])
+            except ValueError:
+                results[index] = (None, ["Fatal: unknown password hash format"])
+                continue
+
+        seen_usernames.add(row["username"].lower())
+        seen_emails.add(row["email"].lower())
+        pending.append((index, row))
+
+    if password_hash_workers is None:
+        password_hash_workers = getattr(settings, "EOX_CORE_BULK_PASSWORD_HASH_WORKERS", 0)
+    plaintext_rows = [row for _, row in pending if not row.get("password_hash")]
+    hashes = _hash_passwords([row.pop("password", None) for row in plaintext_rows], password_hash_workers)
+    for row, password_hash in zip(plaintext_rows, hashes):
+        row["password_hash"] = password_hash
+
+    chunk_size = getattr(settings, "EOX_CORE_BULK_CREATE_CHUNK_SIZE", 500)
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        try:
+            created = _insert_users([row for _, row in chunk], site)
+        except IntegrityError:
+            created = []
+            for _, row in chunk:
+                try:
+                    created += _insert_users([row], site)
+                except IntegrityError as error:
+                    LOG.warning("Could not create user %s: %s", row.get("username"), error)
+                    created.append(None)
+
+        created_rows = [(index, row, user) for (index, row), user in zip(chunk, created) if user is not None]
+        external_errors = _handle_users_external_records(
+            [(user, row.get("language_preference")) for _, row, user in created_rows]
+        )
+        for (index, _, user), errors in zip(created_rows, external_errors):
+            results[index] = (user, ([] if site else ["The user was not assigned to any site"]) + errors)
+
+        for (index, _), user in zip(chunk, created):
+            if user is None:
+                results[index] = (None, ["Fatal: the user could not be created"])
+
+    return results
+
+
+def _insert_users(rows, site=None):
+    """
+    Insert the users described by rows, with their registrations, profiles
+    and signup sources, in a single transaction.
+
+    Returns the created users in the same order as rows.
+    """
+    # Same site as the UserSignupSource written by user_signup_handler of edx-platform
+    signup_site = get_configuration_helper().get_value("SITE_NAME")
+    users = []
+    for row in rows:
+        first_name = row.get("first_name", '')
+        last_name = row.get("last_name", '')
+        row["name"] = row["fullname"] if "fullname" in row else (first_name + " " + last_name).strip()
+        user = User(
+            username=row["username"],
+            email=row["email"],
+            first_name=first_name,
+            last_name=last_name,
+            is_active=True,
+            password=row["password_hash"],
+        )
+        users.append(user)
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        # Some databases (MySQL) do not return the primary keys of bulk inserts.
+        created = User.objects.in_bulk([user.username for user in users], field_name="username")
+        users = [created[user.username] for user in users]
+
+        Registration.objects.bulk_create([
+            Registration(user=user, activation_key=uuid.uuid4().hex) for user in users
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, **{key: row.get(key) for key in USER_PROFILE_FIELDS})
+            for user, row in zip(users, rows)
+        ])
+        if signup_site:
+            UserSignupSource.objects.bulk_create([
+                UserSignupSource(user=user, site=signup_site) for user in users
+            ])
+        if site:
+            UserAttribute.objects.bulk_create([
+                UserAttribute(user=user, name="created_on_site", value=site.domain) for user in users
+            ])
+        # bulk_create does not send post_save
+        add_account_identifiers([value for user in users for value in (user.username, user.email)])
+
+    if signup_site:
+        bump_on_commit(bump_group_memberships_version)
+    return users
+
+
+def get_edxapp_users_by_identifiers(usernames=(), emails=(), ids=()):
+    """
+    Retrieve the users with any of the given usernames, emails or ids, and
+    their profiles, in a single query.
+    """
+    return list(
+        User.objects.filter(
+            Q(username__in=usernames) | Q(email__in=emails) | Q(pk__in=ids),
+        ).select_related("profile")
+    )
+
+
+def update_edxapp_users(updates):
+    """
+    Write the changes of many users with bulk updates.
+
+    updates is a list of (user, user_fields, profile_fields) tuples, where the
+    changed values are already set on the user and its profile. The changes
+    are written in transactions of EOX_CORE_BULK_UPDATE_CHUNK_SIZE users, with
+    one UPDATE per distinct list of fields. If a chunk hits an integrity error
+    its users are written one by one so that only the offending ones fail.
+
+    Bulk updates do not send post_save, so the versions of the written users
+    are bumped here.
+
+    Returns a list with None for every update written, or an error message.
+    """
+    results = [None] * len(updates)
+    chunk_size = getattr(settings, "EOX_CORE_BULK_UPDATE_CHUNK_SIZE", 500)
+    for start in range(0, len(updates), chunk_size):
+        chunk = updates[start:start + chunk_size]
+        try:
+            _write_user_changes(chunk)
+        except IntegrityError:
+            for offset, update in enumerate(chunk):
+                try:
+                    _write_user_changes([update])
+                except IntegrityError as error:
+                    LOG.warning("Could not update user %s: %s", update[0].username, error)
+                    results[start + offset] = "Fatal: the user could not be updated"
+    return results
+
+
+def _write_user_changes(updates):
+    """
+    Write the changes of the users of updates in a single transaction.
+    """
+    users_by_fields = {}
+    profiles_by_fields = {}
+    for user, user_fields, profile_fields in updates:
+        if user_fields:
+            users_by_fields.setdefault(tuple(sorted(user_fields)), []).append(user)
+        if profile_fields:
+            profiles_by_fields.setdefault(tuple(sorted(profile_fields)), []).append(user.profile)
+
+    with transaction.atomic():
+        for fields, users in users_by_fields.items():
+            User.objects.bulk_update(users, fields)
+        for fields, profiles in profiles_by_fields.items():
+            UserProfile.objects.bulk_update(profiles, fields)
+        # bulk_update does not send post_save
+        index_profiles(
+            [(user.pk, user.profile.get_meta()) for user, _, profile_fields in updates if "meta" in profile_fields],
+            get_current_domain(),
+        )
+        add_account_identifiers([
+            value
+            for user, user_fields, _ in updates if {"username", "email"}.intersection(user_fields)
+            for value in (user.username, user.email)
+        ])
+
+    bump_on_commit(
+        bump_user_versions,
+        [user.pk for user, user_fields, profile_fields in updates if user_fields or profile_fields],
+    )
+    renamed = [user.pk for user, user_fields, _ in updates if "username" in user_fields]
+    if renamed:
+        # The rosters show the usernames
+        bump_on_commit(bump_course_roster_versions, set(
+            str(course_id)
+            for course_id in CourseEnrollment.objects.filter(user_id__in=renamed).values_list("course_id", flat=True)
+        ))
+
+
+def set_edxapp_users_active(is_active, dry_run=False, **predicate):
+    """
+    Set is_active on every user matched by the predicate, with set based
+    UPDATEs in chunks of EOX_CORE_BULK_UPDATE_CHUNK_SIZE users.
+
+    The predicate takes any of usernames and emails (an explicit list),
+    last_login_before, email_domain, group and domain (users with a signup
+    source on the site), and the users must match all of them. Staff users
+    and superusers are never changed.
+
+    The UPDATEs send no post_save, so every chunk bumps the versions of its
+    users and sends users_active_changed once.
+
+    Returns a dict with the number of users updated, or that would be with
+    dry_run, and of users matched that already had the given is_active.
+    """
+    users = User.objects.filter(is_staff=False, is_superuser=False)
+    if predicate.get("usernames") is not None or predicate.get("emails") is not None:
+        users = users.filter(
+            Q(username__in=predicate.get("usernames") or []) | Q(email__in=predicate.get("emails") or []),
+        )
+    if predicate.get("last_login_before"):
+        users = users.filter(Q(last_login__lt=predicate["last_login_before"]) | Q(last_login__isnull=True))
+    if predicate.get("email_domain"):
+        users = users.filter(email__iendswith="@" + predicate["email_domain"])
+    if predicate.get("group"):
+        users = users.filter(groups__name=predicate["group"])
+    if predicate.get("domain"):
+        users = users.filter(pk__in=UserSignupSource.objects.filter(site=predicate["domain"]).values("user_id"))
+
+    unchanged = users.filter(is_active=is_active).count()
+    pending = users.exclude(is_active=is_active)
+    if dry_run:
+        return {"updated": pending.count(), "unchanged": unchanged}
+
+    updated = 0
+    after = 0
+    chunk_size = getattr(settings, "EOX_CORE_BULK_UPDATE_CHUNK_SIZE", 500)
+    while True:
+        user_ids = list(pending.filter(pk__gt=after).order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not user_ids:
+            break
+        after = user_ids[-1]
+        with transaction.atomic():
+            updated += User.objects.filter(pk__in=user_ids).exclude(is_active=is_active).update(is_active=is_active)
+        # update() does not send post_save
+        bump_on_commit(bump_user_versions, user_ids)
+        users_active_changed.send(sender=User, user_ids=user_ids, is_active=is_active)
+
+    return {"updated": updated, "unchanged": unchanged}
+
+
 def get_all_users():
     users = User.objects.all()
     return users
@@ -186,7 +694,7 @@ def get_edxapp_user(**kwargs):
 
     try:
         user = User.objects.get(**params)
-        for source_method in FetchUserSiteSources.get_enabled_source_methods():
+        for source_method in FetchUserSiteSources.get_enabled_source_methods(site):
             if source_method(user, domain):
                 break
         # else:
@@ -247,6 +755,9 @@ def delete_edxapp_user(*args, **kwargs):
                 # Delete user signup source object
                 signup_sources[0].delete()
 
+                # Drop the copies of the extended profile fields
+                remove_indexed_values(user.id)
+
                 msg = "{user} has been removed".format(user=user_response)
         else:
             for signup_source in signup_sources:
@@ -283,12 +794,9 @@ class FetchUserSiteSources:
     """
 
     @classmethod
-    def get_enabled_source_methods(cls):
+    def get_enabled_source_methods(cls, site=None):
         """ Brings the array of methods to check if an user belongs to a site. """
-        sources = configuration_helpers.get_value(
-            'EOX_CORE_USER_ORIGIN_SITE_SOURCES',
-            getattr(settings, 'EOX_CORE_USER_ORIGIN_SITE_SOURCES')
-        )
+        sources = get_site_snapshot(site).origin_sources
         return [getattr(cls, source) for source in sources]
 
     @staticmethod
@@ -333,3 +841,29 @@ def get_user_profile():
 def get_user_attribute():
     """ Gets the UserAttribute model """
     return UserAttribute
+
+
+def get_social_link():
+    """ Gets the SocialLink model """
+    return SocialLink
+
+
+def get_user_related_models():
+    """
+    Gets the models, besides User, UserProfile and SocialLink, that
+    UserReadOnlySerializer reads from. Their rows belong to a user through
+    user_id or user_profile.
+    """
+    return [UserPreference, AccountRecovery, LanguageProficiency, UserAttribute]
+
+
+def get_account_identifiers():
+    """
+    Iterates over every taken username and email, including the retired ones
+    and the original usernames of the retirement requests.
+    """
+    for username, email in User.objects.values_list("username", "email").iterator():
+        yield username
+        yield email
+    for original_username in UserRetirementStatus.objects.values_list("original_username", flat=True).iterator():
+        yield original_username
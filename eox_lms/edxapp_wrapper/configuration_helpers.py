@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Configuration helpers public function definitions
+"""
+
+from importlib import import_module
+
+from django.conf import settings
+
+
+def get_configuration_helper():
+    """ Gets the configuration helpers module of edxapp """
+    return configuration_helper_backend().get_configuration_helper()
+
+
+def get_site_configuration_model():
+    """ Gets the SiteConfiguration model """
+    return configuration_helper_backend().get_site_configuration_model()
+
+
+def configuration_helper_backend():
+    """ Get the backend for the configuration helpers """
+    return import_module(settings.EOX_CORE_CONFIGURATION_HELPER_BACKEND)
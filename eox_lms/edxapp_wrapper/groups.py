@@ -19,11 +19,36 @@ def get_all_groups():
     return group_backend().get_all_groups()
 
 
+def get_groups_with_member_counts(domain=None, offset=0, limit=1000):
+    """ Gets a page of the groups with their member counts """
+    return group_backend().get_groups_with_member_counts(domain=domain, offset=offset, limit=limit)
+
+
 def get_groups(user):
     """ Gets the groups for the user """
     return group_backend().get_groups(user)
 
 
+def get_group_ids():
+    """ Gets the ids of all the groups by name """
+    return group_backend().get_group_ids()
+
+
+def get_groups_for_users(user_ids):
+    """ Gets the group names of each user """
+    return group_backend().get_groups_for_users(user_ids)
+
+
+def set_user_groups(user, add=(), remove=()):
+    """ Adds and removes the user to and from the named groups, returning the unknown names """
+    return group_backend().set_user_groups(user, add=add, remove=remove)
+
+
+def sync_group_members(name, usernames=(), emails=()):
+    """ Makes the given users the only members of the group """
+    return group_backend().sync_group_members(name, usernames=usernames, emails=emails)
+
+
 def group_backend():
     """ Get the backend for the groups """
     return import_module(settings.EOX_CORE_GROUPS_BACKEND)
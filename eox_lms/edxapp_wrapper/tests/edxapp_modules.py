@@ -0,0 +1,59 @@
+"""
+Import of the backends that run on edx-platform, for their tests.
+"""
+import sys
+from importlib import import_module
+
+import mock
+from django.apps import apps
+
+# Modules of edx-platform and its dependencies read by the backends
+EDXAPP_MODULES = [
+    "common",
+    "common.djangoapps",
+    "common.djangoapps.student",
+    "common.djangoapps.student.helpers",
+    "common.djangoapps.student.models",
+    "openedx",
+    "openedx.core",
+    "openedx.core.djangoapps",
+    "openedx.core.djangoapps.lang_pref",
+    "openedx.core.djangoapps.user_api",
+    "openedx.core.djangoapps.user_api.accounts",
+    "openedx.core.djangoapps.user_api.accounts.serializers",
+    "openedx.core.djangoapps.user_api.accounts.views",
+    "openedx.core.djangoapps.user_api.models",
+    "openedx.core.djangoapps.user_api.preferences",
+    "openedx.core.djangoapps.user_authn",
+    "openedx.core.djangoapps.user_authn.views",
+    "openedx.core.djangoapps.user_authn.views.registration_form",
+    "openedx.core.djangolib",
+    "openedx.core.djangolib.oauth2_retirement_utils",
+    "user_util",
+]
+
+
+def import_edxapp_backend(name):
+    """
+    Import the backend module name, with the edx-platform modules that are not
+    available replaced by mocks, so that its own logic runs against the test
+    database. The edx-platform models are mocks too, every call returns a new
+    module.
+    """
+    mocked = {}
+    for module in EDXAPP_MODULES:
+        try:
+            import_module(module)
+        except ImportError:
+            mocked[module] = mock.MagicMock()
+    if not apps.is_installed("social_django"):
+        mocked["social_django"] = mocked["social_django.models"] = mock.MagicMock()
+
+    sys.modules.update(mocked)
+    sys.modules.pop(name, None)
+    try:
+        return import_module(name)
+    finally:
+        sys.modules.pop(name, None)
+        for module in mocked:
+            sys.modules.pop(module, None)
@@ -0,0 +1,103 @@
+""" Tests for public groups API. """
+from __future__ import absolute_import, unicode_literals
+
+import mock
+from django.contrib.auth.models import Group, User
+from django.test import TestCase, override_settings
+
+from ..groups import (
+    get_group_ids,
+    get_groups_for_users,
+    get_groups_with_member_counts,
+    set_user_groups,
+    sync_group_members,
+)
+
+
+@override_settings(EOX_CORE_GROUPS_BACKEND="eox_lms.edxapp_wrapper.backends.groups_l_v1")
+class GroupsTest(TestCase):
+    """ Tests for the public groups module """
+
+    @mock.patch('eox_lms.edxapp_wrapper.groups.import_module')
+    def test_import_the_backend(self, m_import):
+        """ Test we import the correct backend defined in the settings """
+
+        get_group_ids()
+        m_import.assert_called_with("eox_lms.edxapp_wrapper.backends.groups_l_v1")
+
+    @mock.patch('eox_lms.edxapp_wrapper.groups.import_module')
+    def test_call_the_backend(self, m_import):
+        """ Test we use the imported backend for bulk membership reads """
+        m_groups_backend = mock.MagicMock()
+        m_import.return_value = m_groups_backend
+
+        get_groups_for_users([1, 2])
+        m_groups_backend.get_groups_for_users.assert_called_with([1, 2])
+
+
+@override_settings(EOX_CORE_GROUPS_BACKEND="eox_lms.edxapp_wrapper.backends.groups_l_v1")
+class SetUserGroupsTest(TestCase):
+    """ Tests for set_user_groups of the groups_l_v1 backend """
+
+    def test_add_and_remove(self):
+        """ Test the groups are added and removed by name, reporting the unknown ones """
+        learners = Group.objects.create(name="learners")
+        staff = Group.objects.create(name="staff")
+        user = User.objects.create(username="john", email="john@example.com")
+        user.groups.add(staff)
+
+        unknown = set_user_groups(user, add=["learners", "missing"], remove=["staff"])
+
+        self.assertEqual(unknown, ["missing"])
+        self.assertEqual(list(user.groups.all()), [learners])
+
+    def test_sync_group_members(self):
+        """ Test the group ends up with exactly the desired members """
+        group = Group.objects.create(name="learners")
+        kept, removed, added = [
+            User.objects.create(username=username, email="{}@example.com".format(username))
+            for username in ("kept", "removed", "added")
+        ]
+        group.user_set.add(kept, removed)
+
+        result = sync_group_members("learners", usernames=["kept", "ghost"], emails=["added@example.com"])
+
+        self.assertEqual(result, {"added": 1, "removed": 1, "unchanged": 1, "not_found": ["ghost"]})
+        self.assertEqual(set(group.user_set.all()), {kept, added})
+
+    def test_sync_group_members_locks_the_group(self):
+        """ Test a membership changed before the lock is taken is reconciled and counted """
+        group = Group.objects.create(name="learners")
+        kept, late = [
+            User.objects.create(username=username, email="{}@example.com".format(username))
+            for username in ("kept", "late")
+        ]
+        group.user_set.add(kept)
+        select_for_update = Group.objects.select_for_update
+
+        def concurrent_add():
+            """ Another request adds a member right before the lock """
+            late.groups.add(group)
+            return select_for_update()
+
+        with mock.patch.object(Group.objects, "select_for_update", side_effect=concurrent_add) as lock:
+            result = sync_group_members("learners", usernames=["kept"])
+
+        lock.assert_called_once_with()
+        self.assertEqual(result, {"added": 0, "removed": 1, "unchanged": 1, "not_found": []})
+        self.assertEqual(list(group.user_set.all()), [kept])
+
+    def test_member_counts(self):
+        """ Test the groups are listed by name with their member counts """
+        learners = Group.objects.create(name="learners")
+        Group.objects.create(name="staff")
+        learners.user_set.add(*[
+            User.objects.create(username=username, email="{}@example.com".format(username))
+            for username in ("john", "jane")
+        ])
+
+        self.assertEqual(
+            get_groups_with_member_counts(),
+            [{"name": "learners", "member_count": 2}, {"name": "staff", "member_count": 0}],
+        )
+        self.assertEqual(get_groups_with_member_counts(offset=1, limit=1), [{"name": "staff", "member_count": 0}])
@@ -0,0 +1,216 @@
+""" Tests for the user_social_auth_l_v1 backend. """
+from __future__ import absolute_import, unicode_literals
+
+from unittest import skipUnless
+
+import mock
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+if apps.is_installed("social_django"):
+    from social_django.models import UserSocialAuth
+
+    from ..backends import user_social_auth_l_v1 as backend
+
+
+@skipUnless(apps.is_installed("social_django"), "social_django is not installed")
+class UserSocialAuthsPageTest(TestCase):
+    """ Tests for get_user_social_auths_page """
+
+    def setUp(self):
+        """ Link two users to two providers """
+        super(UserSocialAuthsPageTest, self).setUp()
+        john = User.objects.create(username="johndoe", email="johndoe@example.com")
+        jane = User.objects.create(username="janedoe", email="janedoe@example.com")
+        self.auths = [
+            UserSocialAuth.objects.create(user=john, provider="tpa-saml", uid="idp:john"),
+            UserSocialAuth.objects.create(user=jane, provider="tpa-saml", uid="idp:jane"),
+            UserSocialAuth.objects.create(user=john, provider="google-oauth2", uid="john@example.com"),
+        ]
+
+    def test_keyset_pages(self):
+        """ Test the pages continue after the last id of the previous one """
+        first = backend.get_user_social_auths_page(after=0, limit=2)
+        second = backend.get_user_social_auths_page(after=first[-1]["id"], limit=2)
+
+        self.assertEqual(
+            first,
+            [
+                {"id": self.auths[0].id, "provider": "tpa-saml", "uid": "idp:john", "username": "johndoe"},
+                {"id": self.auths[1].id, "provider": "tpa-saml", "uid": "idp:jane", "username": "janedoe"},
+            ],
+        )
+        self.assertEqual([auth["id"] for auth in second], [self.auths[2].id])
+        self.assertEqual(backend.get_user_social_auths_page(after=second[-1]["id"], limit=2), [])
+
+    def test_filters(self):
+        """ Test every filter narrows the page """
+        def uids(**filters):
+            return [auth["uid"] for auth in backend.get_user_social_auths_page(**filters)]
+
+        self.assertEqual(uids(provider="tpa-saml"), ["idp:john", "idp:jane"])
+        self.assertEqual(uids(uid="john@example.com"), ["john@example.com"])
+        self.assertEqual(uids(username="johndoe"), ["idp:john", "john@example.com"])
+        self.assertEqual(uids(provider="tpa-saml", username="johndoe"), ["idp:john"])
+
+
+@skipUnless(apps.is_installed("social_django"), "social_django is not installed")
+class AddUserSocialAuthsTest(TestCase):
+    """ Tests for add_user_social_auths """
+
+    def setUp(self):
+        """ Create two users, john already linked """
+        super(AddUserSocialAuthsTest, self).setUp()
+        self.john = User.objects.create(username="johndoe", email="johndoe@example.com")
+        self.jane = User.objects.create(username="janedoe", email="janedoe@example.com")
+        UserSocialAuth.objects.create(user=self.john, provider="tpa-saml", uid="idp:john")
+
+    def test_row_outcomes(self):
+        """ Test the status or error of every kind of row """
+        results = backend.add_user_social_auths([
+            {"username": "JaneDoe", "provider": "tpa-saml", "uid": "idp:jane"},
+            {"username": "ghost", "provider": "tpa-saml", "uid": "idp:ghost"},
+            {"username": "johndoe", "provider": "tpa-saml", "uid": "idp:john"},
+            {"username": "janedoe", "provider": "tpa-saml", "uid": "idp:john"},
+            {"username": "johndoe", "provider": "tpa-saml", "uid": "idp:jane"},
+        ])
+
+        self.assertEqual(results, [
+            ("created", None),
+            (None, "No user found with username ghost"),
+            ("exists", None),
+            (None, "The uid is already linked to another user for this provider"),
+            (None, "The uid is repeated in a previous row"),
+        ])
+        self.assertEqual(UserSocialAuth.objects.get(provider="tpa-saml", uid="idp:jane").user, self.jane)
+
+    def test_pairs_lost_to_a_concurrent_insert(self):
+        """ Test a pair inserted by another request between the read and the insert fails its row """
+        bulk_create = UserSocialAuth.objects.bulk_create
+
+        def concurrent_insert(*args, **kwargs):
+            """ Another request links jane's uid to john first """
+            UserSocialAuth.objects.create(user=self.john, provider="tpa-saml", uid="idp:jane")
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(UserSocialAuth.objects, "bulk_create", side_effect=concurrent_insert):
+            results = backend.add_user_social_auths([
+                {"username": "janedoe", "provider": "tpa-saml", "uid": "idp:jane"},
+                {"username": "janedoe", "provider": "google-oauth2", "uid": "jane@example.com"},
+            ])
+
+        self.assertEqual(results, [
+            (None, "The uid is already linked to another user for this provider"),
+            ("created", None),
+        ])
+        self.assertEqual(UserSocialAuth.objects.get(provider="tpa-saml", uid="idp:jane").user, self.john)
+
+    @override_settings(EOX_CORE_BULK_CREATE_CHUNK_SIZE=1)
+    def test_chunks(self):
+        """ Test a pair created by a previous chunk exists for the following ones """
+        results = backend.add_user_social_auths([
+            {"username": "janedoe", "provider": "tpa-saml", "uid": "idp:jane"},
+            {"username": "janedoe", "provider": "tpa-saml", "uid": "idp:jane"},
+        ])
+
+        self.assertEqual(results, [("created", None), ("exists", None)])
+
+
+@skipUnless(apps.is_installed("social_django"), "social_django is not installed")
+class AddSlugToUserSocialAuthUidsTest(TestCase):
+    """ Tests for add_slug_to_user_social_auth_uids """
+
+    def setUp(self):
+        """ Link users of two sites to the same provider """
+        super(AddSlugToUserSocialAuthUidsTest, self).setUp()
+        users = {
+            username: User.objects.create(username=username, email="{}@example.com".format(username))
+            for username in ("john", "jane", "ann", "bob", "eve")
+        }
+        self.auths = {
+            username: UserSocialAuth.objects.create(user=user, provider="oidc", uid=username)
+            for username, user in users.items()
+        }
+        self.signup_sources = [
+            (users["john"].id, "tenant.example.com"),
+            (users["jane"].id, "Tenant.example.com"),
+            (users["ann"].id, "tenant.example.com"),
+            (users["bob"].id, "other.example.com"),
+            (users["eve"].id, "tenant.example.com"),
+            (users["eve"].id, "other.example.com"),
+        ]
+        user_signup_source = mock.Mock()
+        user_signup_source.objects.filter.return_value.values_list.return_value = self.signup_sources
+        patcher = mock.patch.object(backend, "get_user_signup_source", return_value=user_signup_source)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def uids(self):
+        """ Return the uid of every auth by username """
+        return dict(UserSocialAuth.objects.values_list("user__username", "uid"))
+
+    def test_outcomes(self):
+        """ Test only the uids of the users of the site are migrated """
+        UserSocialAuth.objects.filter(pk=self.auths["jane"].pk).update(uid="idp:jane")
+        UserSocialAuth.objects.create(
+            user=User.objects.create(username="other", email="other@example.com"),
+            provider="oidc",
+            uid="idp:ann",
+        )
+
+        last_id, read, migrated, skipped = backend.add_slug_to_user_social_auth_uids(
+            "oidc", "idp", "tenant.example.com",
+        )
+
+        self.assertEqual(last_id, UserSocialAuth.objects.latest("id").id)
+        self.assertEqual((read, migrated), (6, 1))
+        self.assertEqual(skipped, [
+            (self.auths["ann"].id, "The new uid already belongs to another social auth"),
+            (self.auths["eve"].id, "The user also signed up on another site"),
+        ])
+        self.assertEqual(self.uids(), {
+            "john": "idp:john",
+            "jane": "idp:jane",
+            "ann": "ann",
+            "bob": "bob",
+            "eve": "eve",
+            "other": "idp:ann",
+        })
+
+    def test_too_long(self):
+        """ Test the uids that would not fit the column are skipped """
+        long_uid = "x" * UserSocialAuth._meta.get_field("uid").max_length  # pylint: disable=protected-access
+        UserSocialAuth.objects.filter(pk=self.auths["john"].pk).update(uid=long_uid)
+
+        _, _, migrated, skipped = backend.add_slug_to_user_social_auth_uids("oidc", "idp", "tenant.example.com")
+
+        self.assertEqual(migrated, 2)
+        self.assertEqual(skipped[0][0], self.auths["john"].id)
+        self.assertEqual(self.uids()["john"], long_uid)
+
+    def test_batches(self):
+        """ Test the batches continue after the last id read """
+        last_id, read, migrated, _ = backend.add_slug_to_user_social_auth_uids(
+            "oidc", "idp", "tenant.example.com", limit=2,
+        )
+        self.assertEqual((last_id, read, migrated), (self.auths["jane"].id, 2, 2))
+
+        last_id, read, migrated, _ = backend.add_slug_to_user_social_auth_uids(
+            "oidc", "idp", "tenant.example.com", after=last_id, limit=2,
+        )
+        self.assertEqual((last_id, read, migrated), (self.auths["bob"].id, 2, 1))
+
+        self.assertEqual(
+            backend.add_slug_to_user_social_auth_uids("oidc", "idp", "tenant.example.com", after=self.auths["eve"].id),
+            (None, 0, 0, []),
+        )
+
+    def test_dry_run(self):
+        """ Test a dry run counts the uids without writing them """
+        _, _, migrated, _ = backend.add_slug_to_user_social_auth_uids(
+            "oidc", "idp", "tenant.example.com", dry_run=True,
+        )
+
+        self.assertEqual(migrated, 3)
+        self.assertEqual(self.uids(), {username: username for username in self.auths})
@@ -5,7 +5,7 @@ import mock
 from django.conf import settings
 from django.test import TestCase
 
-from ..users import create_edxapp_user
+from ..users import check_edxapp_account_conflicts_bulk, create_edxapp_user
 
 
 class CreateEdxappUserTest(TestCase):
@@ -31,3 +31,17 @@ class CreateEdxappUserTest(TestCase):
 
         create_edxapp_user(data)
         m_user_backend.create_edxapp_user.assert_called_with(data)
+
+
+class CheckEdxappAccountConflictsBulkTest(TestCase):
+    """ Tests for the bulk account conflicts check """
+
+    @mock.patch('eox_lms.edxapp_wrapper.users.import_module')
+    def test_call_the_backend(self, m_import):
+        """ Test we hand all the pairs to the backend in a single call """
+        m_user_backend = mock.MagicMock()
+        m_import.return_value = m_user_backend
+        pairs = [("john@example.com", "john"), ("jane@example.com", "jane")]
+
+        check_edxapp_account_conflicts_bulk(pairs)
+        m_user_backend.check_edxapp_account_conflicts_bulk.assert_called_once_with(pairs)
@@ -0,0 +1,206 @@
+""" Tests for the logic of the users_l_v1 backend. """
+from __future__ import absolute_import, unicode_literals
+
+from datetime import timedelta
+
+import mock
+from django.contrib.auth.models import Group, User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ...signals import users_active_changed
+from ...tests.on_commit import run_on_commit_callbacks
+from .edxapp_modules import import_edxapp_backend
+
+
+class InsertUsersTest(TestCase):
+    """ Tests for the bulk inserts of create_edxapp_users """
+
+    def setUp(self):
+        """ Import the backend with the site name of the current site """
+        super(InsertUsersTest, self).setUp()
+        self.backend = import_edxapp_backend("eox_lms.edxapp_wrapper.backends.users_l_v1")
+        self.site_name = "tenant.example.com"
+        patcher = mock.patch.object(self.backend, "get_configuration_helper")
+        patcher.start().return_value.get_value.side_effect = lambda name: self.site_name if name == "SITE_NAME" else None
+        self.addCleanup(patcher.stop)
+
+    def rows(self):
+        """ Rows of two new users """
+        return [
+            {"username": username, "email": username + "@example.com", "password_hash": "!", "fullname": username}
+            for username in ("johndoe", "janedoe")
+        ]
+
+    def test_signup_sources_are_inserted(self):
+        """ Test every user gets the signup source user_signup_handler would write """
+        users = self.backend._insert_users(self.rows(), site=mock.Mock(domain=self.site_name))  # pylint: disable=protected-access
+
+        self.assertEqual([user.username for user in users], ["johndoe", "janedoe"])
+        self.assertEqual(User.objects.filter(pk__in=[user.pk for user in users]).count(), 2)
+        signup_source = self.backend.UserSignupSource
+        self.assertEqual(
+            [call[1] for call in signup_source.call_args_list],
+            [{"user": users[0], "site": self.site_name}, {"user": users[1], "site": self.site_name}],
+        )
+        signup_source.objects.bulk_create.assert_called_once_with([signup_source.return_value] * 2)
+
+    def test_no_signup_source_without_site_name(self):
+        """ Test nothing is written when the handler would not write a signup source either """
+        self.site_name = None
+
+        self.backend._insert_users(self.rows())  # pylint: disable=protected-access
+
+        self.backend.UserSignupSource.objects.bulk_create.assert_not_called()
+
+
+class SetUsersActiveTest(TestCase):
+    """ Tests for set_edxapp_users_active """
+
+    def setUp(self):
+        """ Create users with different logins, email domains, groups and sites """
+        super(SetUsersActiveTest, self).setUp()
+        self.backend = import_edxapp_backend("eox_lms.edxapp_wrapper.backends.users_l_v1")
+        now = timezone.now()
+        self.users = {
+            "john": User.objects.create(username="john", email="john@one.com", last_login=now),
+            "jane": User.objects.create(username="jane", email="jane@two.com", last_login=now - timedelta(days=90)),
+            "ann": User.objects.create(username="ann", email="ann@one.com"),
+            "bob": User.objects.create(username="bob", email="bob@two.com", is_active=False),
+            "staff": User.objects.create(username="staff", email="staff@one.com", is_staff=True),
+            "admin": User.objects.create(username="admin", email="admin@one.com", is_superuser=True),
+        }
+        Group.objects.create(name="cohort").user_set.add(self.users["jane"], self.users["bob"], self.users["staff"])
+        self.backend.UserSignupSource.objects.filter.return_value.values.return_value = [
+            self.users[username].pk for username in ("john", "bob", "admin")
+        ]
+        patcher = mock.patch.object(self.backend, "bump_user_versions")
+        self.bump_user_versions = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.active_changes = []
+        users_active_changed.connect(self.record_active_change)
+        self.addCleanup(users_active_changed.disconnect, self.record_active_change)
+
+    def record_active_change(self, sender, user_ids, is_active, **kwargs):  # pylint: disable=unused-argument
+        """ Keep the users_active_changed sent """
+        self.active_changes.append((user_ids, is_active))
+
+    def inactive(self):
+        """ Return the usernames of the inactive users """
+        return set(User.objects.filter(is_active=False).values_list("username", flat=True))
+
+    def deactivate(self, **predicate):
+        """ Deactivate the users of predicate and return the usernames of the inactive users """
+        self.backend.set_edxapp_users_active(False, **predicate)
+        return self.inactive()
+
+    def test_predicates(self):
+        """ Test every predicate matches its users, never staff nor superusers """
+        cases = [
+            ({"usernames": ["john", "staff"]}, {"john"}),
+            ({"emails": ["ann@one.com", "admin@one.com"]}, {"ann"}),
+            ({"usernames": ["john"], "emails": ["ann@one.com"]}, {"john", "ann"}),
+            ({"usernames": []}, set()),
+            ({"last_login_before": timezone.now() - timedelta(days=30)}, {"jane", "ann"}),
+            ({"email_domain": "ONE.com"}, {"john", "ann"}),
+            ({"group": "cohort"}, {"jane"}),
+            ({"domain": "tenant.example.com"}, {"john"}),
+        ]
+        for predicate, deactivated in cases:
+            with self.subTest(predicate=predicate):
+                User.objects.exclude(username="bob").update(is_active=True)
+                self.assertEqual(self.deactivate(**predicate), deactivated | {"bob"})
+
+        self.backend.UserSignupSource.objects.filter.assert_called_with(site="tenant.example.com")
+
+    def test_combined_predicates(self):
+        """ Test the users must match every predicate """
+        self.assertEqual(
+            self.deactivate(email_domain="one.com", last_login_before=timezone.now() - timedelta(days=30)),
+            {"ann", "bob"},
+        )
+        self.assertEqual(self.deactivate(group="cohort", email_domain="one.com"), {"ann", "bob"})
+        self.assertEqual(self.deactivate(domain="tenant.example.com", usernames=["john", "jane"]), {"john", "ann", "bob"})
+
+    def test_counts(self):
+        """ Test the users that already had is_active are counted apart """
+        self.assertEqual(
+            self.backend.set_edxapp_users_active(True, email_domain="two.com"),
+            {"updated": 1, "unchanged": 1},
+        )
+        self.assertEqual(
+            self.backend.set_edxapp_users_active(True, email_domain="two.com"),
+            {"updated": 0, "unchanged": 2},
+        )
+        self.assertEqual(self.inactive(), set())
+
+    def test_dry_run(self):
+        """ Test a dry run counts the users without writing, bumping or signaling """
+        self.assertEqual(
+            self.backend.set_edxapp_users_active(False, dry_run=True, email_domain="one.com"),
+            {"updated": 2, "unchanged": 0},
+        )
+
+        self.assertEqual(self.inactive(), {"bob"})
+        self.bump_user_versions.assert_not_called()
+        self.assertEqual(self.active_changes, [])
+
+    @override_settings(EOX_CORE_BULK_UPDATE_CHUNK_SIZE=2)
+    def test_chunks(self):
+        """ Test every chunk bumps the versions of its users and sends users_active_changed once """
+        ids = sorted(self.users[username].pk for username in ("john", "jane", "ann"))
+
+        with run_on_commit_callbacks():
+            result = self.backend.set_edxapp_users_active(False, last_login_before=timezone.now() + timedelta(days=1))
+            self.bump_user_versions.assert_not_called()
+
+        self.assertEqual(result, {"updated": 3, "unchanged": 1})
+        self.assertEqual(self.bump_user_versions.call_args_list, [mock.call(ids[:2]), mock.call(ids[2:])])
+        self.assertEqual(self.active_changes, [(ids[:2], False), (ids[2:], False)])
+
+
+@override_settings(EOX_CORE_COMMENTS_SERVICE_WORKERS=2)
+class ExternalRecordsTest(TestCase):
+    """ Tests for create_edxapp_users_external_records """
+
+    def setUp(self):
+        """ Create three users """
+        super(ExternalRecordsTest, self).setUp()
+        self.backend = import_edxapp_backend("eox_lms.edxapp_wrapper.backends.users_l_v1")
+        self.users = [
+            User.objects.create(username=username, email=username + "@example.com") for username in ("ann", "bob", "cid")
+        ]
+
+    def test_records_are_created_for_all_the_users_at_once(self):
+        """ Test the comments service calls cover every user and the preferences are written in bulk """
+        ann, bob, cid = self.users
+
+        def create_comments_service_user(user):
+            if user == bob:
+                raise ValueError("The comments service is down")
+        self.backend.create_comments_service_user.side_effect = create_comments_service_user
+
+        errors = self.backend.create_edxapp_users_external_records([
+            (ann.pk, "es"), (bob.pk, None), (0, "en"), (cid.pk, "fr"),
+        ])
+
+        self.assertEqual(errors, [[], ["No comments_service_user was created"], ["User 0 not found"], []])
+        self.assertEqual(
+            sorted(call[0][0].username for call in self.backend.create_comments_service_user.call_args_list),
+            ["ann", "bob", "cid"],
+        )
+        user_preference = self.backend.UserPreference
+        self.assertEqual(
+            [call[1] for call in user_preference.call_args_list],
+            [{"user": ann, "key": self.backend.LANGUAGE_KEY, "value": "es"},
+             {"user": cid, "key": self.backend.LANGUAGE_KEY, "value": "fr"}],
+        )
+        user_preference.objects.bulk_create.assert_called_once_with([user_preference.return_value] * 2)
+
+    def test_preference_errors(self):
+        """ Test a failed preference write is reported for every user with a language """
+        self.backend.UserPreference.objects.bulk_create.side_effect = ValueError("Lost connection")
+
+        errors = self.backend.create_edxapp_users_external_records([(self.users[0].pk, "es"), (self.users[1].pk, None)])
+
+        self.assertEqual(errors, [["Could not set lang preference 'es for user 'ann'"], []])
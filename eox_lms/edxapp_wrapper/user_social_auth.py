@@ -13,11 +13,25 @@ def get_user_social_auths(**kwargs):
     """ Gets the all the user social auths """
     return user_social_auth_backend().get_user_social_auths(**kwargs)
 
+def get_user_social_auths_page(**kwargs):
+    """ Gets a page of the user social auths after a given id """
+    return user_social_auth_backend().get_user_social_auths_page(**kwargs)
+
 def add_user_social_auth(**kwargs):
     """ add the user social auth """
     return user_social_auth_backend().add_user_social_auth(**kwargs)
 
 
+def add_user_social_auths(rows):
+    """ add many user social auths at once """
+    return user_social_auth_backend().add_user_social_auths(rows)
+
+
+def add_slug_to_user_social_auth_uids(*args, **kwargs):
+    """ rewrite a batch of user social auth uids to the slug:uid format """
+    return user_social_auth_backend().add_slug_to_user_social_auth_uids(*args, **kwargs)
+
+
 def user_social_auth_backend():
     """ Get the backend for the user social auths """
     return import_module(settings.EOX_CORE_USER_SOCIAL_AUTHS_BACKEND)
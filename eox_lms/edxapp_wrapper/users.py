@@ -42,6 +42,24 @@ def create_edxapp_user(*args, **kwargs):
     return backend.create_edxapp_user(*args, **kwargs)
 
 
+def create_edxapp_users(*args, **kwargs):
+    """ Creates many edxapp users at once """
+
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.create_edxapp_users(*args, **kwargs)
+
+
+def create_edxapp_users_external_records(*args, **kwargs):
+    """ Creates the comments service users and language preferences of existing users """
+
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.create_edxapp_users_external_records(*args, **kwargs)
+
+
 def delete_edxapp_user(*args, **kwargs):
     """ Deletes the edxapp user """
 
@@ -69,6 +87,42 @@ def check_edxapp_account_conflicts(*args, **kwargs):
     return backend.check_edxapp_account_conflicts(*args, **kwargs)
 
 
+def check_edxapp_account_conflicts_bulk(*args, **kwargs):
+    """ Checks the db for accounts with the same email or username for many accounts at once """
+
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.check_edxapp_account_conflicts_bulk(*args, **kwargs)
+
+
+def get_edxapp_users_by_identifiers(*args, **kwargs):
+    """ Gets the users with any of the given usernames or emails in a single query """
+
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.get_edxapp_users_by_identifiers(*args, **kwargs)
+
+
+def update_edxapp_users(*args, **kwargs):
+    """ Writes the changes of many users with bulk updates """
+
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.update_edxapp_users(*args, **kwargs)
+
+
+def set_edxapp_users_active(*args, **kwargs):
+    """ Sets is_active on the users matched by a predicate with set based updates """
+
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.set_edxapp_users_active(*args, **kwargs)
+
+
 def get_course_enrollment():
     """ Gets the CourseEnrollment model """
 
@@ -128,3 +182,27 @@ def get_user_attribute():
     backend = import_module(backend_function)
 
     return backend.get_user_attribute()
+
+
+def get_social_link():
+    """ Gets the SocialLink model """
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.get_social_link()
+
+
+def get_user_related_models():
+    """ Gets the models read by the user representation besides User, UserProfile and SocialLink """
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.get_user_related_models()
+
+
+def get_account_identifiers():
+    """ Iterates over every taken username and email """
+    backend_function = settings.EOX_CORE_USERS_BACKEND
+    backend = import_module(backend_function)
+
+    return backend.get_account_identifiers()
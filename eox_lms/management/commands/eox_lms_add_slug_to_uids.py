@@ -0,0 +1,107 @@
+"""
+Background migration of the user social auth uids to the slug:uid format.
+"""
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eox_lms.edxapp_wrapper.user_social_auth import add_slug_to_user_social_auth_uids
+from eox_lms.management.commands.eox_lms_import_users import write_checkpoint
+
+
+class Command(BaseCommand):
+    """
+    Rewrite the uids of the user social auths of a provider to the slug:uid
+    format of docs/decisions/0001-include-slug-in-uid.rst, in batches.
+
+    The provider column only holds the backend name, shared by the provider
+    configurations of every site that uses the backend, so the slug is only
+    written on the auths of the users that signed up on the given site. Run
+    the command once per site, with the slug of the configuration of that site.
+
+    The auths are read in id order and the id reached is written to a
+    checkpoint after every batch, so an interrupted migration resumes where
+    it stopped. Running the command again is harmless, the uids already
+    migrated are left alone. Once every provider is migrated, the rewrite at
+    login time (SOCIAL_AUTH_ALLOW_WRITE_SLUG_UID) and the fallback lookup of
+    the old uids (SOCIAL_AUTH_ALLOW_SLUGLESS_UID) can be turned off.
+
+    Example:
+        ./manage.py lms eox_lms_add_slug_to_uids --provider oidc --slug tenant-idp \\
+            --site tenant.example.com --rate 2000
+    """
+    help = "Rewrite the uids of the user social auths of a provider to slug:uid, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", required=True, help="Backend name stored in the provider column.")
+        parser.add_argument("--slug", required=True, help="Slug of the provider configuration.")
+        parser.add_argument(
+            "--site",
+            required=True,
+            help="Site of the provider configuration, as stored in the signup sources of its users.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Auths read and written per batch.")
+        parser.add_argument("--rate", type=float, default=0, help="Maximum auths processed per second, 0 for no limit.")
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file, defaults to ./eox_lms_add_slug_to_uids.<provider>.<site>.checkpoint",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first auth.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+
+    def handle(self, *args, **options):
+        provider = options["provider"]
+        slug = options["slug"]
+        site = options["site"]
+        checkpoint_path = options["checkpoint"] or "eox_lms_add_slug_to_uids.{}.{}.checkpoint".format(provider, site)
+        dry_run = options["dry_run"]
+
+        state = {"provider": provider, "slug": slug, "site": site, "after": 0, "processed": 0, "migrated": 0, "skipped": 0}
+        if not options["restart"] and not dry_run and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as checkpoint_file:
+                state = json.load(checkpoint_file)
+            if (state["provider"], state["slug"], state.get("site")) != (provider, slug, site):
+                raise CommandError("The checkpoint {} belongs to provider {} with slug {} on site {}".format(
+                    checkpoint_path, state["provider"], state["slug"], state.get("site"),
+                ))
+            self.stdout.write("Resuming after id {after}, {processed} auths processed".format(**state))
+
+        started_at = time.monotonic()
+        processed = 0
+        while True:
+            last_id, read, migrated, skipped = add_slug_to_user_social_auth_uids(
+                provider,
+                slug,
+                site,
+                after=state["after"],
+                limit=options["batch_size"],
+                dry_run=dry_run,
+            )
+            if last_id is None:
+                break
+
+            for auth_id, reason in skipped:
+                self.stdout.write("Skipped social auth {}: {}".format(auth_id, reason))
+            state.update(
+                after=last_id,
+                processed=state["processed"] + read,
+                migrated=state["migrated"] + migrated,
+                skipped=state["skipped"] + len(skipped),
+            )
+            if not dry_run:
+                write_checkpoint(checkpoint_path, state)
+            self.stdout.write("Up to id {after}: {processed} processed, {migrated} migrated, {skipped} skipped".format(
+                **state
+            ))
+
+            processed += read
+            if options["rate"]:
+                time.sleep(max(processed / options["rate"] - (time.monotonic() - started_at), 0))
+
+        self.stdout.write("{action}: {migrated} uids of {provider} {verb} to {slug}:uid, {skipped} skipped".format(
+            action="Dry run finished" if dry_run else "Migration finished",
+            verb="would be rewritten" if dry_run else "rewritten",
+            **state
+        ))
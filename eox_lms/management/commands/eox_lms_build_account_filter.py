@@ -0,0 +1,30 @@
+"""
+Builder of the account Bloom filter.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eox_lms.bloom import build_account_filter
+
+
+class Command(BaseCommand):
+    """
+    Build or refresh the Bloom filter of taken usernames and emails of this host.
+
+    Example:
+        ./manage.py lms eox_lms_build_account_filter --reset
+    """
+    help = "Build or refresh the Bloom filter used to skip the database on account conflict checks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Build a new filter instead of adding to the current one, dropping the stale entries.",
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH", None):
+            raise CommandError("EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH is not set")
+        build_account_filter(reset=options["reset"])
+        self.stdout.write("Account filter written to {}".format(settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH))
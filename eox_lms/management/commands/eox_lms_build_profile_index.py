@@ -0,0 +1,63 @@
+"""
+Backfill of the index of extended profile fields.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eox_lms.edxapp_wrapper.users import get_user_profile
+from eox_lms.profile_index import get_indexed_fields, index_profiles
+
+
+class Command(BaseCommand):
+    """
+    Copy the indexed extended profile fields (EOX_CORE_INDEXED_PROFILE_FIELDS)
+    of every existing profile to the index, in chunks.
+
+    New writes keep the index up to date by themselves, this is needed once
+    after enabling the index or adding a field to it. Each value is recorded
+    for the site the user signed up on (its UserSignupSource). The users with
+    no signup source, or with several, are skipped and listed: their values
+    are indexed by the next profile save made on a site.
+
+    Example:
+        ./manage.py lms eox_lms_build_profile_index --chunk-size 2000
+    """
+    help = "Copy the indexed extended profile fields of the existing users to the index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Profiles read and indexed at once.")
+        parser.add_argument("--after", type=int, default=0, help="Only index the profiles with a greater id.")
+
+    def handle(self, *args, **options):
+        if not get_indexed_fields():
+            raise CommandError("EOX_CORE_INDEXED_PROFILE_FIELDS is empty")
+
+        user_profile = get_user_profile()
+        after = options["after"]
+        indexed = 0
+        skipped = 0
+        while True:
+            profiles = list(
+                user_profile.objects.filter(pk__gt=after).order_by("pk").values_list("pk", "user_id", "meta")[
+                    :options["chunk_size"]
+                ]
+            )
+            if not profiles:
+                break
+            after = profiles[-1][0]
+
+            entries = []
+            for _, user_id, meta in profiles:
+                try:
+                    entries.append((user_id, json.loads(meta) if meta else {}))
+                except ValueError:
+                    self.stdout.write("Skipped the invalid meta of user {}".format(user_id))
+            for user_id in index_profiles(entries):
+                self.stdout.write("Skipped user {}, its signup site is unknown or ambiguous".format(user_id))
+                skipped += 1
+
+            indexed += len(profiles)
+            self.stdout.write("{} profiles indexed, up to profile {}".format(indexed, after))
+
+        self.stdout.write("Index built: {} profiles, {} users skipped".format(indexed, skipped))
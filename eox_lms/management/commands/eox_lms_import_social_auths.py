@@ -0,0 +1,91 @@
+"""
+Bulk import of user social auths from CSV or NDJSON files.
+"""
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from eox_lms.api.v1.serializers import EdxappUserSocialAuthQuerySerializer
+from eox_lms.edxapp_wrapper.user_social_auth import add_user_social_auths
+from eox_lms.management.commands.eox_lms_import_users import read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    """
+    Link users to the uids of a third party auth provider, e.g. before moving
+    to a new identity provider.
+
+    Every row has the username, provider and uid of a link. The rows are
+    created in chunks through add_user_social_auths. Links that already exist
+    for the same user are counted as existing, so an interrupted import can
+    simply be run again. Rows that fail are appended to an errors file.
+
+    Example:
+        ./manage.py lms eox_lms_import_social_auths links.csv
+    """
+    help = "Import user social auths (username, provider, uid) from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row, or NDJSON file with an object per line.")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the extension of the file.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows read and sent to the backend at once.")
+        parser.add_argument("--errors", help="NDJSON file the failed rows are appended to, defaults to <path>.errors.")
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        file_format = options["format"] or ("csv" if path.lower().endswith(".csv") else "ndjson")
+        errors_path = options["errors"] or path + ".errors"
+        self.counts = {"rows": 0, "created": 0, "exists": 0, "failed": 0}
+
+        with open(path, "rb") as stream, open(errors_path, "a") as self.errors_file:
+            if file_format == "csv":
+                rows = read_csv(stream, next(csv.reader([stream.readline().decode("utf-8-sig")])))
+            else:
+                rows = read_ndjson(stream)
+
+            chunk = []
+            for row, error, _ in rows:
+                chunk.append((row, error))
+                if len(chunk) >= options["chunk_size"]:
+                    self.import_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self.import_chunk(chunk)
+
+        self.stdout.write("Import finished: {rows} rows, {created} created, {exists} existing, {failed} failed".format(
+            **self.counts
+        ))
+        if self.counts["failed"]:
+            self.stdout.write("The failed rows are in {}".format(errors_path))
+
+    def import_chunk(self, chunk):
+        """
+        Validate and create the links of a chunk.
+        """
+        failed = []
+        valid = []
+        for row, error in chunk:
+            if error:
+                failed.append((row, error))
+                continue
+            serializer = EdxappUserSocialAuthQuerySerializer(data=row)
+            if serializer.is_valid():
+                valid.append((row, serializer.validated_data))
+            else:
+                failed.append((row, serializer.errors))
+
+        for (row, _), (status, error) in zip(valid, add_user_social_auths([data for _, data in valid])):
+            if error:
+                failed.append((row, error))
+            else:
+                self.counts[status] += 1
+
+        for row, error in failed:
+            self.errors_file.write(json.dumps({"row": row, "error": error}, default=str) + "\n")
+        self.errors_file.flush()
+
+        self.counts["rows"] += len(chunk)
+        self.counts["failed"] += len(failed)
+        self.stdout.write("{rows} rows, {created} created, {exists} existing, {failed} failed".format(**self.counts))
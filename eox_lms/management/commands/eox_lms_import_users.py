@@ -0,0 +1,217 @@
+"""
+Streaming import of users from CSV or NDJSON files.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+
+from eox_lms.api.v1.serializers import EdxappUserQuerySerializer, get_account_conflicts
+from eox_lms.edxapp_wrapper.users import create_edxapp_users
+from eox_lms.snapshots import site_context
+
+LOG = logging.getLogger(__name__)
+
+HIDDEN_FIELDS = ("password", "password_hash")
+
+
+def read_ndjson(stream):
+    """
+    Yield (row, error, offset) for every line of an NDJSON stream, offset being
+    the position right after the line.
+    """
+    for line in iter(stream.readline, b""):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line.decode("utf-8"))
+        except ValueError as error:
+            yield {}, "Invalid JSON: {}".format(error), stream.tell()
+            continue
+        if isinstance(row, dict):
+            yield row, None, stream.tell()
+        else:
+            yield {}, "A JSON object is expected", stream.tell()
+
+
+def read_csv(stream, fields):
+    """
+    Yield (row, error, offset) for every record of a CSV stream, offset being
+    the position right after the record.
+
+    Records are read as bytes, a quoted field may span several lines, so the
+    position of every record is known. Empty cells are left out of the row.
+    """
+    record = b""
+    for line in iter(stream.readline, b""):
+        record += line
+        if record.count(b'"') % 2:
+            continue
+        values = next(csv.reader(io.StringIO(record.decode("utf-8"))), [])
+        record = b""
+        if not values:
+            continue
+        row = {field: value for field, value in zip(fields, values) if value != ""}
+        error = None
+        if len(values) != len(fields):
+            error = "Expected {} columns, found {}".format(len(fields), len(values))
+        yield row, error, stream.tell()
+
+
+class Command(BaseCommand):
+    """
+    Import users from a CSV or NDJSON file of any size.
+
+    Every row takes the same fields as POST /eox-lms/api/v1/user/ and is
+    validated with the same serializer, including the custom registration
+    fields of the given site. Valid rows are created in chunks through
+    create_edxapp_users, and after every chunk the position reached in the
+    file is written to a checkpoint, so an interrupted import resumes where
+    it stopped. If it stops between the commit of a chunk and its checkpoint,
+    the rows of that chunk are read again and fail as existing accounts, so
+    no user is created twice. Rows that fail are appended to an errors file.
+
+    Example:
+        ./manage.py lms eox_lms_import_users users.csv --site tenant.example.com
+    """
+    help = "Import users from a CSV or NDJSON file, in chunks and resuming from a checkpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row, or NDJSON file with an object per line.")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the extension of the file.")
+        parser.add_argument("--site", help="Domain of the site the users are created on.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=getattr(settings, "EOX_CORE_BULK_CREATE_CHUNK_SIZE", 500),
+            help="Rows created per transaction.",
+        )
+        parser.add_argument("--checkpoint", help="Checkpoint file, defaults to <path>.checkpoint.")
+        parser.add_argument("--errors", help="NDJSON file the failed rows are appended to, defaults to <path>.errors.")
+        parser.add_argument(
+            "--password-hash-workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Processes used to hash the plaintext passwords.",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the top.")
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        file_format = options["format"] or ("csv" if path.lower().endswith(".csv") else "ndjson")
+        checkpoint_path = options["checkpoint"] or path + ".checkpoint"
+        errors_path = options["errors"] or path + ".errors"
+        self.chunk_size = options["chunk_size"]
+        self.password_hash_workers = options["password_hash_workers"]
+
+        self.site = None
+        if options["site"]:
+            try:
+                self.site = Site.objects.get(domain=options["site"])
+            except Site.DoesNotExist:
+                raise CommandError("Site {} not found".format(options["site"]))
+
+        self.state = {"source": path, "offset": 0, "rows": 0, "created": 0, "failed": 0}
+        if not options["restart"] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as checkpoint_file:
+                self.state = json.load(checkpoint_file)
+            if self.state["source"] != path:
+                raise CommandError("The checkpoint {} belongs to {}".format(checkpoint_path, self.state["source"]))
+            self.stdout.write("Resuming at byte {offset}, after {rows} rows".format(**self.state))
+
+        with ExitStack() as stack:
+            if self.site:
+                stack.enter_context(site_context(self.site))
+            stream = stack.enter_context(open(path, "rb"))
+            self.errors_file = stack.enter_context(open(errors_path, "a"))
+
+            if file_format == "csv":
+                fields = next(csv.reader([stream.readline().decode("utf-8-sig")]))
+                if self.state["offset"]:
+                    stream.seek(self.state["offset"])
+                rows = read_csv(stream, fields)
+            else:
+                stream.seek(self.state["offset"])
+                rows = read_ndjson(stream)
+
+            self.started_at = time.monotonic()
+            self.imported = 0
+            chunk = []
+            for row, error, offset in rows:
+                chunk.append((row, error))
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk, offset, checkpoint_path)
+                    chunk = []
+            if chunk:
+                self.import_chunk(chunk, offset, checkpoint_path)  # pylint: disable=undefined-loop-variable
+
+        self.stdout.write(
+            "Import finished: {rows} rows, {created} created, {failed} failed".format(**self.state)
+        )
+        if self.state["failed"]:
+            self.stdout.write("The failed rows are in {}".format(errors_path))
+
+    def import_chunk(self, chunk, offset, checkpoint_path):
+        """
+        Validate and create the users of a chunk, then record the progress.
+        """
+        failed = []
+        valid = []
+        account_conflicts = get_account_conflicts([row for row, error in chunk if not error])
+        for row, error in chunk:
+            if error:
+                failed.append((row, [error]))
+                continue
+            serializer = EdxappUserQuerySerializer(data=row, context={"account_conflicts": account_conflicts})
+            if serializer.is_valid():
+                valid.append((row, serializer.validated_data))
+            else:
+                failed.append((row, serializer.errors))
+
+        results = create_edxapp_users(
+            [data for _, data in valid],
+            site=self.site,
+            password_hash_workers=self.password_hash_workers,
+        )
+        created = 0
+        for (row, _), (user, errors) in zip(valid, results):
+            if user is None:
+                failed.append((row, errors))
+            else:
+                created += 1
+
+        for row, errors in failed:
+            row_data = {key: value for key, value in row.items() if key not in HIDDEN_FIELDS}
+            self.errors_file.write(json.dumps({"row": row_data, "errors": errors}, default=str) + "\n")
+        self.errors_file.flush()
+
+        self.state.update(
+            offset=offset,
+            rows=self.state["rows"] + len(chunk),
+            created=self.state["created"] + created,
+            failed=self.state["failed"] + len(failed),
+        )
+        write_checkpoint(checkpoint_path, self.state)
+
+        self.imported += len(chunk)
+        rate = self.imported / max(time.monotonic() - self.started_at, 1e-6)
+        self.stdout.write(
+            "{rows} rows, {created} created, {failed} failed, {rate:.0f} rows/s".format(rate=rate, **self.state)
+        )
+
+
+def write_checkpoint(path, state):
+    """
+    Replace the checkpoint atomically, so it is never left half written.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+    os.replace(temporary_path, path)
@@ -0,0 +1,68 @@
+"""
+Bulk retirement of the users listed in a file.
+"""
+import logging
+import time
+
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+
+from eox_lms.edxapp_wrapper.users import get_edxapp_users_by_identifiers
+from eox_lms.models import RetirementJobItem
+from eox_lms.tasks import get_retirement_job_progress, start_retirement_job
+
+LOG = logging.getLogger(__name__)
+
+LOOKUP_CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Start a retirement job for the users listed in a file, one username or
+    email per line, like POST /eox-lms/api/v1/user/retirement-job/ does.
+
+    The users are retired by the eox_lms_run_tasks worker. With --wait the
+    command reports the progress of the job until it finishes.
+
+    Example:
+        ./manage.py lms eox_lms_retire_users users.txt --case-id GDPR-1234 --site tenant.example.com --wait
+    """
+    help = "Retire the users listed in a file, in the background and in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File with a username or email per line.")
+        parser.add_argument("--case-id", required=True, help="Case of the retirement, added to the retired emails.")
+        parser.add_argument("--site", required=True, help="Domain of the site the users are retired from.")
+        parser.add_argument("--support", action="store_true", help="The retirement is requested by support.")
+        parser.add_argument("--wait", action="store_true", help="Report the progress until the job finishes.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between progress reports.")
+
+    def handle(self, *args, **options):
+        try:
+            site = Site.objects.get(domain=options["site"])
+        except Site.DoesNotExist:
+            raise CommandError("Site {} not found".format(options["site"]))
+
+        with open(options["path"]) as users_file:
+            identifiers = [line.strip() for line in users_file if line.strip()]
+
+        user_ids = set()
+        found = set()
+        for start in range(0, len(identifiers), LOOKUP_CHUNK_SIZE):
+            chunk = identifiers[start:start + LOOKUP_CHUNK_SIZE]
+            for user in get_edxapp_users_by_identifiers(usernames=chunk, emails=chunk):
+                user_ids.add(user.id)
+                found.update((user.username, user.email))
+        for identifier in identifiers:
+            if identifier not in found:
+                self.stderr.write("User {} not found".format(identifier))
+
+        job = start_retirement_job(user_ids, case_id=options["case_id"], site=site, is_support_user=options["support"])
+        self.stdout.write("Started retirement job {} for {} users".format(job.id, len(user_ids)))
+
+        while options["wait"]:
+            progress = get_retirement_job_progress(job)
+            self.stdout.write("{succeeded} succeeded, {failed} failed, {pending} pending".format(**progress))
+            if not progress[RetirementJobItem.STATUS_PENDING]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,36 @@
+"""
+Worker of the eox-lms task queue.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from eox_lms.tasks import run_pending_tasks
+
+LOG = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Run the pending eox-lms tasks in batches.
+
+    Example:
+        ./manage.py lms eox_lms_run_tasks --batch-size 200
+    """
+    help = "Run the pending eox-lms tasks, e.g. the comments service users of new accounts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Number of tasks claimed at once.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when there is nothing to run.")
+        parser.add_argument("--once", action="store_true", help="Run the due tasks and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending_tasks(batch_size=options["batch_size"])
+            if processed:
+                LOG.info("Processed %s eox-lms tasks", processed)
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
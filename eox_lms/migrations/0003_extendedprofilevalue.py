@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-18 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eox_lms', '0002_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtendedProfileValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site', models.CharField(blank=True, default='', help_text='Domain of the site that wrote the value', max_length=100)),
+                ('field_name', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255)),
+                ('user_id', models.IntegerField(db_index=True)),
+            ],
+            options={
+                'unique_together': {('user_id', 'field_name')},
+                'index_together': {('field_name', 'value', 'site')},
+            },
+        ),
+    ]
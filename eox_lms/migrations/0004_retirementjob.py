@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-18 22:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eox_lms', '0003_extendedprofilevalue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetirementJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.CharField(max_length=255)),
+                ('site_id', models.IntegerField(help_text='Site the users are retired from')),
+                ('is_support_user', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RetirementJobItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('detail', models.TextField(blank=True, default='')),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='eox_lms.retirementjob')),
+            ],
+            options={
+                'unique_together': {('job', 'user_id')},
+                'index_together': {('job', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,136 @@
+"""
+Models of eox-lms.
+"""
+from django.db import models
+from django.utils import timezone
+
+
+class EoxTask(models.Model):
+    """
+    A unit of work deferred out of the request path and run by the eox-lms
+    task worker (manage.py lms eox_lms_run_tasks).
+
+    .. no_pii:
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    task_type = models.CharField(max_length=100, db_index=True)
+    payload = models.TextField(help_text="JSON encoded arguments of the task")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    run_after = models.DateTimeField(default=timezone.now)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """ Model options """
+        index_together = [["status", "run_after"]]
+
+    def __str__(self):
+        return "{task_type} #{id} ({status})".format(task_type=self.task_type, id=self.id, status=self.status)
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Response of an API request sent with an Idempotency-Key header, replayed
+    when the same request is retried with the same key.
+
+    A record without status_code belongs to a request still being processed.
+
+    .. pii: Stores API responses, which include the data of the users created or enrolled.
+    .. pii_types: name, username, email_address
+    .. pii_retirement: retained
+    """
+    key = models.CharField(max_length=64, unique=True, help_text="Digest of the user, method, path and key")
+    fingerprint = models.CharField(max_length=64, help_text="Digest of the request body")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.TextField(blank=True, default="", help_text="JSON encoded response data")
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return "{key} ({status_code})".format(key=self.key, status_code=self.status_code or "in progress")
+
+
+class ExtendedProfileValue(models.Model):
+    """
+    Normalized value of an extended profile field of a user, copied out of
+    UserProfile.meta so that users can be found by it with an index.
+
+    Only the fields listed in EOX_CORE_INDEXED_PROFILE_FIELDS are stored.
+
+    .. pii: Copies extended profile fields, e.g. national ids.
+    .. pii_types: id, other
+    .. pii_retirement: local_api
+    """
+    site = models.CharField(max_length=100, blank=True, default="", help_text="Domain of the site that wrote the value")
+    field_name = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    user_id = models.IntegerField(db_index=True)
+
+    class Meta:
+        """ Model options """
+        unique_together = [["user_id", "field_name"]]
+        index_together = [["field_name", "value", "site"]]
+
+    def __str__(self):
+        return "{field_name}={value} ({user_id})".format(field_name=self.field_name, value=self.value, user_id=self.user_id)
+
+
+class RetirementJob(models.Model):
+    """
+    A bulk retirement of users on a site, run in chunks by the eox-lms task
+    worker. The outcome of every user is kept in a RetirementJobItem.
+
+    .. no_pii:
+    """
+    case_id = models.CharField(max_length=255)
+    site_id = models.IntegerField(help_text="Site the users are retired from")
+    is_support_user = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "Retirement #{id} ({case_id})".format(id=self.id, case_id=self.case_id)
+
+
+class RetirementJobItem(models.Model):
+    """
+    A user of a RetirementJob and the outcome of its retirement.
+
+    Users are referenced by id only, so that the job does not keep the
+    usernames and emails that the retirement removes.
+
+    .. no_pii:
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    job = models.ForeignKey(RetirementJob, related_name="items", on_delete=models.CASCADE)
+    user_id = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    detail = models.TextField(blank=True, default="")
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """ Model options """
+        unique_together = [["job", "user_id"]]
+        index_together = [["job", "status"]]
+
+    def __str__(self):
+        return "{job_id}:{user_id} ({status})".format(job_id=self.job_id, user_id=self.user_id, status=self.status)
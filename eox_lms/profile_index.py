@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Index of the extended profile fields of the users.
+
+The extended profile fields live in the UserProfile.meta JSON blob, where they
+cannot be searched. The fields listed in EOX_CORE_INDEXED_PROFILE_FIELDS are
+copied, normalized, to the ExtendedProfileValue table every time the meta of
+a profile is written, and users are found by them through its index.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from eox_lms.edxapp_wrapper.users import get_user_signup_source
+from eox_lms.models import ExtendedProfileValue
+from eox_lms.snapshots import get_current_site
+
+MAX_VALUE_LENGTH = ExtendedProfileValue._meta.get_field("value").max_length  # pylint: disable=protected-access
+
+
+def get_indexed_fields():
+    """
+    Return the names of the indexed extended profile fields.
+    """
+    return getattr(settings, "EOX_CORE_INDEXED_PROFILE_FIELDS", [])
+
+
+def normalize_value(value):
+    """
+    Return the form of value stored and searched in the index, or None if the
+    value cannot be indexed (empty or too long).
+    """
+    if value is None:
+        return None
+    value = str(value).strip().casefold()
+    if not value or len(value) > MAX_VALUE_LENGTH:
+        return None
+    return value
+
+
+def get_signup_domains(user_ids):
+    """
+    Return the domain of the site every user signed up on, by user id. The
+    users without a signup source, or with several, are left out.
+    """
+    sites = {}
+    for user_id, domain in get_user_signup_source().objects.filter(user_id__in=user_ids).values_list("user_id", "site"):
+        sites.setdefault(user_id, set()).add(domain)
+    return {user_id: domains.pop() for user_id, domains in sites.items() if len(domains) == 1}
+
+
+def index_profiles(entries, domain=None):
+    """
+    Replace the indexed values of many users.
+
+    entries is a list of (user_id, meta) tuples, meta being the decoded
+    UserProfile.meta of the user. The values are recorded for domain, the
+    site that wrote them. Without a domain, e.g. outside of a request, they are
+    recorded for the site each user signed up on, and the users whose site
+    cannot be told only lose their old values. Returns the ids of those users,
+    without querying when no field is indexed.
+    """
+    fields = get_indexed_fields()
+    if not fields or not entries:
+        return []
+
+    user_ids = [user_id for user_id, _ in entries]
+    domains = dict.fromkeys(user_ids, domain) if domain else get_signup_domains(user_ids)
+    rows = []
+    for user_id, meta in entries:
+        if user_id not in domains:
+            continue
+        for field_name in fields:
+            value = normalize_value((meta or {}).get(field_name))
+            if value is not None:
+                rows.append(ExtendedProfileValue(
+                    site=domains[user_id],
+                    field_name=field_name,
+                    value=value,
+                    user_id=user_id,
+                ))
+
+    with transaction.atomic():
+        ExtendedProfileValue.objects.filter(user_id__in=user_ids, field_name__in=fields).delete()
+        ExtendedProfileValue.objects.bulk_create(rows)
+    return [user_id for user_id in user_ids if user_id not in domains]
+
+
+def remove_indexed_values(user_id):
+    """
+    Delete every indexed value of a user, e.g. when it is retired.
+    """
+    ExtendedProfileValue.objects.filter(user_id=user_id).delete()
+
+
+def get_current_domain():
+    """
+    Return the domain of the site of the request being processed, or None.
+    """
+    return getattr(get_current_site(), "domain", None)
+
+
+def find_user_ids(field_name, value, site=None):
+    """
+    Return the ids of the users whose field_name matches value. With a site,
+    only the values recorded for that site are matched.
+    """
+    value = normalize_value(value)
+    if field_name not in get_indexed_fields() or value is None:
+        return []
+    values = ExtendedProfileValue.objects.filter(field_name=field_name, value=value)
+    if site is not None:
+        values = values.filter(site=site.domain)
+    return list(values.values_list("user_id", flat=True))
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Signal receivers that keep the eox-lms version stamps and caches up to date.
+
+The signals are sent inside the transaction of the write, so the stamps are
+bumped once it commits.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from eox_lms.bloom import add_account_identifiers
+from eox_lms.cache import (
+    bump_course_roster_version,
+    bump_course_roster_versions,
+    bump_group_memberships_version,
+    bump_groups_version,
+    bump_on_commit,
+    bump_user_version,
+    bump_user_versions,
+)
+from eox_lms.edxapp_wrapper.configuration_helpers import get_site_configuration_model
+from eox_lms.edxapp_wrapper.users import (
+    get_course_enrollment,
+    get_social_link,
+    get_user_profile,
+    get_user_related_models,
+    get_user_signup_source,
+)
+from eox_lms.profile_index import get_current_domain, get_indexed_fields, index_profiles
+from eox_lms.snapshots import invalidate_site_snapshots
+
+
+def user_username_changing(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Flag a user about to be saved with a new username, so that user_changed
+    bumps the rosters that show it.
+
+    Saves limited to other fields, e.g. last_login on every login, skip the
+    lookup of the stored username.
+    """
+    if instance.pk is None or (update_fields is not None and "username" not in update_fields):
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list("username", flat=True).first()
+    instance._eox_lms_username_changed = stored is not None and stored != instance.username  # pylint: disable=protected-access
+
+
+def user_changed(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the version of a saved user and record its username and email in the
+    account filter. A new username also bumps the rosters of the courses of
+    the user, which show it.
+
+    Saves limited to other fields, e.g. last_login on every login, leave the
+    filter alone.
+    """
+    bump_on_commit(bump_user_version, instance.pk)
+    if update_fields is None or not {"username", "email"}.isdisjoint(update_fields):
+        add_account_identifiers([instance.username, instance.email])
+    if getattr(instance, "_eox_lms_username_changed", False):
+        instance._eox_lms_username_changed = False  # pylint: disable=protected-access
+        bump_on_commit(bump_user_course_rosters, [instance.pk])
+
+
+def bump_user_course_rosters(user_ids):
+    """
+    Bump the roster versions of the courses the users are enrolled in.
+    """
+    course_ids = get_course_enrollment().objects.filter(user_id__in=user_ids).values_list("course_id", flat=True)
+    bump_course_roster_versions({str(course_id) for course_id in course_ids})
+
+
+def group_members_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the group memberships version when a user is deleted, which removes
+    its memberships without sending m2m_changed, or when a signup source,
+    which ties the members of a group to a site, is saved or deleted.
+    """
+    bump_on_commit(bump_group_memberships_version)
+
+
+def user_profile_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the version of the owner of a saved profile.
+    """
+    bump_on_commit(bump_user_version, instance.user_id)
+
+
+def user_profile_meta_changed(sender, instance, created, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Copy the indexed extended profile fields of a saved profile to the index,
+    unless the save left the meta alone.
+    """
+    if not get_indexed_fields() or (update_fields is not None and "meta" not in update_fields):
+        return
+    meta = instance.get_meta()
+    if created and not meta:
+        return
+    index_profiles([(instance.user_id, meta)], get_current_domain())
+
+
+def social_link_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the version of the owner of a saved or deleted social link.
+    """
+    bump_on_commit(bump_user_version, instance.user_profile.user_id)
+
+
+def user_related_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the version of the owner of a saved or deleted row of a model read by
+    the user representation, e.g. a preference or the secondary email.
+    """
+    user_id = getattr(instance, "user_id", None)
+    if user_id is None:
+        user_id = instance.user_profile.user_id
+    bump_on_commit(bump_user_version, user_id)
+
+
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the version of every user whose group membership changed, and the
+    group memberships version.
+
+    When the change is made from the group side (reverse), the affected users
+    are in pk_set, except for clear() where they must be read before the
+    relation is emptied.
+    """
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_on_commit(bump_group_memberships_version)
+
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_on_commit(bump_user_version, instance.pk)
+        return
+
+    if action in ("post_add", "post_remove"):
+        user_ids = list(pk_set or [])
+    elif action == "pre_clear":
+        user_ids = list(instance.user_set.values_list("pk", flat=True))
+    else:
+        return
+
+    if user_ids:
+        bump_on_commit(bump_user_versions, user_ids)
+
+
+def group_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the groups version when a group is saved or deleted.
+
+    Deleting a group removes its memberships without sending m2m_changed, so
+    the per user stamps cannot be relied on here.
+    """
+    bump_on_commit(bump_groups_version)
+
+
+def course_enrollment_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Bump the roster version of the course of a saved or deleted enrollment.
+    """
+    bump_on_commit(bump_course_roster_version, str(instance.course_id))
+
+
+def site_configuration_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the site snapshots when any site configuration is saved or deleted.
+    """
+    bump_on_commit(invalidate_site_snapshots)
+
+
+def connect_receivers():
+    """
+    Connect the receivers to the edxapp models resolved through the backends.
+    """
+    user_model = get_user_model()
+
+    pre_save.connect(user_username_changing, sender=user_model, dispatch_uid="eox_lms.user_username_changing")
+    post_save.connect(user_changed, sender=user_model, dispatch_uid="eox_lms.user_changed")
+    post_save.connect(user_profile_changed, sender=get_user_profile(), dispatch_uid="eox_lms.user_profile_changed")
+    post_save.connect(
+        user_profile_meta_changed,
+        sender=get_user_profile(),
+        dispatch_uid="eox_lms.user_profile_meta_changed",
+    )
+    post_save.connect(social_link_changed, sender=get_social_link(), dispatch_uid="eox_lms.social_link_saved")
+    post_delete.connect(social_link_changed, sender=get_social_link(), dispatch_uid="eox_lms.social_link_deleted")
+    for model in get_user_related_models():
+        label = model._meta.label_lower  # pylint: disable=protected-access
+        post_save.connect(user_related_changed, sender=model, dispatch_uid="eox_lms.{}_saved".format(label))
+        post_delete.connect(user_related_changed, sender=model, dispatch_uid="eox_lms.{}_deleted".format(label))
+    m2m_changed.connect(
+        user_groups_changed,
+        sender=user_model.groups.through,
+        dispatch_uid="eox_lms.user_groups_changed",
+    )
+    post_save.connect(group_changed, sender=Group, dispatch_uid="eox_lms.group_saved")
+    post_delete.connect(group_changed, sender=Group, dispatch_uid="eox_lms.group_deleted")
+    post_delete.connect(group_members_changed, sender=user_model, dispatch_uid="eox_lms.user_deleted")
+    post_save.connect(
+        group_members_changed,
+        sender=get_user_signup_source(),
+        dispatch_uid="eox_lms.user_signup_source_saved",
+    )
+    post_delete.connect(
+        group_members_changed,
+        sender=get_user_signup_source(),
+        dispatch_uid="eox_lms.user_signup_source_deleted",
+    )
+
+    course_enrollment = get_course_enrollment()
+    post_save.connect(
+        course_enrollment_changed,
+        sender=course_enrollment,
+        dispatch_uid="eox_lms.course_enrollment_saved",
+    )
+    post_delete.connect(
+        course_enrollment_changed,
+        sender=course_enrollment,
+        dispatch_uid="eox_lms.course_enrollment_deleted",
+    )
+
+    site_configuration = get_site_configuration_model()
+    post_save.connect(
+        site_configuration_changed,
+        sender=site_configuration,
+        dispatch_uid="eox_lms.site_configuration_changed",
+    )
+    post_delete.connect(
+        site_configuration_changed,
+        sender=site_configuration,
+        dispatch_uid="eox_lms.site_configuration_deleted",
+    )
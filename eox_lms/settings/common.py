@@ -55,6 +55,40 @@ def plugin_settings(settings):
     settings.EOX_CORE_BEARER_AUTHENTICATION = 'eox_lms.edxapp_wrapper.backends.bearer_authentication_j_v1'
     settings.EOX_CORE_ASYNC_TASKS = []
     settings.EOX_CORE_THIRD_PARTY_AUTH_BACKEND = 'eox_lms.edxapp_wrapper.backends.third_party_auth_j_v1'
+    settings.EOX_CORE_USER_FRAGMENT_CACHE_TIMEOUT = 3600
+    settings.EOX_CORE_GROUPS_CACHE_TIMEOUT = 3600
+    settings.EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL = 1000
+    settings.EOX_CORE_BULK_CREATE_CHUNK_SIZE = 500
+    settings.EOX_CORE_BULK_UPDATE_CHUNK_SIZE = 500
+    # Processes used to hash the plaintext passwords of a bulk creation, 0 hashes them in the calling process.
+    settings.EOX_CORE_BULK_PASSWORD_HASH_WORKERS = 0
+    # Send the comments service user and language preference of new users to the eox-lms
+    # task queue instead of creating them during the request. Requires the eox_lms_run_tasks worker.
+    settings.EOX_CORE_USER_SIDE_EFFECTS_ASYNC = False
+    # Concurrent calls that create the comments service users of a batch of new users.
+    settings.EOX_CORE_COMMENTS_SERVICE_WORKERS = 4
+    settings.EOX_CORE_TASKS_MAX_ATTEMPTS = 5
+    settings.EOX_CORE_TASKS_RETRY_DELAY = 60
+    settings.EOX_CORE_TASKS_RUNNING_TIMEOUT = 3600
+    # Users retired per transaction by the retirement jobs, and chunks a worker retires at the same time.
+    settings.EOX_CORE_RETIREMENT_CHUNK_SIZE = 50
+    settings.EOX_CORE_RETIREMENT_WORKERS = 2
+    # Idempotency-Key header: seconds a response is replayed, seconds a retry waits for the first
+    # request, and seconds after which a request that never finished is considered abandoned.
+    settings.EOX_CORE_IDEMPOTENCY_KEY_TTL = 86400
+    settings.EOX_CORE_IDEMPOTENCY_LOCK_TIMEOUT = 30
+    settings.EOX_CORE_IDEMPOTENCY_IN_PROGRESS_TIMEOUT = 600
+    # File of the Bloom filter of taken usernames and emails, shared by the workers of a host.
+    # Built with the eox_lms_build_account_filter command, or with BUILD_ON_WARMUP by the
+    # eox_lms_run_tasks worker of the host once a request finds it missing. None disables the filter.
+    settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH = None
+    settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_SIZE = 2 ** 27
+    settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_HASHES = 7
+    settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_BUILD_ON_WARMUP = False
+    settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_LOG_TIMEOUT = 86400
+    # Extended profile fields copied to an indexed table, to find users by them with GET /user/?<field>=<value>.
+    # Filled for existing users with the eox_lms_build_profile_index command.
+    settings.EOX_CORE_INDEXED_PROFILE_FIELDS = []
 
 
 
@@ -45,6 +45,12 @@ try:
 except ImportError:
     INSTALLED_APPS += ('eox_lms',)
 
+try:
+    import social_django  # pylint: disable=unused-import
+    INSTALLED_APPS += ('social_django',)
+except ImportError:
+    pass
+
 ROOT_URLCONF = 'eox_lms.urls'
 ALLOWED_HOSTS = ['*']
 
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Signals sent by eox-lms.
+"""
+from django.dispatch import Signal
+
+# Sent once per chunk when the is_active flag of many users is changed with a
+# set based UPDATE, which sends no post_save. Arguments: user_ids, is_active.
+users_active_changed = Signal()  # pylint: disable=invalid-name
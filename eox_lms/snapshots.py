@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Immutable snapshots of the site configuration read by the API hot paths.
+
+Each snapshot is built once per site, settings it is built from and
+configuration version, kept in the process memory and replaced after any
+SiteConfiguration is saved or deleted, so a request reads plain attributes
+instead of going through configuration_helpers and settings several times.
+A queryset.update() of SiteConfiguration sends no signal and must be followed
+by invalidate_site_snapshots().
+"""
+import hashlib
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+from types import MappingProxyType
+
+from django.conf import settings
+from django.http import HttpRequest
+
+from eox_lms.cache import get_local_cache
+from eox_lms.edxapp_wrapper.configuration_helpers import get_configuration_helper
+
+try:
+    from crum import get_current_request, set_current_request
+except ImportError:
+    get_current_request = set_current_request = None  # pylint: disable=invalid-name
+
+SITE_SNAPSHOTS_NAMESPACE = "site-snapshots"
+# Serializer classes compiled from the registration settings of a snapshot
+COMPILED_SERIALIZERS_NAMESPACE = "compiled-serializers"
+
+SiteSnapshot = namedtuple("SiteSnapshot", [
+    "site_id",
+    "origin_sources",
+    "site_orgs",
+    "all_orgs",
+    "registration_extra_fields",
+    "custom_registration_fields",
+    "extended_profile_fields",
+    "registration_hash",
+    "admin_fields",
+    "admin_fields_hash",
+])
+
+
+def _freeze(value):
+    """
+    Return a read-only copy of a configuration value.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _fingerprint(value):
+    """
+    Return a short digest of a json serializable configuration value.
+    """
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def get_current_site():
+    """
+    Return the site of the request being processed, if any.
+    """
+    request = get_current_request() if get_current_request else None
+    return getattr(request, "site", None)
+
+
+@contextmanager
+def site_context(site):
+    """
+    Make site the current site of the thread, as a request to it would, so that
+    code run outside of requests (e.g. management commands) reads its
+    configuration.
+    """
+    previous_request = get_current_request()
+    request = HttpRequest()
+    request.META["SERVER_NAME"] = site.domain
+    request.site = site
+    set_current_request(request)
+    try:
+        yield request
+    finally:
+        set_current_request(previous_request)
+
+
+def build_site_snapshot(site_id):
+    """
+    Read the configuration of the current site and return it as a SiteSnapshot.
+    """
+    from eox_lms.utils import get_registration_extra_fields  # pylint: disable=import-outside-toplevel
+
+    configuration_helpers = get_configuration_helper()
+
+    origin_sources = configuration_helpers.get_value(
+        'EOX_CORE_USER_ORIGIN_SITE_SOURCES',
+        getattr(settings, 'EOX_CORE_USER_ORIGIN_SITE_SOURCES'),
+    )
+    registration = {
+        "extra_fields": get_registration_extra_fields(),
+        "custom_fields": getattr(settings, "EDNX_CUSTOM_REGISTRATION_FIELDS", []),
+        "extended_profile_fields": getattr(settings, "extended_profile_fields", []),
+    }
+    admin_fields = getattr(settings, "ACCOUNT_VISIBILITY_CONFIGURATION", {}).get("admin_fields", {})
+
+    return SiteSnapshot(
+        site_id=site_id,
+        origin_sources=tuple(origin_sources),
+        site_orgs=frozenset(configuration_helpers.get_current_site_orgs() or []),
+        all_orgs=frozenset(configuration_helpers.get_all_orgs() or []),
+        registration_extra_fields=_freeze(registration["extra_fields"]),
+        custom_registration_fields=_freeze(registration["custom_fields"]),
+        extended_profile_fields=frozenset(registration["extended_profile_fields"]),
+        registration_hash=_fingerprint(registration),
+        admin_fields=_freeze(admin_fields),
+        admin_fields_hash=_fingerprint(admin_fields),
+    )
+
+
+def get_settings_fingerprint():
+    """
+    Return a digest of the django settings a snapshot is built from. Tenant
+    aware settings (e.g. eox-tenant) give each site its own values, so the
+    digest is part of the snapshot key.
+    """
+    return _fingerprint([
+        getattr(settings, "EOX_CORE_USER_ORIGIN_SITE_SOURCES", None),
+        getattr(settings, "REGISTRATION_EXTRA_FIELDS", {}),
+        getattr(settings, "EDNX_CUSTOM_REGISTRATION_FIELDS", []),
+        getattr(settings, "extended_profile_fields", []),
+        getattr(settings, "ACCOUNT_VISIBILITY_CONFIGURATION", {}).get("admin_fields", {}),
+    ])
+
+
+def get_site_snapshot(site=None):
+    """
+    Return the SiteSnapshot of the given site, or of the current one.
+    """
+    site = site or get_current_site()
+    site_id = getattr(site, "id", None)
+    return get_local_cache(SITE_SNAPSHOTS_NAMESPACE).get_or_set(
+        (site_id, get_settings_fingerprint()),
+        lambda: build_site_snapshot(site_id),
+    )
+
+
+def invalidate_site_snapshots():
+    """
+    Discard the snapshots of every site and the serializer classes compiled
+    from them.
+
+    A single generation covers all sites because the orgs of every site are part
+    of each snapshot.
+    """
+    get_local_cache(SITE_SNAPSHOTS_NAMESPACE).invalidate()
+    get_local_cache(COMPILED_SERIALIZERS_NAMESPACE).invalidate()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Durable task queue of eox-lms.
+
+Tasks are rows of the EoxTask table. They are claimed in batches by the
+worker (manage.py lms eox_lms_run_tasks), grouped by type and handed to the
+registered handler in a single call, so a handler can serve many tasks with
+one query. Failed tasks are retried with an exponential backoff until
+EOX_CORE_TASKS_MAX_ATTEMPTS is reached.
+
+A handler receives the list of payloads of a batch and returns a list of the
+same length with None for every payload that succeeded, or an error message.
+"""
+import datetime
+import json
+import logging
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from eox_lms.bloom import build_account_filter
+from eox_lms.edxapp_wrapper.users import (
+    create_edxapp_users_external_records,
+    delete_edxapp_user,
+    get_edxapp_users_by_identifiers,
+)
+from eox_lms.models import EoxTask, RetirementJob, RetirementJobItem
+
+LOG = logging.getLogger(__name__)
+
+TASK_HANDLERS = {}
+
+USERS_EXTERNAL_RECORDS_TASK = "users.external_records"
+USERS_RETIREMENT_TASK = "users.retirement"
+ACCOUNT_FILTER_BUILD_TASK = "account_filter.build"
+
+
+def register_task(task_type):
+    """
+    Decorator registering the handler of a task type.
+    """
+    def decorator(handler):
+        TASK_HANDLERS[task_type] = handler
+        return handler
+    return decorator
+
+
+def enqueue_task(task_type, payload):
+    """
+    Store a task to be run by the worker.
+    """
+    return EoxTask.objects.create(task_type=task_type, payload=json.dumps(payload))
+
+
+def enqueue_tasks(task_type, payloads):
+    """
+    Store many tasks of the same type with a single insert.
+    """
+    return EoxTask.objects.bulk_create([
+        EoxTask(task_type=task_type, payload=json.dumps(payload)) for payload in payloads
+    ])
+
+
+def _claim_tasks(batch_size):
+    """
+    Mark up to batch_size due tasks as running and return them.
+
+    Tasks left running for longer than EOX_CORE_TASKS_RUNNING_TIMEOUT seconds
+    (a worker died) are claimed again.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=getattr(settings, "EOX_CORE_TASKS_RUNNING_TIMEOUT", 3600))
+    due = Q(status=EoxTask.STATUS_PENDING, run_after__lte=now) | Q(status=EoxTask.STATUS_RUNNING, modified__lt=stale)
+
+    with transaction.atomic():
+        queryset = EoxTask.objects.filter(due).order_by("run_after", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        else:
+            queryset = queryset.select_for_update()
+        tasks = list(queryset[:batch_size])
+        for task in tasks:
+            task.status = EoxTask.STATUS_RUNNING
+            task.attempts += 1
+            task.modified = now
+        EoxTask.objects.bulk_update(tasks, ["status", "attempts", "modified"])
+    return tasks
+
+
+def _finish_task(task, error):
+    """
+    Record the outcome of a task, scheduling a retry if it failed and has
+    attempts left.
+    """
+    max_attempts = getattr(settings, "EOX_CORE_TASKS_MAX_ATTEMPTS", 5)
+    if error is None:
+        task.status = EoxTask.STATUS_SUCCEEDED
+        task.last_error = ""
+    elif task.attempts < max_attempts:
+        delay = getattr(settings, "EOX_CORE_TASKS_RETRY_DELAY", 60) * 2 ** (task.attempts - 1)
+        task.status = EoxTask.STATUS_PENDING
+        task.last_error = error
+        task.run_after = timezone.now() + datetime.timedelta(seconds=delay)
+    else:
+        task.status = EoxTask.STATUS_FAILED
+        task.last_error = error
+    task.modified = timezone.now()
+
+
+def run_pending_tasks(batch_size=100):
+    """
+    Run one batch of due tasks.
+
+    Returns the number of tasks processed.
+    """
+    tasks = _claim_tasks(batch_size)
+
+    tasks_by_type = {}
+    for task in tasks:
+        tasks_by_type.setdefault(task.task_type, []).append(task)
+
+    for task_type, typed_tasks in tasks_by_type.items():
+        handler = TASK_HANDLERS.get(task_type)
+        if handler is None:
+            errors = ["Unknown task type {}".format(task_type)] * len(typed_tasks)
+        else:
+            try:
+                errors = handler([json.loads(task.payload) for task in typed_tasks])
+            except Exception as error:  # pylint: disable=broad-except
+                LOG.exception("Task handler %s failed", task_type)
+                errors = [repr(error)] * len(typed_tasks)
+
+        for task, error in zip(typed_tasks, errors):
+            _finish_task(task, error)
+        EoxTask.objects.bulk_update(typed_tasks, ["status", "last_error", "run_after", "modified"])
+
+    return len(tasks)
+
+
+@register_task(USERS_EXTERNAL_RECORDS_TASK)
+def create_users_external_records(payloads):
+    """
+    Create the comments service users and language preferences of a batch of new users at once.
+    """
+    records = [(payload["user_id"], payload.get("language_preference")) for payload in payloads]
+    errors = create_edxapp_users_external_records(records)
+    return [", ".join(user_errors) if user_errors else None for user_errors in errors]
+
+
+@register_task(ACCOUNT_FILTER_BUILD_TASK)
+def build_missing_account_filters(payloads):
+    """
+    Build the account filter of this host if it is still missing.
+
+    The filter is a file of each host, so the tasks queued by other hosts fail
+    here and are retried until the worker of their host claims them.
+    """
+    host = socket.gethostname()
+    errors = []
+    for payload in payloads:
+        if payload["host"] != host:
+            errors.append("The account filter of {} is built by the task worker of that host".format(payload["host"]))
+            continue
+        # Another build running on this host serves this task as well
+        if not os.path.exists(settings.EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH):
+            build_account_filter(wait=False)
+        errors.append(None)
+    return errors
+
+
+def start_retirement_job(user_ids, case_id, site, is_support_user=False):
+    """
+    Create a RetirementJob for the given users and enqueue its chunks, every
+    chunk of EOX_CORE_RETIREMENT_CHUNK_SIZE users being a task.
+    """
+    chunk_size = getattr(settings, "EOX_CORE_RETIREMENT_CHUNK_SIZE", 50)
+    user_ids = sorted(set(user_ids))
+    with transaction.atomic():
+        job = RetirementJob.objects.create(case_id=case_id, site_id=site.id, is_support_user=is_support_user)
+        RetirementJobItem.objects.bulk_create(
+            [RetirementJobItem(job=job, user_id=user_id) for user_id in user_ids],
+            batch_size=1000,
+        )
+        enqueue_tasks(USERS_RETIREMENT_TASK, [
+            {"job_id": job.id, "user_ids": user_ids[start:start + chunk_size]}
+            for start in range(0, len(user_ids), chunk_size)
+        ])
+    return job
+
+
+def get_retirement_job_progress(job):
+    """
+    Count the users of a job by status.
+    """
+    counts = dict(
+        RetirementJobItem.objects.filter(job=job).values_list("status").annotate(count=Count("id")).order_by()
+    )
+    progress = {status: counts.get(status, 0) for status, _ in RetirementJobItem.STATUS_CHOICES}
+    progress["total"] = sum(counts.values())
+    return progress
+
+
+def _retire_user(user, job, site):
+    """
+    Retire a user in its own savepoint and return the (status, detail) of the
+    outcome. The details leave out the username and email of the user.
+    """
+    if user is None:
+        return RetirementJobItem.STATUS_FAILED, "User not found"
+    try:
+        with transaction.atomic():
+            delete_edxapp_user(user=user, case_id=job.case_id, site=site, is_support_user=job.is_support_user)
+    except NotFound:
+        return RetirementJobItem.STATUS_FAILED, "The user does not have a signup source on the site"
+    except Exception as error:  # pylint: disable=broad-except
+        LOG.exception("Retirement of user %s in job %s failed", user.id, job.id)
+        return RetirementJobItem.STATUS_FAILED, error.__class__.__name__
+    return RetirementJobItem.STATUS_SUCCEEDED, ""
+
+
+def _retire_chunk(payload):
+    """
+    Retire the pending users of a chunk in one transaction, together with the
+    record of their outcomes. Users finished by an earlier attempt of the task
+    are skipped.
+    """
+    job = RetirementJob.objects.filter(pk=payload["job_id"]).first()
+    if job is None:
+        return None
+    site = Site.objects.get(pk=job.site_id)
+
+    with transaction.atomic():
+        items = list(
+            RetirementJobItem.objects.select_for_update().filter(
+                job=job,
+                user_id__in=payload["user_ids"],
+                status=RetirementJobItem.STATUS_PENDING,
+            )
+        )
+        users = {user.id: user for user in get_edxapp_users_by_identifiers(ids=[item.user_id for item in items])}
+        for item in items:
+            item.status, item.detail = _retire_user(users.get(item.user_id), job, site)
+            item.modified = timezone.now()
+        RetirementJobItem.objects.bulk_update(items, ["status", "detail", "modified"])
+    return None
+
+
+def _retire_chunk_in_thread(payload):
+    """
+    Run _retire_chunk and close the database connection of the thread.
+    """
+    try:
+        return _retire_chunk(payload)
+    finally:
+        connection.close()
+
+
+@register_task(USERS_RETIREMENT_TASK)
+def retire_users(payloads):
+    """
+    Retire the users of chunks of retirement jobs, up to
+    EOX_CORE_RETIREMENT_WORKERS chunks at the same time.
+    """
+    workers = min(getattr(settings, "EOX_CORE_RETIREMENT_WORKERS", 2), len(payloads))
+    if workers <= 1:
+        return [_retire_chunk(payload) for payload in payloads]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_retire_chunk_in_thread, payloads))
@@ -0,0 +1,19 @@
+"""
+Run of the on_commit callbacks of the tests, which TestCase never commits.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def run_on_commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """
+    Run the on_commit callbacks registered inside the block when it exits, as
+    the commit of the transaction would.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    for _, callback in connection.run_on_commit[start:]:
+        callback()
@@ -0,0 +1,81 @@
+""" Tests for the account Bloom filter. """
+from __future__ import absolute_import, unicode_literals
+
+import os
+import shutil
+import tempfile
+
+import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from .. import bloom
+from ..cache import cache
+from ..models import EoxTask
+from ..tasks import ACCOUNT_FILTER_BUILD_TASK, run_pending_tasks
+from .on_commit import run_on_commit_callbacks
+
+
+class AccountFilterTest(TestCase):
+    """ Tests for account_may_exist """
+
+    def setUp(self):
+        """ Use a fresh filter file and process handle on every test """
+        super(AccountFilterTest, self).setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "accounts.bloom")
+
+        settings_override = override_settings(
+            EOX_CORE_ACCOUNT_BLOOM_FILTER_PATH=self.path,
+            EOX_CORE_ACCOUNT_BLOOM_FILTER_SIZE=2 ** 16,
+            EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        handle_patch = mock.patch.object(bloom, "_SHARED_ACCOUNT_FILTER", bloom.SharedAccountFilter())
+        handle_patch.start()
+        self.addCleanup(handle_patch.stop)
+        cache.clear()
+
+        get_user_model().objects.create(username="JohnDoe", email="john@example.com")
+        bloom.build_account_filter()
+
+    def test_existing_accounts_may_exist(self):
+        """ Test the names of existing users are never reported as free """
+        self.assertTrue(bloom.account_may_exist(["johndoe"]))
+        self.assertTrue(bloom.account_may_exist(["JOHN@example.com"]))
+        self.assertFalse(bloom.account_may_exist(["janedoe", "jane@example.com"]))
+
+    def test_new_accounts_are_replayed_from_the_log(self):
+        """ Test names recorded by any worker reach the filter before it answers """
+        bloom._append_to_log(["janedoe"])  # pylint: disable=protected-access
+
+        self.assertTrue(bloom.account_may_exist(["janedoe"]))
+
+    def test_untrusted_without_the_log(self):
+        """ Test the filter answers maybe once the shared log is lost """
+        cache.clear()
+
+        self.assertTrue(bloom.account_may_exist(["janedoe"]))
+
+        bloom.build_account_filter(reset=True)
+        self.assertFalse(bloom.account_may_exist(["janedoe"]))
+
+    @override_settings(EOX_CORE_ACCOUNT_BLOOM_FILTER_BUILD_ON_WARMUP=True)
+    def test_missing_filter_is_built_by_the_task_worker(self):
+        """ Test a missing filter is queued for the worker instead of built in the request """
+        os.remove(self.path)
+
+        with run_on_commit_callbacks():
+            self.assertTrue(bloom.account_may_exist(["janedoe"]))
+            self.assertTrue(bloom.account_may_exist(["janedoe"]))
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(EoxTask.objects.filter(task_type=ACCOUNT_FILTER_BUILD_TASK).count(), 1)
+
+        run_pending_tasks()
+
+        self.assertFalse(bloom.account_may_exist(["janedoe"]))
+        self.assertTrue(bloom.account_may_exist(["johndoe"]))
@@ -0,0 +1,40 @@
+""" Tests for the process-local caches. """
+from __future__ import absolute_import, unicode_literals
+
+from django.test import TestCase, override_settings
+
+from ..cache import LocalCache
+
+
+@override_settings(EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL=0)
+class LocalCacheTest(TestCase):
+    """ Tests for LocalCache """
+
+    def test_build_once(self):
+        """ Test the value is built only on the first access """
+        local_cache = LocalCache("test-build-once")
+
+        self.assertEqual(local_cache.get_or_set("key", lambda: 1), 1)
+        self.assertEqual(local_cache.get_or_set("key", lambda: 2), 1)
+
+    def test_invalidate_other_workers(self):
+        """ Test an invalidation made by one worker reaches the others """
+        worker_a = LocalCache("test-invalidate")
+        worker_b = LocalCache("test-invalidate")
+        worker_b.get_or_set("key", lambda: 1)
+
+        worker_a.invalidate()
+
+        self.assertIsNone(worker_b.get("key"))
+        self.assertEqual(worker_b.get_or_set("key", lambda: 2), 2)
+
+    @override_settings(EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL=60000)
+    def test_generation_check_is_throttled(self):
+        """ Test the shared generation is not read again before the interval """
+        worker_a = LocalCache("test-throttle")
+        worker_b = LocalCache("test-throttle")
+        worker_b.get_or_set("key", lambda: 1)
+
+        worker_a.invalidate()
+
+        self.assertEqual(worker_b.get("key"), 1)
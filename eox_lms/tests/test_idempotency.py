@@ -0,0 +1,88 @@
+""" Tests for the Idempotency-Key support of the API. """
+from __future__ import absolute_import, unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from ..api.v1.idempotency import idempotent
+from ..models import IdempotencyRecord
+
+
+class CountingView(APIView):
+    """ View that counts how many times it actually runs """
+    calls = 0
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        """ Return the number of the call """
+        CountingView.calls += 1
+        if request.data.get("fail"):
+            raise ValueError("failed")
+        if request.data.get("invalid"):
+            raise ValidationError({"name": ["This field is required."]})
+        if request.data.get("unavailable"):
+            raise APIException("Try again later")
+        return Response({"call": CountingView.calls})
+
+
+class IdempotentTest(TestCase):
+    """ Tests for the idempotent decorator """
+
+    def setUp(self):
+        """ Reset the view counter """
+        super(IdempotentTest, self).setUp()
+        CountingView.calls = 0
+        self.user = get_user_model().objects.create(username="admin")
+
+    def post(self, data, key="retry-1"):
+        """ Send data to the counting view with an Idempotency-Key """
+        request = APIRequestFactory().post("/counting/", data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, user=self.user)
+        return CountingView.as_view()(request)
+
+    def test_retry_replays_the_response(self):
+        """ Test a retry gets the stored response without running again """
+        first = self.post({"name": "john"})
+        retry = self.post({"name": "john"})
+
+        self.assertEqual(first.data, {"call": 1})
+        self.assertEqual(retry.data, {"call": 1})
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(CountingView.calls, 1)
+
+    def test_key_reused_with_another_body(self):
+        """ Test a key cannot be reused for a different request """
+        self.post({"name": "john"})
+
+        response = self.post({"name": "jane"})
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_failures_release_the_key(self):
+        """ Test a request that raised can be retried for real """
+        with self.assertRaises(ValueError):
+            self.post({"fail": True})
+
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_client_errors_are_replayed(self):
+        """ Test a request that raised a 4xx APIException is replayed instead of run again """
+        first = self.post({"invalid": True})
+        retry = self.post({"invalid": True})
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual((retry.status_code, retry.data), (400, {"name": ["This field is required."]}))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(CountingView.calls, 1)
+
+    def test_server_errors_release_the_key(self):
+        """ Test a request that raised a 5xx APIException runs again when retried """
+        self.assertEqual(self.post({"unavailable": True}).status_code, 500)
+        self.assertEqual(self.post({"unavailable": True}).status_code, 500)
+
+        self.assertEqual(CountingView.calls, 2)
+        self.assertFalse(IdempotencyRecord.objects.exists())
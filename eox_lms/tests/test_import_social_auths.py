@@ -0,0 +1,57 @@
+""" Tests for the user social auths import command. """
+from __future__ import absolute_import, unicode_literals
+
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+if apps.is_installed("social_django"):
+    from social_django.models import UserSocialAuth
+
+
+@skipUnless(apps.is_installed("social_django"), "social_django is not installed")
+@override_settings(EOX_CORE_USER_SOCIAL_AUTHS_BACKEND="eox_lms.edxapp_wrapper.backends.user_social_auth_l_v1")
+class ImportSocialAuthsTest(TestCase):
+    """ Tests for eox_lms_import_social_auths """
+
+    def setUp(self):
+        """ Write a CSV file with a row of every outcome """
+        super(ImportSocialAuthsTest, self).setUp()
+        john = User.objects.create(username="johndoe", email="johndoe@example.com")
+        User.objects.create(username="janedoe", email="janedoe@example.com")
+        UserSocialAuth.objects.create(user=john, provider="tpa-saml", uid="idp:john")
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "links.csv")
+        with open(self.path, "w") as links_file:
+            links_file.write(
+                "username,provider,uid\n"
+                "janedoe,tpa-saml,idp:jane\n"
+                "johndoe,tpa-saml,idp:john\n"
+                "ghost,tpa-saml,idp:ghost\n"
+                "janedoe,tpa-saml\n"
+            )
+
+    def test_counts_and_errors_file(self):
+        """ Test the totals are reported and the failed rows are written to the errors file """
+        stdout = io.StringIO()
+
+        call_command("eox_lms_import_social_auths", self.path, "--chunk-size", "2", stdout=stdout)
+
+        self.assertIn("Import finished: 4 rows, 1 created, 1 existing, 2 failed", stdout.getvalue())
+        with open(self.path + ".errors") as errors_file:
+            errors = {error["row"]["username"]: error["error"] for error in map(json.loads, errors_file)}
+        self.assertEqual(errors, {
+            "ghost": "No user found with username ghost",
+            "janedoe": "Expected 3 columns, found 2",
+        })
+        self.assertTrue(UserSocialAuth.objects.filter(user__username="janedoe", uid="idp:jane").exists())
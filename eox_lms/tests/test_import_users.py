@@ -0,0 +1,34 @@
+""" Tests for the readers of the user import command. """
+from __future__ import absolute_import, unicode_literals
+
+import io
+
+from django.test import TestCase
+
+from ..management.commands.eox_lms_import_users import read_csv, read_ndjson
+
+
+class ReadersTest(TestCase):
+    """ Tests for read_csv and read_ndjson """
+
+    def test_csv_offsets_allow_resuming(self):
+        """ Test every record reports the position where the next one starts """
+        data = b'username,fullname\njohn,"John\nDoe"\njane,\n'
+        stream = io.BytesIO(data)
+        fields = stream.readline().decode("utf-8").strip().split(",")
+
+        rows = list(read_csv(stream, fields))
+
+        self.assertEqual([row for row, _, _ in rows], [{"username": "john", "fullname": "John\nDoe"}, {"username": "jane"}])
+        stream.seek(rows[0][2])
+        self.assertEqual([row for row, _, _ in read_csv(stream, fields)], [{"username": "jane"}])
+
+    def test_ndjson_invalid_lines(self):
+        """ Test invalid lines are reported without stopping the import """
+        stream = io.BytesIO(b'{"username": "john"}\nnot json\n\n[1]\n')
+
+        errors = [error for _, error, _ in read_ndjson(stream)]
+
+        self.assertIsNone(errors[0])
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(errors[2], "A JSON object is expected")
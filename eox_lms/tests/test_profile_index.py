@@ -0,0 +1,51 @@
+""" Tests for the index of extended profile fields. """
+from __future__ import absolute_import, unicode_literals
+
+import mock
+from django.test import TestCase, override_settings
+
+from ..profile_index import find_user_ids, index_profiles
+
+
+@override_settings(EOX_CORE_INDEXED_PROFILE_FIELDS=["personal_id"])
+class ProfileIndexTest(TestCase):
+    """ Tests for index_profiles and find_user_ids """
+
+    def test_find_by_normalized_value(self):
+        """ Test users are found ignoring case and spaces, and reindexing replaces the old value """
+        index_profiles(
+            [(1, {"personal_id": " AB-123 ", "city": "Bogota"}), (2, {"personal_id": "cd-456"})],
+            "tenant.example.com",
+        )
+        index_profiles([(2, {"personal_id": "ef-789"})], "tenant.example.com")
+
+        self.assertEqual(find_user_ids("personal_id", "ab-123"), [1])
+        self.assertEqual(find_user_ids("personal_id", "cd-456"), [])
+        self.assertEqual(find_user_ids("personal_id", "EF-789"), [2])
+        self.assertEqual(find_user_ids("city", "bogota"), [])
+
+    def test_site_scoping(self):
+        """ Test a site only sees the values recorded for it """
+        index_profiles([(1, {"personal_id": "1"})], "one.example.com")
+        index_profiles([(2, {"personal_id": "1"})], "two.example.com")
+
+        site = mock.Mock(domain="one.example.com")
+        self.assertEqual(find_user_ids("personal_id", "1", site=site), [1])
+        self.assertEqual(find_user_ids("personal_id", "1", site=mock.Mock(domain="")), [])
+        self.assertEqual(sorted(find_user_ids("personal_id", "1")), [1, 2])
+
+    @mock.patch("eox_lms.profile_index.get_user_signup_source")
+    def test_signup_site(self, get_user_signup_source):
+        """ Test the values written outside of a site are recorded for the signup site of the user """
+        get_user_signup_source.return_value.objects.filter.return_value.values_list.return_value = [
+            (1, "one.example.com"),
+            (3, "one.example.com"),
+            (3, "two.example.com"),
+        ]
+        index_profiles([(3, {"personal_id": "1"})], "two.example.com")
+
+        skipped = index_profiles([(1, {"personal_id": "1"}), (2, {"personal_id": "1"}), (3, {"personal_id": "1"})])
+
+        self.assertEqual(skipped, [2, 3])
+        self.assertEqual(find_user_ids("personal_id", "1", site=mock.Mock(domain="one.example.com")), [1])
+        self.assertEqual(find_user_ids("personal_id", "1"), [1])
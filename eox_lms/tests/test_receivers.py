@@ -0,0 +1,96 @@
+""" Tests for the receivers that keep the version stamps up to date. """
+from __future__ import absolute_import, unicode_literals
+
+import mock
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_save, pre_save
+from django.test import TestCase
+
+from .. import receivers
+from ..cache import get_course_roster_version, get_user_versions
+from .on_commit import run_on_commit_callbacks
+
+
+class UsernameChangeTest(TestCase):
+    """ Tests for the roster versions bumped by a new username """
+
+    def setUp(self):
+        """ Connect the user receivers and enroll the user in a course """
+        super(UsernameChangeTest, self).setUp()
+        pre_save.connect(receivers.user_username_changing, sender=User, dispatch_uid="test.username")
+        post_save.connect(receivers.user_changed, sender=User, dispatch_uid="test.user")
+        self.addCleanup(pre_save.disconnect, sender=User, dispatch_uid="test.username")
+        self.addCleanup(post_save.disconnect, sender=User, dispatch_uid="test.user")
+
+        self.user = User.objects.create(username="johndoe", email="johndoe@example.com")
+        enrollments = mock.Mock()
+        enrollments.objects.filter.return_value.values_list.return_value = ["course-v1:edX+DemoX+Demo"]
+        patcher = mock.patch.object(receivers, "get_course_enrollment", return_value=enrollments)
+        self.enrollments = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_new_username_bumps_the_rosters(self):
+        """ Test the rosters of the courses of the user get a new version """
+        version = get_course_roster_version("course-v1:edX+DemoX+Demo")
+
+        self.user.username = "johndoe2"
+        with run_on_commit_callbacks():
+            self.user.save()
+            self.assertEqual(get_course_roster_version("course-v1:edX+DemoX+Demo"), version)
+
+        self.enrollments.objects.filter.assert_called_once_with(user_id__in=[self.user.pk])
+        self.assertNotEqual(get_course_roster_version("course-v1:edX+DemoX+Demo"), version)
+
+    def test_other_changes_leave_the_rosters(self):
+        """ Test saves that keep the username do not touch the rosters """
+        self.user.first_name = "John"
+        with run_on_commit_callbacks():
+            self.user.save()
+            self.user.save(update_fields=["last_login"])
+
+        self.enrollments.objects.filter.assert_not_called()
+
+
+class GroupMembershipChangeTest(TestCase):
+    """ Tests for the user versions bumped by a membership change """
+
+    def setUp(self):
+        """ Connect the membership receiver and add two users to a group """
+        super(GroupMembershipChangeTest, self).setUp()
+        m2m_changed.connect(receivers.user_groups_changed, sender=User.groups.through, dispatch_uid="test.groups")
+        self.addCleanup(m2m_changed.disconnect, sender=User.groups.through, dispatch_uid="test.groups")
+        self.users = [
+            User.objects.create(username=username, email=username + "@example.com") for username in ("john", "jane")
+        ]
+        self.group = Group.objects.create(name="cohort")
+        self.group.user_set.add(*self.users)
+
+    def test_clear_bumps_on_commit(self):
+        """ Test the users read before a clear are bumped once the transaction commits """
+        versions = get_user_versions([user.pk for user in self.users])
+
+        with run_on_commit_callbacks():
+            self.group.user_set.clear()
+            self.assertEqual(get_user_versions([user.pk for user in self.users]), versions)
+
+        bumped = get_user_versions([user.pk for user in self.users])
+        self.assertTrue(all(bumped[user.pk] != versions[user.pk] for user in self.users))
+
+
+class UserRelatedChangeTest(TestCase):
+    """ Tests for the user versions bumped by the other models of the user representation """
+
+    def test_owner_is_bumped_on_commit(self):
+        """ Test the owner is found through user_id or the profile """
+        preference = mock.Mock(user_id=1)
+        proficiency = mock.Mock(user_id=None, user_profile=mock.Mock(user_id=2))
+        versions = get_user_versions([1, 2])
+
+        with run_on_commit_callbacks():
+            receivers.user_related_changed(sender=None, instance=preference)
+            receivers.user_related_changed(sender=None, instance=proficiency)
+            self.assertEqual(get_user_versions([1, 2]), versions)
+
+        bumped = get_user_versions([1, 2])
+        self.assertNotEqual(bumped[1], versions[1])
+        self.assertNotEqual(bumped[2], versions[2])
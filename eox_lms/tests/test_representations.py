@@ -0,0 +1,69 @@
+""" Conformance tests for the compiled representations of the read-only serializers. """
+from __future__ import absolute_import, unicode_literals
+
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import serializers as drf_serializers
+from rest_framework.renderers import JSONRenderer
+
+from ..api.v1 import serializers
+from ..api.v1.representations import REPRESENTATIONS, get_representation
+
+
+class RepresentationConformanceTest(TestCase):
+    """ Test the compiled representations render the same bytes as DRF """
+
+    def assertConforms(self, serializer_class, instances):
+        """ Compare the rendered list of both representations """
+        represent = get_representation(serializer_class)
+        self.assertIsNotNone(REPRESENTATIONS[serializer_class])
+        self.assertEqual(
+            JSONRenderer().render([represent(instance) for instance in instances]),
+            JSONRenderer().render(serializer_class(instances, many=True).data),
+        )
+
+    def test_course_enrollment(self):
+        """ Test enrollments read from models and from dicts, with missing and nested fields """
+        user = User(username="johndoe")
+        self.assertConforms(serializers.EdxappCourseEnrollmentSerializer, [
+            SimpleNamespace(user=user, is_active=False, mode="audit", course_id="course-v1:edX+DemoX+Demo"),
+            SimpleNamespace(user=None, mode="verified", course_id="course-v1:edX+DemoX+Demo"),
+            {
+                "user": "janedoe",
+                "is_active": 1,
+                "mode": "honor",
+                "course_id": "course-v1:edX+DemoX+Demo",
+                "enrollment_attributes": [{"namespace": "credit", "name": "provider_id", "value": 1}],
+            },
+        ])
+
+    def test_user(self):
+        """ Test users with empty and unicode values """
+        self.assertConforms(serializers.EdxappUserSerializer, [
+            User(username="johndoe", email="johndoe@example.com", first_name="John", last_name="Doe", is_staff=True),
+            User(username="jose", email="jose@example.com", first_name="José", last_name="", is_active=False),
+        ])
+
+    def test_user_social_auth(self):
+        """ Test social auths """
+        self.assertConforms(serializers.EdxappUserSocialAuthSerializer, [
+            SimpleNamespace(provider="tpa-saml", uid="idp:johndoe", user_id=4),
+            {"provider": "google-oauth2", "uid": "jane@example.com", "user_id": "5"},
+        ])
+
+    def test_custom_field_logic_uses_drf(self):
+        """ Test a serializer with a method field is not compiled but still represented """
+        class MethodSerializer(drf_serializers.Serializer):
+            """ Serializer with a method field """
+            name = drf_serializers.CharField()
+            upper = drf_serializers.SerializerMethodField()
+
+            def get_upper(self, instance):
+                """ Upper case name """
+                return instance["name"].upper()
+
+        represent = get_representation(MethodSerializer)
+        self.assertIsNone(REPRESENTATIONS[MethodSerializer])
+        self.assertEqual(represent({"name": "a"}), {"name": "a", "upper": "A"})
@@ -0,0 +1,69 @@
+""" Tests for the bulk retirement jobs. """
+from __future__ import absolute_import, unicode_literals
+
+import mock
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import NotFound
+from rest_framework.test import APIClient
+
+from ..api.v1 import views
+from ..models import RetirementJobItem
+from ..tasks import get_retirement_job_progress, run_pending_tasks, start_retirement_job
+
+
+@override_settings(EOX_CORE_RETIREMENT_CHUNK_SIZE=2, EOX_CORE_RETIREMENT_WORKERS=1)
+class RetirementJobTest(TestCase):
+    """ Tests for start_retirement_job and the retirement task """
+
+    def test_users_are_retired_in_chunks(self):
+        """ Test every user gets an outcome and finished users are not retired twice """
+        site = Site.objects.create(domain="one.example.com", name="one.example.com")
+        users = [mock.Mock(id=user_id) for user_id in (1, 2, 3)]
+
+        def delete_user(user, **kwargs):
+            if user.id == 2:
+                raise NotFound("The user two <two@example.com> does not have a signup source")
+            return "removed", 200
+
+        job = start_retirement_job([3, 1, 2, 1], case_id="case", site=site)
+        self.assertEqual(get_retirement_job_progress(job)["total"], 3)
+        # Retired by an earlier attempt of its chunk
+        RetirementJobItem.objects.filter(job=job, user_id=3).update(status=RetirementJobItem.STATUS_SUCCEEDED)
+
+        with mock.patch("eox_lms.tasks.get_edxapp_users_by_identifiers", side_effect=lambda ids: [
+            user for user in users if user.id in ids
+        ]), mock.patch("eox_lms.tasks.delete_edxapp_user", side_effect=delete_user) as delete_mock:
+            self.assertEqual(run_pending_tasks(), 2)
+
+        self.assertEqual(
+            get_retirement_job_progress(job),
+            {"total": 3, "pending": 0, "succeeded": 2, "failed": 1},
+        )
+        failed = RetirementJobItem.objects.get(job=job, status=RetirementJobItem.STATUS_FAILED)
+        self.assertEqual(failed.user_id, 2)
+        self.assertNotIn("two@example.com", failed.detail)
+        self.assertEqual([call[1]["user"].id for call in delete_mock.call_args_list], [1, 2])
+
+
+class RetirementJobsApiTest(TestCase):
+    """ Tests for POST /user/retirement-job/ """
+
+    def test_identifiers_match_case_insensitively(self):
+        """ Test an identifier that found its user in another case is not reported as not found """
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="staff", is_staff=True))
+        users = [mock.Mock(id=1, username="JohnDoe", email="john@example.com")]
+        data = {"usernames": ["johndoe", "ghost"], "emails": ["JOHN@example.com"], "case_id": "GDPR-1"}
+
+        with mock.patch.object(views, "get_edxapp_users_by_identifiers", return_value=users), \
+                mock.patch.object(views, "get_current_site"), \
+                mock.patch.object(views, "start_retirement_job") as start_retirement_job:
+            start_retirement_job.return_value.id = 7
+            response = client.post(reverse("eox-api:eox-api:edxapp-user-retirement-jobs"), data, format="json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["not_found"], ["ghost"])
+        self.assertEqual(start_retirement_job.call_args[0][0], [1])
@@ -0,0 +1,158 @@
+""" Tests for the user serializers. """
+from __future__ import absolute_import, unicode_literals
+
+import json
+from types import SimpleNamespace
+
+import mock
+from django.test import TestCase, override_settings
+
+from ..api.v1 import serializers
+from ..snapshots import SiteSnapshot
+
+
+def make_snapshot(registration_hash, extra_fields, custom_fields=()):
+    """ Return a snapshot with the given registration settings """
+    return SiteSnapshot(
+        site_id=None,
+        origin_sources=(),
+        site_orgs=frozenset(),
+        all_orgs=frozenset(),
+        registration_extra_fields=extra_fields,
+        custom_registration_fields=custom_fields,
+        extended_profile_fields=frozenset(),
+        registration_hash=registration_hash,
+        admin_fields={},
+        admin_fields_hash="",
+    )
+
+
+@override_settings(EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL=0)
+class CompiledSerializerTest(TestCase):
+    """ Tests for EdxappExtendedUserSerializer.compile_for_site """
+
+    def test_class_is_reused_for_the_same_settings(self):
+        """ Test the site class is built once per registration settings """
+        snapshot = make_snapshot("a", {"city": "required"})
+
+        with mock.patch.object(serializers, "get_site_snapshot", return_value=snapshot):
+            first = serializers.EdxappUserQuerySerializer(data={})
+            second = serializers.EdxappUserQuerySerializer(data={})
+
+        self.assertIs(type(first), type(second))
+        self.assertIsInstance(first, serializers.EdxappUserQuerySerializer)
+        self.assertTrue(first.fields["city"].required)
+        self.assertNotIn("goals", first.fields)
+
+    def test_custom_fields(self):
+        """ Test the custom registration fields of the site are added """
+        snapshot = make_snapshot("b", {"favorite": "required"}, ({"name": "favorite", "type": "checkbox"},))
+
+        site_class = serializers.EdxappExtendedUserSerializer.compile_for_site(snapshot)
+
+        self.assertIn("favorite", site_class.registration_field_names)
+        with mock.patch.object(serializers, "get_site_snapshot", return_value=snapshot):
+            self.assertTrue(serializers.EdxappExtendedUserSerializer().fields["favorite"].required)
+
+
+def make_meta(*columns):
+    """ Return the _meta of a model with the given columns """
+    return SimpleNamespace(concrete_fields=[SimpleNamespace(name=column) for column in columns])
+
+
+class FakeProfile:
+    """ In-memory user profile recording its saves """
+
+    _meta = make_meta("name", "city", "meta")
+
+    def __init__(self):
+        self.name = "John"
+        self.city = "Bogota"
+        self.meta = json.dumps({"personal_id": "1"})
+        self.saved_fields = []
+
+    def get_meta(self):
+        """ Return the decoded meta """
+        return json.loads(self.meta)
+
+    def set_meta(self, meta):
+        """ Encode the meta """
+        self.meta = json.dumps(meta)
+
+    def save(self, update_fields=None):
+        """ Record the saved fields """
+        self.saved_fields.append(update_fields)
+
+
+class FakeUser:
+    """ In-memory user recording its saves """
+
+    _meta = make_meta("email", "username", "is_active", "first_name")
+
+    def __init__(self):
+        self.email = "john@example.com"
+        self.username = "john"
+        self.is_active = True
+        self.first_name = ""
+        self.profile = FakeProfile()
+        self.saved_fields = []
+
+    def save(self, update_fields=None):
+        """ Record the saved fields """
+        self.saved_fields.append(update_fields)
+
+
+@override_settings(EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL=0)
+class WrittableEdxappUserSerializerTest(TestCase):
+    """ Tests for the updates of WrittableEdxappUserSerializer """
+
+    def setUp(self):
+        snapshot = make_snapshot(
+            "c",
+            {"city": "optional", "personal_id": "optional", "first_name": "optional", "favorite_color": "optional"},
+            ({"name": "personal_id", "type": "text"}, {"name": "favorite_color", "type": "text"}),
+        )._replace(
+            extended_profile_fields=frozenset({"personal_id"}),
+        )
+        self.patchers = [
+            mock.patch.object(serializers, "get_site_snapshot", return_value=snapshot),
+            mock.patch.object(serializers, "UserSignupSource"),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        serializers.UserSignupSource.objects.filter.return_value.values_list.return_value = [1]
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def update(self, data):
+        """ Apply data to a new user and return it """
+        user = FakeUser()
+        serializer = serializers.WrittableEdxappUserSerializer(user, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return user
+
+    def test_unchanged_values_are_not_written(self):
+        """ Test a PATCH that changes nothing does not save """
+        user = self.update({"email": "john@example.com", "fullname": "John", "city": "Bogota", "personal_id": "1"})
+
+        self.assertEqual(user.saved_fields, [])
+        self.assertEqual(user.profile.saved_fields, [])
+
+    def test_only_changed_columns_are_written(self):
+        """ Test the saves are limited to the changed columns """
+        user = self.update({"email": "john@example.com", "is_active": False, "city": "Bogota", "personal_id": "2"})
+
+        self.assertEqual(user.saved_fields, [["is_active"]])
+        self.assertEqual(user.profile.saved_fields, [["meta"]])
+        self.assertEqual(user.profile.get_meta(), {"personal_id": "2"})
+
+    def test_keys_without_a_column_are_dropped(self):
+        """ Test the registration fields kept neither as a column nor in the meta are not written """
+        user = self.update({"first_name": "Johnny", "favorite_color": "blue", "city": "Cali"})
+
+        self.assertEqual(user.saved_fields, [["first_name"]])
+        self.assertEqual(user.profile.saved_fields, [["city"]])
+        self.assertFalse(hasattr(user.profile, "favorite_color"))
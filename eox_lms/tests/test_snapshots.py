@@ -0,0 +1,48 @@
+""" Tests for the site configuration snapshots. """
+from __future__ import absolute_import, unicode_literals
+
+import mock
+from django.test import TestCase, override_settings
+
+from .. import snapshots
+
+
+@override_settings(
+    EOX_CORE_LOCAL_CACHE_CHECK_INTERVAL=0,
+    EOX_CORE_USER_ORIGIN_SITE_SOURCES=["fetch_from_unfiltered_table"],
+    REGISTRATION_EXTRA_FIELDS={"city": "required"},
+)
+class SiteSnapshotTest(TestCase):
+    """ Tests for get_site_snapshot """
+
+    def setUp(self):
+        """ Start without snapshots """
+        super(SiteSnapshotTest, self).setUp()
+        snapshots.invalidate_site_snapshots()
+        patcher = mock.patch.object(snapshots, "get_configuration_helper")
+        patcher.start().return_value.get_value.side_effect = lambda name, default=None: default
+        self.addCleanup(patcher.stop)
+        self.site = mock.Mock(id=1)
+
+    def test_snapshot_is_reused(self):
+        """ Test a site gets the same snapshot while nothing changes """
+        self.assertIs(snapshots.get_site_snapshot(self.site), snapshots.get_site_snapshot(self.site))
+
+    def test_settings_of_the_site_are_part_of_the_key(self):
+        """ Test other settings for the same site, e.g. of another tenant, build another snapshot """
+        snapshot = snapshots.get_site_snapshot(self.site)
+
+        with override_settings(REGISTRATION_EXTRA_FIELDS={"city": "optional"}):
+            other = snapshots.get_site_snapshot(self.site)
+
+        self.assertEqual(dict(snapshot.registration_extra_fields), {"city": "required"})
+        self.assertEqual(dict(other.registration_extra_fields), {"city": "optional"})
+        self.assertIs(snapshots.get_site_snapshot(self.site), snapshot)
+
+    def test_invalidation(self):
+        """ Test the snapshots are rebuilt after an invalidation """
+        snapshot = snapshots.get_site_snapshot(self.site)
+
+        snapshots.invalidate_site_snapshots()
+
+        self.assertIsNot(snapshots.get_site_snapshot(self.site), snapshot)
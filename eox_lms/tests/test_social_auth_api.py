@@ -0,0 +1,74 @@
+""" Tests for the user social auth endpoint. """
+from __future__ import absolute_import, unicode_literals
+
+import json
+from unittest import skipUnless
+
+import mock
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..api.v1 import views
+
+if apps.is_installed("social_django"):
+    from social_django.models import UserSocialAuth
+
+
+@skipUnless(apps.is_installed("social_django"), "social_django is not installed")
+@override_settings(EOX_CORE_USER_SOCIAL_AUTHS_BACKEND="eox_lms.edxapp_wrapper.backends.user_social_auth_l_v1")
+class UserSocialAuthListTest(TestCase):
+    """ Tests for GET /user-social-auth/ """
+
+    def setUp(self):
+        """ Link three users and authenticate as staff """
+        super(UserSocialAuthListTest, self).setUp()
+        for username in ("ann", "bob", "cid"):
+            user = User.objects.create(username=username, email="{}@example.com".format(username))
+            UserSocialAuth.objects.create(user=user, provider="tpa-saml", uid="idp:" + username)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="staff", is_staff=True))
+        self.url = reverse("eox-api:eox-api:edxapp-user-social-auth")
+
+    def test_link_header_follows_the_pages(self):
+        """ Test the Link cursor leads to the next page until the last one """
+        response = self.client.get(self.url, {"LIMIT": 2})
+
+        self.assertEqual([auth["username"] for auth in response.data], ["ann", "bob"])
+        link = response["Link"]
+        self.assertTrue(link.endswith('>; rel="next"'))
+        next_url = link[1:link.index(">")]
+        self.assertIn("LIMIT=2", next_url)
+
+        response = self.client.get(next_url)
+
+        self.assertEqual(response.data, [{"provider": "tpa-saml", "uid": "idp:cid", "username": "cid"}])
+        self.assertNotIn("Link", response)
+
+    def test_filters(self):
+        """ Test the query parameters filter the social auths """
+        response = self.client.get(self.url, {"username": "bob", "provider": "tpa-saml"})
+
+        self.assertEqual(response.data, [{"provider": "tpa-saml", "uid": "idp:bob", "username": "bob"}])
+        self.assertEqual(self.client.get(self.url, {"uid": "idp:ann"}).data[0]["username"], "ann")
+        self.assertEqual(self.client.get(self.url, {"provider": "google-oauth2"}).data, [])
+
+    def test_stream(self):
+        """ Test stream=true sends every social auth as NDJSON, across pages """
+        response = self.client.get(self.url, {"stream": "true", "LIMIT": 2})
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual([json.loads(line)["username"] for line in lines], ["ann", "bob", "cid"])
+
+    def test_paging_params(self):
+        """ Test LIMIT is capped and paging params that are not integers are a 400 """
+        with mock.patch.object(views, "get_user_social_auths_page", return_value=[]) as get_page:
+            self.client.get(self.url, {"LIMIT": 10 ** 6})
+            self.client.get(self.url, {"LIMIT": 0})
+
+        self.assertEqual([call[1]["limit"] for call in get_page.call_args_list], [1000, 1])
+        self.assertEqual(self.client.get(self.url, {"LIMIT": "ten"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"AFTER": "x"}).status_code, 400)
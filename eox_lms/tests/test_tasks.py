@@ -0,0 +1,52 @@
+""" Tests for the eox-lms task queue. """
+from __future__ import absolute_import, unicode_literals
+
+from django.test import TestCase, override_settings
+
+from ..models import EoxTask
+from ..tasks import TASK_HANDLERS, enqueue_task, enqueue_tasks, register_task, run_pending_tasks
+
+
+@override_settings(EOX_CORE_TASKS_MAX_ATTEMPTS=2, EOX_CORE_TASKS_RETRY_DELAY=0)
+class RunPendingTasksTest(TestCase):
+    """ Tests for run_pending_tasks """
+
+    def setUp(self):
+        """ Register a handler that fails for the payloads marked as such """
+        super(RunPendingTasksTest, self).setUp()
+        self.batches = []
+
+        @register_task("test")
+        def handler(payloads):
+            self.batches.append(payloads)
+            return [None if payload["ok"] else "failed" for payload in payloads]
+
+        self.addCleanup(TASK_HANDLERS.pop, "test")
+
+    def test_tasks_are_batched_by_type(self):
+        """ Test all the due tasks of a type reach the handler in one call """
+        enqueue_tasks("test", [{"ok": True}, {"ok": True}])
+
+        self.assertEqual(run_pending_tasks(), 2)
+        self.assertEqual(self.batches, [[{"ok": True}, {"ok": True}]])
+        self.assertEqual(EoxTask.objects.filter(status=EoxTask.STATUS_SUCCEEDED).count(), 2)
+
+    def test_failed_tasks_are_retried(self):
+        """ Test a failing task is retried until the attempts run out """
+        task = enqueue_task("test", {"ok": False})
+
+        run_pending_tasks()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.last_error), (EoxTask.STATUS_PENDING, 1, "failed"))
+
+        run_pending_tasks()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (EoxTask.STATUS_FAILED, 2))
+
+    def test_unknown_task_type(self):
+        """ Test tasks without a handler are not lost """
+        task = enqueue_task("missing", {})
+
+        run_pending_tasks()
+        task.refresh_from_db()
+        self.assertEqual(task.last_error, "Unknown task type missing")